@@ -1,9 +1,9 @@
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException, Body, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Body, Form, Query, Request, Response
 from fastapi.responses import StreamingResponse
-from typing import List, Optional, Dict, Any
+from typing import Any, Awaitable, Dict, List, Optional
 from pydantic import BaseModel, Field
-import shutil
+import asyncio
 import os
 from datetime import datetime, timezone
 from pathlib import Path
@@ -11,16 +11,26 @@ from pathlib import Path
 
 from src.tools.report_tool.report_tool import generate_report_from_query
 from src.tools.regulation_tool import _monitor_instance as regulation_monitor
+from src.extraction.text_cache import extracted_text_cache
+from src.extraction.text_extractor import text_extractor
+from backend.events import conversation_events
+from backend.executors import executors
+from backend.ingestion import TERMINAL_STATUSES, upload_ingestion
+from backend.intent_classifier import intent_classifier
 from backend.manager import agent_manager
+from backend.upload_store import UPLOAD_DIR, upload_store
+from backend.prompt_builder import (
+    CHAT_INSTRUCTIONS,
+    STREAM_GUIDELINES,
+    build_chat_context,
+    compose_system_prompt,
+    prompt_budget,
+    prompt_cache_stats,
+)
 
-try:
-    from PyPDF2 import PdfReader
-except Exception:  # pragma: no cover - optional dependency
-    PdfReader = None
-
+LOGGER = logging.getLogger(__name__)
 router = APIRouter()
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 class ChatRequest(BaseModel):
@@ -36,33 +46,9 @@ class AgentRequest(BaseModel):
 class ConversationCreateRequest(BaseModel):
     title: Optional[str] = None
 
-def _extract_text_from_file(file_path: str, content_type: Optional[str] = None) -> str:
-    ext = Path(file_path).suffix.lower()
-    try:
-        if ext == ".pdf" and PdfReader is not None:
-            with open(file_path, "rb") as f:
-                reader = PdfReader(f)
-                texts = []
-                for page in reader.pages:
-                    try:
-                        texts.append(page.extract_text() or "")
-                    except Exception:
-                        continue
-                return "\n".join(texts)
-        if ext in {".txt", ".md", ".csv", ".json"}:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                return f.read()
-        # fallback binary decode
-        with open(file_path, "rb") as f:
-            data = f.read()
-            return data.decode("utf-8", errors="ignore")
-    except Exception as exc:
-        print(f"[Upload] 텍스트 추출 실패 ({file_path}): {exc}")
-        return ""
-
-
 @router.post("/upload")
 async def upload_file(
+    response: Response,
     conversation_id: Optional[str] = Form(None),
     file: UploadFile = File(...)
 ):
@@ -71,29 +57,49 @@ async def upload_file(
             conversation = agent_manager.get_conversation(conversation_id)
             if not conversation:
                 raise HTTPException(status_code=404, detail="Conversation not found")
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 내용 해시로 한 번만 저장 (이름이 같은 다른 파일과 충돌하지 않음)
+        stored = await executors.run_io(upload_store.save, file.file, file.filename)
+        size_bytes = stored["size_bytes"]
 
-        file_text = _extract_text_from_file(file_path, file.content_type)
-        size_bytes = os.path.getsize(file_path)
         if conversation_id:
-            agent_manager.add_conversation_file(
+            existing = agent_manager.find_conversation_file(conversation_id, stored["sha256"])
+            if existing:
+                # 이미 추출·임베딩된 파일: 다시 처리하지 않음
+                return {
+                    "conversation_id": conversation_id,
+                    "filename": existing.get("filename"),
+                    "size_bytes": size_bytes,
+                    "status": "duplicate",
+                    "file_id": existing.get("id"),
+                    "sha256": stored["sha256"],
+                }
+            # 추출·임베딩은 ingest 풀에서 진행하고 작업 ID만 바로 반환
+            job = upload_ingestion.submit(
                 conversation_id,
                 filename=file.filename,
-                path=file_path,
+                path=stored["path"],
                 size_bytes=size_bytes,
-                text=file_text,
+                sha256=stored["sha256"],
             )
-        else:
-            # Legacy: 전역 uploaded_files 리스트만 갱신
-            current_files = agent_manager.get_context().get("uploaded_files", [])
-            filtered = [entry for entry in current_files if entry.get("filename") != file.filename]
-            relative_path = f"/static/uploads/{file.filename}"
-            filtered.append({"filename": file.filename, "path": relative_path})
-            if len(filtered) > 50:
-                filtered = filtered[-50:]
-            agent_manager.update_context("uploaded_files", filtered)
+            response.status_code = 202
+            return {
+                "conversation_id": conversation_id,
+                "filename": file.filename,
+                "size_bytes": size_bytes,
+                "status": "processing",
+                "job_id": job["job_id"],
+                "status_url": f"/api/uploads/{job['job_id']}",
+                "sha256": stored["sha256"],
+            }
+
+        # Legacy: 전역 uploaded_files 리스트만 갱신
+        current_files = agent_manager.get_context().get("uploaded_files", [])
+        filtered = [entry for entry in current_files if entry.get("filename") != file.filename]
+        relative_path = upload_store.static_path(stored["path"])
+        filtered.append({"filename": file.filename, "path": relative_path})
+        if len(filtered) > 50:
+            filtered = filtered[-50:]
+        agent_manager.update_context("uploaded_files", filtered)
 
         return {
             "conversation_id": conversation_id,
@@ -101,17 +107,106 @@ async def upload_file(
             "size_bytes": size_bytes,
             "status": "uploaded",
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/uploads/{job_id}")
+async def get_upload_job(job_id: str):
+    job = upload_ingestion.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
+
+@router.get("/uploads/{job_id}/events")
+async def upload_job_events(job_id: str):
+    # 업로드 작업 진행 상황 SSE: 현재 상태를 먼저 보내고 done/failed가 되면 종료
+    job = upload_ingestion.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+
+    async def event_generator():
+        async with conversation_events.subscribe(job["conversation_id"]) as updates:
+            # 구독 뒤에 다시 조회해야 그 사이의 변경을 놓치지 않음
+            current = upload_ingestion.get(job_id) or job
+            yield f"data: {json.dumps(current, ensure_ascii=False)}\n\n"
+            if current["status"] in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(updates.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                snapshot = event.get("job") or {}
+                if event.get("type") != "upload.progress" or snapshot.get("job_id") != job_id:
+                    continue
+                yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+                if snapshot.get("status") in TERMINAL_STATUSES:
+                    return
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+def _split_csv(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [item.strip() for item in header.split(",")]
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
 @router.get("/context")
-async def get_context():
-    return agent_manager.get_context()
+async def get_context(keys: Optional[str] = None):
+    # 전역 컨텍스트만 반환 (대화방은 /conversations 엔드포인트로 조회), keys=a,b로 일부만 선택
+    return agent_manager.get_context_summary(_split_csv(keys))
+
+@router.get("/metrics")
+async def get_metrics():
+    # 대화방 캐시 적중률·cold 복원 지연, write-behind 큐, executor 대기열 통계
+    return {
+        **agent_manager.metrics(),
+        "prompt": prompt_budget.stats(),
+        "prompt_cache": prompt_cache_stats.stats(),
+        "pdf_extraction": text_extractor.stats(),
+        "text_cache": extracted_text_cache.stats(),
+    }
 
 @router.get("/conversations")
-async def list_conversations():
-    # 대화방 목록(최근 업데이트 순)을 반환
-    return agent_manager.list_conversations()
+async def list_conversations(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    # 대화방 목록(최근 업데이트 순)을 한 페이지씩 반환, 다음 페이지 커서는 헤더로 전달
+    try:
+        items, next_cursor = agent_manager.list_conversations(limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+@router.get("/conversations/events")
+async def conversation_event_stream(conversation_id: Optional[str] = None):
+    # 대화방 변경(백그라운드 제목 생성 등) 알림 SSE, conversation_id를 주면 해당 대화방만
+    async def event_generator():
+        async with conversation_events.subscribe(conversation_id) as updates:
+            while True:
+                try:
+                    event = await asyncio.wait_for(updates.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 @router.post("/conversations")
 async def create_conversation(request: ConversationCreateRequest):
@@ -119,11 +214,41 @@ async def create_conversation(request: ConversationCreateRequest):
     return agent_manager.create_conversation(request.title)
 
 @router.get("/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str):
+async def get_conversation(
+    conversation_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    messages_since: Optional[str] = None,
+    include_file_text: bool = False,
+):
+    # fields=messages,title 처럼 필요한 필드만, messages_since 이후 메시지만 반환.
+    # 파일 본문/보고서 본문은 기본 제외 (/files, /reports에서 조회)
+    conversation = agent_manager.get_conversation(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    etag = agent_manager.conversation_etag(conversation, fields, messages_since, include_file_text)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return agent_manager.project_conversation(
+        conversation,
+        fields=_split_csv(fields),
+        messages_since=messages_since,
+        include_file_text=include_file_text,
+    )
+
+@router.get("/conversations/{conversation_id}/delta")
+async def get_conversation_delta(conversation_id: str, request: Request, response: Response, since: str):
+    # 폴링용: since(ISO 시각) 이후 추가된 메시지/파일/보고서와 현재 메타만 반환
     conversation = agent_manager.get_conversation(conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    etag = agent_manager.conversation_etag(conversation, "delta", since)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return agent_manager.get_conversation_delta(conversation_id, since)
 
 @router.get("/conversations/{conversation_id}/files")
 async def list_conversation_files(conversation_id: str):
@@ -156,10 +281,12 @@ async def run_agent(agent_type: str, request: AgentRequest):
     elif agent_type == "report":
         result = await agent_manager.run_report_agent(request.query, request.audience)
     elif agent_type == "custom":
+        # 통합 에이전트 탭은 명시적 실행이므로 라우팅 없이 네 모듈 모두 실행
         result = await agent_manager.run_custom_agent(
             request.query,
             focus_area=request.focus_area,
             audience=request.audience,
+            modules=["policy", "regulation", "risk", "report"],
         )
     else:
         raise HTTPException(status_code=404, detail="Agent type not found")
@@ -170,6 +297,80 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 import json
 
+# 첫 토큰 전 준비 단계(의도 분류, 에이전트 파이프라인, 파일 컨텍스트, RAG)의 공통 마감 시간(초, 0이면 무제한)
+CHAT_PREP_TIMEOUT = float(os.getenv("ESG_CHAT_PREP_TIMEOUT", "45"))
+# 스트림 응답이 끝난 뒤 백그라운드 제목 생성을 기다려 같은 스트림으로 알려 주는 최대 시간(초)
+TITLE_NOTIFY_WAIT = float(os.getenv("ESG_TITLE_NOTIFY_WAIT", "5"))
+# 이벤트 SSE 연결 유지용 주석 전송 간격(초)
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+
+class IntentAnalysis(BaseModel):
+    is_generation_request: bool = Field(description="True if user wants to CREATE/WRITE a report/checklist, False otherwise.")
+
+
+INTENT_SYSTEM_PROMPT = """
+        Analyze the user's latest query to determine if they want to GENERATE a new report, checklist, or document.
+        
+        True:
+        - "Make a safety report"
+        - "Generate a checklist for ESG"
+        - "Write a draft"
+        
+        False:
+        - "What is K-ESG?"
+        - "Summarize this file"
+        - "Explain the safety policy"
+        
+        Return JSON: {"is_generation_request": boolean}
+        """
+
+
+def _llm_generation_intent(query: str) -> bool:
+    """애매한 질문만 LLM으로 판별 (실패하면 예외를 올려 로컬 판별로 대체)"""
+    intent_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    structured_intent = intent_llm.with_structured_output(IntentAnalysis)
+    intent = structured_intent.invoke([
+        SystemMessage(content=INTENT_SYSTEM_PROMPT),
+        HumanMessage(content=query)
+    ])
+    return intent.is_generation_request
+
+
+def _detect_generation_intent(query: str) -> bool:
+    """보고서/체크리스트 생성 요청인지 분류 (로컬 분류기 우선, 임베딩 계산이 있으므로 executor에서 실행)"""
+    decision = intent_classifier.classify(query, escalate=_llm_generation_intent)
+    LOGGER.debug("생성 의도 판별: %s", decision)
+    return decision.is_generation_request
+
+
+async def _prepare_turn(
+    steps: Dict[str, Awaitable[Any]],
+    defaults: Dict[str, Any],
+    timeout: float = CHAT_PREP_TIMEOUT,
+) -> Dict[str, Any]:
+    """서로 독립적인 준비 작업을 동시에 실행하고 공통 마감 시간까지 기다린다.
+
+    마감 시간을 넘기거나 실패한 작업은 취소하고 defaults 값으로 대체하므로
+    첫 토큰까지의 시간은 가장 느린 작업(최대 timeout초)에 맞춰진다.
+    """
+    tasks = {name: asyncio.ensure_future(step) for name, step in steps.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout if timeout > 0 else None)
+    for task in pending:
+        task.cancel()
+    results: Dict[str, Any] = {}
+    for name, task in tasks.items():
+        if task in pending:
+            LOGGER.warning("채팅 준비 단계 %s가 %.1f초 안에 끝나지 않아 생략합니다.", name, timeout)
+            results[name] = defaults.get(name)
+        elif task.exception() is not None:
+            LOGGER.warning("채팅 준비 단계 %s 실패: %s", name, task.exception())
+            results[name] = defaults.get(name)
+        else:
+            results[name] = task.result()
+    return results
+
+
 @router.post("/chat")
 async def chat(request: ChatRequest):
     try:
@@ -186,63 +387,32 @@ async def chat(request: ChatRequest):
             conversation = agent_manager.create_conversation()
             conversation_id = conversation["id"]
 
-        history = agent_manager.get_conversation_history(conversation_id)
-        history_text = "\n".join(
-            [
-                f"User: {entry['content']}" if entry.get('role') == 'user' else f"Assistant: {entry['content']}"
-                for entry in history
-            ]
+        # 에이전트 파이프라인과 파일 컨텍스트/RAG 검색은 서로 독립적이므로 동시에 실행
+        prepared = await _prepare_turn(
+            {
+                "custom": agent_manager.run_custom_agent(request.query),
+                "file_context": executors.run_io(agent_manager.build_file_context, conversation_id),
+                "rag": executors.run_io(agent_manager.retrieve_conversation_snippets, conversation_id, request.query),
+                "memory": executors.run_io(agent_manager.get_conversation_memory, conversation_id, request.query),
+            },
+            {"custom": {}, "file_context": "", "rag": [], "memory": {}},
         )
+        custom_result = prepared["custom"]
+        memory = prepared["memory"]
 
-        custom_result = await agent_manager.run_custom_agent(request.query)
-
-        risk_assessment = context.get('risk_assessment')
-        risk_summary = str(risk_assessment)[:500] + "..." if risk_assessment else "None"
         file_summaries = agent_manager.list_conversation_files(conversation_id)
-        file_context = agent_manager.build_file_context(conversation_id)
-        file_names = [entry["filename"] for entry in file_summaries]
-        rag_snippets = agent_manager.retrieve_conversation_snippets(conversation_id, request.query)
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-        system_prompt = f"""
-        You are an expert ESG AI Assistant. Provide concise, tailored answers that reflect the user's goal and constraints.
-
-        [Current Context]
-        - Uploaded Files: {file_names if file_names else 'None'}
-        - Latest Regulation Updates: {str(context.get('regulation_updates'))[:500] + "..." if context.get('regulation_updates') else "None"}
-        - Policy Analysis: {context.get('policy_analysis', 'None')}
-        - Risk Assessment: {risk_summary}
-        - Report Draft: {context.get('report_draft', 'None')}
-        
-        [Conversation History]
-        {history_text if history_text else 'None'}
-
-        [Uploaded File Excerpts]
-        {file_context if file_context else 'None'}
-
-        [Retrieved Segments from Uploaded Files]
-        {rag_text}
-        
-
-        [Instructions]
-        - Start by tagging the user's goal/constraints in one line; if unclear, ask ONE short clarifying question, then proceed.
-        - Use evidence in this priority: Regulation Updates → Policy Analysis → Risk Assessment → Report Draft → Uploaded Files → Chat History; if absent, note '해당 근거 없음'.
-        - Keep internal reasoning to 3 short lines before responding.
-        - Do not invent numbers/dates absent from context; flag missing data explicitly. When giving numbers, cite the source inline. If regulation/policy is mentioned, add a one-line note that this is not legal advice.
-        - Tone: professional and friendly; keep sections 2–4 bullets/lines; keep the whole response concise (~200 words).
-        - Language follows the user (default Korean); avoid mixing languages. Use - or * for bullets, **bold** for emphasis, `code` for technical terms.
-        - If confidence is low, mark it (신뢰도: 높음/중간/낮음) and suggest what to check next (file/regulation/data).
-        - ALWAYS use MARKDOWN formatting.
-        - 업로드된 파일이나 검색된 세그먼트에서 중요 근거가 있으면 인용해 설명하라.
-        - 중요한 숫자·지표·정책명은 굵게 표시해 주목성을 높여라.
-        - 모르는 내용은 솔직하게 밝혀라
-        - 기본 언어는 한국어이지만, 사용자가 영어로 질문하면 동일 언어로 답하라.
-
-        If you don't know, say so and recommend running the appropriate agent (Regulation, Policy, Risk, Report)
-        """
+        # 섹션별 토큰 예산에 맞춰 컨텍스트를 자름 (기록이 길어도 프롬프트 크기 고정)
+        fitted = build_chat_context(
+            context,
+            file_names=[entry["filename"] for entry in file_summaries],
+            file_context=prepared["file_context"],
+            rag_snippets=prepared["rag"],
+            history=memory.get("recent", []),
+            summary=memory.get("summary", ""),
+            recalled=memory.get("recalled", []),
+        )
+        # 정적 지침을 앞에 두어 턴이 바뀌어도 provider 프롬프트 캐시가 적중하도록 배치
+        system_prompt = compose_system_prompt(CHAT_INSTRUCTIONS, fitted)
         
         # 3. Call LLM (GPT-4o)
         llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
@@ -251,15 +421,23 @@ async def chat(request: ChatRequest):
             HumanMessage(content=request.query)
         ]
 
-        # user/assistant 모두 서버 측에 기록
-        agent_manager.append_conversation_message(conversation_id, "user", request.query)
+        # user/assistant 모두 서버 측에 기록 (같은 대화방의 턴은 순서대로 처리)
+        async with agent_manager.conversation_turn(conversation_id):
+            agent_manager.append_conversation_message(conversation_id, "user", request.query)
 
-        response_msg = await llm.ainvoke(messages)
-        response_text = response_msg.content
+            response_msg = await llm.ainvoke(messages)
+            response_text = response_msg.content
+            prompt_cache_stats.record(response_msg)
 
-        agent_manager.append_conversation_message(conversation_id, "assistant", response_text)
+            agent_manager.append_conversation_message(conversation_id, "assistant", response_text)
 
-        return {"conversation_id": conversation_id, "response": response_text}
+        return {
+            "conversation_id": conversation_id,
+            "response": response_text,
+            # 이번 턴에 실행한/생략한 에이전트 모듈
+            "route": custom_result.get("route", []),
+            "skipped": custom_result.get("skipped", []),
+        }
         
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
@@ -281,44 +459,19 @@ async def chat_stream(request: ChatRequest):
             conversation = agent_manager.create_conversation()
             conversation_id = conversation["id"]
 
-        history = agent_manager.get_conversation_history(conversation_id)
-        history_text = "\n".join(
-            [
-                f"User: {entry['content']}" if entry.get('role') == 'user' else f"Assistant: {entry['content']}"
-                for entry in history
-            ]
+        # 2. Preparation (Intent Detection + Agents + File Context + RAG + Memory)
+        # 의도 분류와 에이전트 파이프라인, 검색은 서로 독립적이므로 공통 마감 시간 안에서 동시에 실행
+        prepared = await _prepare_turn(
+            {
+                "intent": executors.run_io(_detect_generation_intent, request.query),
+                "custom": agent_manager.run_custom_agent(request.query),
+                "file_context": executors.run_io(agent_manager.build_file_context, conversation_id),
+                "rag": executors.run_io(agent_manager.retrieve_conversation_snippets, conversation_id, request.query),
+                "memory": executors.run_io(agent_manager.get_conversation_memory, conversation_id, request.query),
+            },
+            {"intent": False, "custom": {}, "file_context": "", "rag": [], "memory": {}},
         )
-        # 2. Intent Detection (Report Logic)
-        # Check if the user specifically wants to *generate* or *create* a report/checklist/document.
-        class IntentAnalysis(BaseModel):
-            is_generation_request: bool = Field(description="True if user wants to CREATE/WRITE a report/checklist, False otherwise.")
-            
-        intent_system_prompt = """
-        Analyze the user's latest query to determine if they want to GENERATE a new report, checklist, or document.
-        
-        True:
-        - "Make a safety report"
-        - "Generate a checklist for ESG"
-        - "Write a draft"
-        
-        False:
-        - "What is K-ESG?"
-        - "Summarize this file"
-        - "Explain the safety policy"
-        
-        Return JSON: {"is_generation_request": boolean}
-        """
-        try:
-            intent_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-            structured_intent = intent_llm.with_structured_output(IntentAnalysis)
-            intent = structured_intent.invoke([
-                SystemMessage(content=intent_system_prompt),
-                HumanMessage(content=request.query)
-            ])
-            is_report_request = intent.is_generation_request
-        except Exception as e:
-            print(f"⚠️ Intent detection failed: {e}")
-            is_report_request = False
+        is_report_request = prepared["intent"]
 
         report_content = None
         report_error = None
@@ -348,29 +501,16 @@ async def chat_stream(request: ChatRequest):
                     material_issues: Optional[List[MaterialIssue]] = Field(default=None, description="List of material issues. Empty if custom format needed.")
                     custom_sections: List[ReportSection] = Field(description="Dynamic sections for specific topics.")
 
-                # Extract context from files (Using NEW Conversation File Logic ideally, but falling back to global for safety/compatibility)
-                # Ideally: agent_manager.get_conversation_files_with_text(conversation_id)
-                # But kept simpler for now to match previous logic structure
-                uploaded_files = context.get("uploaded_files", [])
+                # 이 대화방의 파일만 사용하고, 본문은 sha256으로 추출 텍스트 캐시에서 찾는다
+                # (전역 uploaded_files는 다른 대화방 파일까지 섞이고 매번 파일을 다시 파싱함)
+                file_texts = agent_manager.get_conversation_file_texts(conversation_id)
                 file_context_str = ""
-                
-                if uploaded_files:
-                    print(f"📂 Processing {len(uploaded_files)} files for report context...")
-                    import pypdf
-                    for text_file in uploaded_files: 
-                        try:
-                            fname = text_file.get("filename")
-                            fpath = os.path.join(UPLOAD_DIR, fname)
-                            content = ""
-                            if fname.lower().endswith(".pdf"):
-                                reader = pypdf.PdfReader(fpath)
-                                content = "\n".join([utils.extract_text() for utils in reader.pages])
-                            else:
-                                with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                                    content = f.read()
-                            file_context_str += f"\n=== File: {fname} ===\n{content[:100000]}\n" 
-                        except Exception as e:
-                            print(f"⚠️ Failed to read file {fname}: {e}")
+
+                if file_texts:
+                    print(f"📂 Processing {len(file_texts)} files for report context...")
+                    for fname, content in file_texts:
+                        if content:
+                            file_context_str += f"\n=== File: {fname} ===\n{content[:100000]}\n"
 
                 content_system_prompt = f"""
                 You are an expert ESG consultant (K-ESG).
@@ -417,56 +557,58 @@ async def chat_stream(request: ChatRequest):
                 report_error = f"Report Generation Error: {str(e)}"
         
         # 4. Standard Chat Context & Response
-        custom_result = await agent_manager.run_custom_agent(request.query)
-        risk_assessment = context.get('risk_assessment')
-        risk_summary = str(risk_assessment)[:500] + "..." if risk_assessment else "None"
-        
-        file_summaries = agent_manager.list_conversation_files(conversation_id)
-        file_context = agent_manager.build_file_context(conversation_id)
-        file_names = [entry["filename"] for entry in file_summaries]
-        rag_snippets = agent_manager.retrieve_conversation_snippets(conversation_id, request.query)
-        rag_text = "\n\n".join(rag_snippets) if rag_snippets else "None"
-
-        system_prompt = f"""
-        You are an expert ESG AI Assistant. Provide concise, tailored answers that reflect the user's goal and constraints.
-
-        [Current Context]
-        - Uploaded Files: {file_names if file_names else 'None'}
-        - Latest Regulation Updates: {str(context.get('regulation_updates'))[:500] + "..." if context.get('regulation_updates') else "None"}
-        - Policy Analysis: {context.get('policy_analysis', 'None')}
-        - Risk Assessment: {risk_summary}
-        - Report Draft: {context.get('report_draft', 'None')}
-        
-        [Uploaded File Excerpts]
-        {file_context if file_context else 'None'}
-
-
+        custom_result = prepared["custom"]
 
-        [Retrieved Segments from Uploaded Files]
-        {rag_text}
-
-        [Guidelines]
-        - 질문 의도에 맞춰 유연하게 Markdown을 사용하되, 필요하면 요약/근거/권고 등으로 자연스럽게 나눠라.
-        - Regulation 관련 질문에는 최신 규제 업데이트를 우선적으로 언급하라.
-        - 업로드 파일/검색된 세그먼트에서 나온 핵심 증거를 우선 인용하라.
-        - 주요 수치나 정책명은 **굵게** 표시해 강조하고, 근거가 부족하면 솔직히 말하고 어떤 에이전트를 호출해야 할지 제안하라.
-        - 기본 언어는 한국어이며, 사용자가 영어로 질문하면 영어로 답하라.
+        file_summaries = agent_manager.list_conversation_files(conversation_id)
+        # 섹션별 토큰 예산에 맞춰 컨텍스트를 자름
+        fitted = build_chat_context(
+            context,
+            file_names=[entry["filename"] for entry in file_summaries],
+            file_context=prepared["file_context"],
+            rag_snippets=prepared["rag"],
+            history=prepared["memory"].get("recent", []),
+            summary=prepared["memory"].get("summary", ""),
+            recalled=prepared["memory"].get("recalled", []),
+        )
 
-        """
-        
+        notes = []
         if report_content:
-             system_prompt += "\n[System Note]\nA report has just been generated and displayed to the user. Briefly mention this in your response."
+            notes.append("A report has just been generated and displayed to the user. Briefly mention this in your response.")
+        # 대화 기억이 일정 크기로 제한되므로 스트림 프롬프트에도 요약·최근 기록을 넣는다
+        system_prompt = compose_system_prompt(STREAM_GUIDELINES, fitted, notes=notes)
 
-        llm = ChatOpenAI(model="gpt-4o", temperature=0.5, streaming=True)
+        # stream_usage: 마지막 청크에 usage(캐시 적중 토큰 포함)를 받아 집계
+        llm = ChatOpenAI(model="gpt-4o", temperature=0.5, streaming=True, stream_usage=True)
         messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=request.query)
         ]
 
-        agent_manager.append_conversation_message(conversation_id, "user", request.query)
         assistant_buffer = {"text": ""}
 
         async def event_generator():
+            async with conversation_events.subscribe(conversation_id) as updates:
+                # 같은 대화방에 중복 전송된 메시지는 앞 턴의 응답 저장이 끝난 뒤 처리
+                async with agent_manager.conversation_turn(conversation_id):
+                    async for event in _stream_turn():
+                        yield event
+                # 첫 메시지면 LLM 제목이 백그라운드에서 생성 중: 잠시 기다렸다가 같은 스트림으로 알림
+                # (늦게 끝나면 /conversations/events 구독자에게만 전달)
+                await agent_manager.wait_for_title(conversation_id, TITLE_NOTIFY_WAIT)
+                # 턴 동안 쌓인 알림: 대화방 변경은 conversation_updated, 업로드 진행은 작업별 최신
+                # 상태만 upload_progress로 보낸다 (그 밖의 알림은 /conversations/events에서만)
+                progress = {}
+                while not updates.empty():
+                    update = updates.get_nowait()
+                    if update.get("type") == "conversation.updated":
+                        yield f"data: {json.dumps({'conversation_updated': update})}\n\n"
+                    elif update.get("type") == "upload.progress":
+                        progress[update["job"]["job_id"]] = update["job"]
+                for job in progress.values():
+                    yield f"data: {json.dumps({'upload_progress': job})}\n\n"
+
+        async def _stream_turn():
+            agent_manager.append_conversation_message(conversation_id, "user", request.query)
             try:
                 if report_content:
                      # Save the report to the conversation
@@ -476,7 +618,7 @@ async def chat_stream(request: ChatRequest):
                             "title": request.query[:20] + ("..." if len(request.query) > 20 else ""), # Simple title derivation
                             "content": report_content,
                             "items": [], # Populate if structured data available, else empty
-                            "created_at": datetime.now().isoformat()
+                            "created_at": datetime.now(timezone.utc).isoformat()
                         }
                         agent_manager.add_conversation_report(conversation_id, report_to_save)
                     except Exception as e:
@@ -503,6 +645,7 @@ async def chat_stream(request: ChatRequest):
                     ]
 
                     async for chunk in llm.astream(confirmation_messages):
+                        prompt_cache_stats.record(chunk)
                         token = chunk.content or ""
                         if token:
                             assistant_buffer["text"] += token
@@ -513,6 +656,7 @@ async def chat_stream(request: ChatRequest):
                         yield f"data: {json.dumps({'error': report_error})}\n\n"
                     
                     async for chunk in llm.astream(messages):
+                        prompt_cache_stats.record(chunk)
                         token = chunk.content or ""
                         if token:
                             assistant_buffer["text"] += token
@@ -523,7 +667,13 @@ async def chat_stream(request: ChatRequest):
                     "assistant",
                     assistant_buffer["text"],
                 )
-                yield f"data: {json.dumps({'done': True, 'conversation_id': conversation_id})}\n\n"
+                done_event = {
+                    'done': True,
+                    'conversation_id': conversation_id,
+                    'route': custom_result.get('route', []),
+                    'skipped': custom_result.get('skipped', []),
+                }
+                yield f"data: {json.dumps(done_event)}\n\n"
             except Exception as exc:
                 yield f"data: {json.dumps({'error': str(exc)})}\n\n"
 
@@ -533,4 +683,3 @@ async def chat_stream(request: ChatRequest):
         traceback.print_exc()
         print(f"❌ [API Error] {exc}")
         raise HTTPException(status_code=500, detail=str(exc))
-LOGGER = logging.getLogger(__name__)
@@ -0,0 +1,150 @@
+"""보고서 본문·업로드 파일 텍스트를 담는 content-addressed blob 저장소.
+
+대화방에는 ``sha256:<hex>`` 참조만 남기고 본문은 여기에 한 번만 저장한다.
+같은 보고서/파일이 여러 대화방에 올라와도 해시가 같으므로 중복 저장되지 않고,
+본문은 API가 실제로 필요할 때(get_text) 읽는다.
+
+- ESG_BLOB_BACKEND: auto(kv_store가 Redis면 Redis, 아니면 로컬 디스크) | redis | local
+- ESG_BLOB_DIR: 로컬 디스크 저장 경로 (기본 state/blobs, /static으로 공개되는 data/ 밖)
+
+blob은 여러 대화방이 공유할 수 있으므로 대화방 삭제 시 함께 지우지 않는다.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+try:
+    import redis  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+from backend.kv_store import KEY_PREFIX, REDIS_URL, RedisKVStore, kv_store
+from backend.serialization import payload_codec
+
+LOGGER = logging.getLogger(__name__)
+BLOB_BACKEND = os.getenv("ESG_BLOB_BACKEND", "auto").lower()
+BLOB_DIR = os.getenv(
+    "ESG_BLOB_DIR",
+    str(Path(__file__).resolve().parent.parent / "state" / "blobs"),
+)
+REF_PREFIX = "sha256:"
+
+
+def content_ref(text: str) -> str:
+    return REF_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _digest(ref: str) -> Optional[str]:
+    if not ref or not ref.startswith(REF_PREFIX):
+        return None
+    digest = ref[len(REF_PREFIX):]
+    if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+        return None
+    return digest
+
+
+class LocalBlobStore:
+    """``{root}/ab/abcdef...`` 파일로 저장 (임시 파일 → rename으로 원자적 기록)"""
+
+    def __init__(self, root: str = BLOB_DIR) -> None:
+        self._root = Path(root)
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def _path(self, digest: str) -> Path:
+        return self._root / digest[:2] / digest
+
+    def put_text(self, text: str) -> Optional[str]:
+        ref = content_ref(text)
+        path = self._path(_digest(ref))
+        if path.exists():
+            return ref
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload_codec.dumps(text))
+            os.replace(tmp_path, path)
+            return ref
+        except OSError as exc:
+            LOGGER.error("blob 저장 실패(%s): %s", path, exc)
+            return None
+
+    def get_text(self, ref: str) -> Optional[str]:
+        digest = _digest(ref)
+        if digest is None:
+            return None
+        try:
+            return payload_codec.loads(self._path(digest).read_bytes())
+        except FileNotFoundError:
+            LOGGER.warning("blob을 찾을 수 없습니다: %s", ref)
+            return None
+        except (OSError, ValueError) as exc:
+            LOGGER.error("blob 읽기 실패(%s): %s", ref, exc)
+            return None
+
+
+class RedisBlobStore:
+    """``{prefix}:blob:{sha256}`` 키에 SET NX로 저장 (이미 있으면 덮어쓰지 않음)"""
+
+    def __init__(self) -> None:
+        self._client: Optional["redis.Redis"] = None
+        if redis is None:
+            return
+        try:
+            self._client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
+            self._client.ping()
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.info("Redis blob 저장소 연결 실패: %s", exc)
+            self._client = None
+
+    @property
+    def available(self) -> bool:
+        return self._client is not None
+
+    @staticmethod
+    def _key(digest: str) -> str:
+        return f"{KEY_PREFIX}:blob:{digest}"
+
+    def put_text(self, text: str) -> Optional[str]:
+        if not self._client:
+            return None
+        ref = content_ref(text)
+        try:
+            self._client.set(self._key(_digest(ref)), payload_codec.dumps(text), nx=True)
+            return ref
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.error("Redis blob 저장 실패: %s", exc)
+            return None
+
+    def get_text(self, ref: str) -> Optional[str]:
+        digest = _digest(ref)
+        if digest is None or not self._client:
+            return None
+        try:
+            raw = self._client.get(self._key(digest))
+            return payload_codec.loads(raw) if raw is not None else None
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.error("Redis blob 읽기 실패(%s): %s", ref, exc)
+            return None
+
+
+def _create_blob_store():
+    """ESG_BLOB_BACKEND 설정에 따라 저장소 선택 (auto: 상태 저장소와 같은 곳에 둔다)"""
+    use_redis = BLOB_BACKEND == "redis" or (
+        BLOB_BACKEND == "auto" and isinstance(kv_store, RedisKVStore) and kv_store.available
+    )
+    if use_redis:
+        store = RedisBlobStore()
+        if store.available or BLOB_BACKEND == "redis":
+            return store
+    return LocalBlobStore()
+
+
+blob_store = _create_blob_store()
@@ -0,0 +1,286 @@
+"""최근 대화방은 메모리(LRU)에, 오래 안 쓴 대화방은 압축해 디스크(cold)에 두는 2단 캐시.
+
+- hot: OrderedDict LRU. 대화방 크기 추정치 합이 ESG_HOT_CACHE_BYTES 또는
+  개수가 ESG_HOT_CACHE_MAX를 넘으면 가장 오래 안 쓴 대화방부터 cold로 내린다.
+- cold: payload_codec으로 압축한 파일 (``{ESG_COLD_DIR}/{pid}/{sha1(id)}-{seq}``). 접근 시 hot으로 복원.
+  파일 읽기/쓰기는 캐시 전체 잠금 밖에서 한다 (다른 대화방 조회를 막지 않도록).
+
+원본은 kv_store이고 cold는 이 프로세스의 캐시이므로 기동/종료 시 비운다.
+cold로 내린 뒤에도 write-behind에 남은 변경이 사라지지 않도록, 저장소에서 다시
+읽지 않고 cold 파일에서 그대로 복원한다.
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.conversation_locks import ConversationLocks
+from backend.serialization import payload_codec
+
+LOGGER = logging.getLogger(__name__)
+HOT_CACHE_BYTES = int(os.getenv("ESG_HOT_CACHE_BYTES", str(64 * 1024 * 1024)))
+HOT_CACHE_MAX = int(os.getenv("ESG_HOT_CACHE_MAX", "500"))
+COLD_DIR = os.getenv(
+    "ESG_COLD_DIR",
+    str(Path(__file__).resolve().parent.parent / "state" / "cold"),
+)
+
+_ITEM_OVERHEAD = 128
+_CONVERSATION_OVERHEAD = 512
+
+
+def estimate_size(conversation: Dict[str, Any]) -> int:
+    """메모리 사용량 근사치: 항목 문자열 길이 + 항목당 고정 오버헤드"""
+    size = _CONVERSATION_OVERHEAD
+    for field in ("messages", "files", "reports"):
+        for item in conversation.get(field) or []:
+            size += _ITEM_OVERHEAD + sum(len(value) for value in item.values() if isinstance(value, str))
+    return size
+
+
+class TieredConversationCache:
+    """AgentManager의 대화방 캐시 (hot LRU + 압축 cold 파일)"""
+
+    def __init__(
+        self,
+        locks: ConversationLocks,
+        *,
+        max_bytes: int = HOT_CACHE_BYTES,
+        max_items: int = HOT_CACHE_MAX,
+        cold_dir: str = COLD_DIR,
+    ) -> None:
+        # 변경 중인 대화방은 내리지 않도록 대화방별 잠금을 확인한다
+        self._locks = locks
+        self._max_bytes = max_bytes
+        self._max_items = max_items
+        self._cold_dir = Path(cold_dir) / str(os.getpid())
+        shutil.rmtree(self._cold_dir, ignore_errors=True)
+        self._lock = threading.Lock()
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._hot_bytes = 0
+        # conversation_id -> (cold 파일 경로, 압축 크기)
+        self._cold: Dict[str, Tuple[Path, int]] = {}
+        # 잠금 밖에서 cold 파일을 읽는 중인 대화방: 같은 대화방 조회는 Event를 기다린다.
+        # 그 사이 put/pop이 오면 "stale"로 표시해 읽은 (이전) 내용을 버린다.
+        self._loading: Dict[str, Dict[str, Any]] = {}
+        # 잠금 밖에서 cold 파일로 쓰는 중인 대화방
+        self._spilling: Set[str] = set()
+        self._seq = itertools.count()
+        self._stats = {
+            "hits": 0,
+            "cold_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "rehydrate_ms_total": 0.0,
+            "rehydrate_ms_max": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # 조회/갱신
+    # ------------------------------------------------------------------
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """hot → cold 순으로 찾고, 둘 다 없으면 None (호출 측이 저장소에서 읽어 put)"""
+        while True:
+            with self._lock:
+                conversation = self._hot.get(conversation_id)
+                if conversation is not None:
+                    self._hot.move_to_end(conversation_id)
+                    self._stats["hits"] += 1
+                    return conversation
+                loading = self._loading.get(conversation_id)
+                if loading is None:
+                    cold = self._cold.pop(conversation_id, None)
+                    if cold is None:
+                        self._stats["misses"] += 1
+                        return None
+                    loading = {"event": threading.Event(), "stale": False}
+                    self._loading[conversation_id] = loading
+                    break
+            # 다른 스레드가 같은 대화방을 복원 중: 끝난 뒤 hot부터 다시 본다
+            loading["event"].wait()
+
+        started = time.perf_counter()
+        conversation = None
+        try:
+            conversation = self._read_cold(conversation_id, cold[0])
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                del self._loading[conversation_id]
+                if loading["stale"]:
+                    # 읽는 동안 put(더 새 내용) 또는 pop(삭제)이 왔다
+                    conversation = self._hot.get(conversation_id)
+                elif conversation is not None:
+                    self._stats["cold_hits"] += 1
+                    self._stats["rehydrate_ms_total"] += elapsed_ms
+                    self._stats["rehydrate_ms_max"] = max(self._stats["rehydrate_ms_max"], elapsed_ms)
+                    self._insert(conversation_id, conversation)
+                if conversation is None:
+                    self._stats["misses"] += 1
+                # hot에 넣은 뒤 깨워야 기다리던 조회가 저장소로 가지 않는다
+                loading["event"].set()
+        self._evict()
+        return conversation
+
+    def peek(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """hot에 있을 때만 반환 (LRU 순서/통계 변경 없음)"""
+        with self._lock:
+            return self._hot.get(conversation_id)
+
+    def put(self, conversation_id: str, conversation: Dict[str, Any]) -> None:
+        with self._lock:
+            stale = self._discard_cold(conversation_id)
+            self._insert(conversation_id, conversation)
+        self._unlink(stale)
+        self._evict()
+
+    def touch(self, conversation_id: str) -> None:
+        """대화방이 변경된 뒤 호출: 크기 추정치를 다시 계산하고 최근 사용으로 표시"""
+        with self._lock:
+            conversation = self._hot.get(conversation_id)
+            if conversation is None:
+                return
+            self._insert(conversation_id, conversation)
+        self._evict()
+
+    def pop(self, conversation_id: str) -> None:
+        with self._lock:
+            if conversation_id in self._hot:
+                del self._hot[conversation_id]
+                self._hot_bytes -= self._sizes.pop(conversation_id, 0)
+            stale = self._discard_cold(conversation_id)
+        self._unlink(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            lookups = stats["hits"] + stats["cold_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["hits"] + stats["cold_hits"]) / lookups if lookups else 0.0
+            stats["hot_hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["rehydrate_ms_avg"] = (
+                stats["rehydrate_ms_total"] / stats["cold_hits"] if stats["cold_hits"] else 0.0
+            )
+            stats.update(
+                hot_count=len(self._hot),
+                hot_bytes=self._hot_bytes,
+                hot_max_bytes=self._max_bytes,
+                cold_count=len(self._cold),
+                cold_bytes=sum(size for _, size in self._cold.values()),
+            )
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._cold.clear()
+        shutil.rmtree(self._cold_dir, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # 내부 구현
+    # ------------------------------------------------------------------
+    def _insert(self, conversation_id: str, conversation: Dict[str, Any]) -> None:
+        # self._lock 보유 상태에서 호출
+        size = estimate_size(conversation)
+        self._hot_bytes += size - self._sizes.get(conversation_id, 0)
+        self._sizes[conversation_id] = size
+        self._hot[conversation_id] = conversation
+        self._hot.move_to_end(conversation_id)
+
+    def _over_budget(self) -> bool:
+        return self._hot_bytes > self._max_bytes or len(self._hot) > self._max_items
+
+    def _evict(self) -> None:
+        """예산을 넘으면 오래된 대화방부터 cold로 내린다 (self._lock 없이 호출).
+
+        희생 대상 선택만 잠금 안에서 하고, 직렬화/파일 쓰기는 잠금 밖에서 대상 대화방의
+        mutation 잠금을 쥔 채 한다. 현재 스레드가 변경 중인 대화방(재진입 잠금 보유)은 건너뛴다.
+        """
+        skipped: List[str] = []
+        while True:
+            with self._lock:
+                if not self._over_budget():
+                    return
+                victim = None
+                # 방금 사용한(가장 최근) 대화방은 남긴다
+                for conversation_id in list(self._hot)[:-1]:
+                    if conversation_id in self._spilling or conversation_id in skipped:
+                        continue
+                    lock = self._locks.mutation(conversation_id)
+                    if lock.owned_by_current_thread() or not lock.acquire(blocking=False):
+                        skipped.append(conversation_id)
+                        continue
+                    victim = (conversation_id, self._hot[conversation_id], lock)
+                    self._spilling.add(conversation_id)
+                    break
+                if victim is None:
+                    return
+            conversation_id, conversation, lock = victim
+            try:
+                cold = self._spill(conversation_id, conversation)
+                stale = None
+                with self._lock:
+                    self._spilling.discard(conversation_id)
+                    if cold is None:
+                        skipped.append(conversation_id)
+                    elif self._hot.get(conversation_id) is conversation:
+                        del self._hot[conversation_id]
+                        self._hot_bytes -= self._sizes.pop(conversation_id, 0)
+                        self._cold[conversation_id] = cold
+                        self._stats["evictions"] += 1
+                    else:
+                        # 쓰는 동안 다른 내용으로 바뀌었거나 삭제됐다
+                        stale = cold[0]
+                self._unlink(stale)
+            finally:
+                lock.release()
+
+    def _cold_path(self, conversation_id: str) -> Path:
+        # 대화방 ID를 그대로 파일명으로 쓰지 않는다 (경로 문자 방지).
+        # 내릴 때마다 새 파일을 써서 잠금 밖의 unlink가 더 새 파일을 지우지 않게 한다.
+        digest = hashlib.sha1(conversation_id.encode("utf-8")).hexdigest()
+        return self._cold_dir / f"{digest}-{next(self._seq)}"
+
+    def _spill(self, conversation_id: str, conversation: Dict[str, Any]) -> Optional[Tuple[Path, int]]:
+        path = self._cold_path(conversation_id)
+        try:
+            payload = payload_codec.dumps(conversation)
+            self._cold_dir.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(payload)
+        except (OSError, TypeError, ValueError) as exc:
+            # cold 저장에 실패하면 메모리에 그대로 둔다 (예산 초과를 감수)
+            LOGGER.warning("대화방 cold 저장 실패(%s): %s", conversation_id, exc)
+            return None
+        return path, len(payload)
+
+    def _read_cold(self, conversation_id: str, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            conversation = payload_codec.loads(path.read_bytes())
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("대화방 cold 복원 실패(%s): %s", conversation_id, exc)
+            conversation = None
+        self._unlink(path)
+        return conversation
+
+    def _discard_cold(self, conversation_id: str) -> Optional[Path]:
+        # self._lock 보유 상태에서 호출. 지울 파일은 호출 측이 잠금 밖에서 _unlink
+        loading = self._loading.get(conversation_id)
+        if loading is not None:
+            loading["stale"] = True
+        cold = self._cold.pop(conversation_id, None)
+        return cold[0] if cold is not None else None
+
+    @staticmethod
+    def _unlink(path: Optional[Path]) -> None:
+        if path is None:
+            return
+        try:
+            path.unlink()
+        except OSError:
+            pass
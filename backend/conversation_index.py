@@ -0,0 +1,79 @@
+import base64
+import bisect
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# (updated_at, id) 오름차순. 최신 순 조회는 뒤에서부터 읽는다
+_SortKey = Tuple[str, str]
+
+
+def encode_cursor(key: _SortKey) -> str:
+    raw = json.dumps(list(key), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> _SortKey:
+    try:
+        updated_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(updated_at), str(conversation_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+class ConversationIndex:
+    """updated_at 기준으로 정렬된 대화방 목록 + 미리보기 캐시.
+
+    append_conversation_message 등에서 upsert로 갱신하고, 목록 API는
+    page()로 커서 이후 limit개만 잘라 읽으므로 전체 정렬이 필요 없다.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._keys: List[_SortKey] = []
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._summaries
+
+    @staticmethod
+    def _key(summary: Dict[str, Any]) -> _SortKey:
+        return summary.get("updated_at") or "", summary["id"]
+
+    def _remove_key(self, summary: Dict[str, Any]) -> None:
+        key = self._key(summary)
+        pos = bisect.bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            del self._keys[pos]
+
+    def upsert(self, summary: Dict[str, Any]) -> None:
+        with self._lock:
+            previous = self._summaries.get(summary["id"])
+            if previous is not None:
+                self._remove_key(previous)
+            self._summaries[summary["id"]] = summary
+            bisect.insort(self._keys, self._key(summary))
+
+    def remove(self, conversation_id: str) -> None:
+        with self._lock:
+            previous = self._summaries.pop(conversation_id, None)
+            if previous is not None:
+                self._remove_key(previous)
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self._summaries.get(conversation_id)
+
+    def page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """최신 순으로 cursor 다음부터 limit개 반환. 더 있으면 다음 커서도 함께 반환"""
+        with self._lock:
+            end = len(self._keys)
+            if cursor:
+                end = bisect.bisect_left(self._keys, decode_cursor(cursor))
+            start = 0 if limit is None else max(end - limit, 0)
+            keys = self._keys[start:end]
+            items = [dict(self._summaries[conversation_id]) for _, conversation_id in reversed(keys)]
+        next_cursor = encode_cursor(keys[0]) if keys and start > 0 else None
+        return items, next_cursor
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+
+class MutationLock:
+    """소유 스레드를 기록하는 재진입 잠금 (threading.RLock 래퍼).
+
+    캐시 eviction은 비차단 acquire로 변경 중인 대화방을 건너뛰는데, RLock은 이미 잡고 있는
+    스레드에게 다시 성공하므로 ``owned_by_current_thread``로 따로 구분한다.
+    """
+
+    __slots__ = ("_lock", "_owner", "_depth", "__weakref__")
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._owner: Optional[int] = None
+        self._depth = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        self._owner = threading.get_ident()
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+        self._lock.release()
+
+    def owned_by_current_thread(self) -> bool:
+        return self._owner == threading.get_ident()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class ConversationLocks:
+    """대화방별 잠금 레지스트리.
+
+    - ``mutation(id)``: 메시지/파일/보고서 추가 등 짧은 상태 변경을 직렬화하는
+      재진입 잠금(MutationLock). 이벤트 루프와 executor 스레드 어느 쪽에서 호출해도 동작한다.
+    - ``turn(id)``: 한 대화방의 채팅 턴(사용자 메시지 → 응답 저장)을 순서대로
+      처리하기 위한 asyncio.Lock. 다른 대화방은 서로 기다리지 않는다.
+
+    잠금은 WeakValueDictionary에 보관하므로 쓰는 곳이 없으면 자동으로 정리된다.
+    """
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._mutation_locks: "weakref.WeakValueDictionary[str, MutationLock]" = weakref.WeakValueDictionary()
+        self._turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def mutation(self, conversation_id: str) -> MutationLock:
+        with self._guard:
+            lock = self._mutation_locks.get(conversation_id)
+            if lock is None:
+                lock = MutationLock()
+                self._mutation_locks[conversation_id] = lock
+            return lock
+
+    def turn_lock(self, conversation_id: str) -> asyncio.Lock:
+        with self._guard:
+            lock = self._turn_locks.get(conversation_id)
+            if lock is None:
+                lock = asyncio.Lock()
+                self._turn_locks[conversation_id] = lock
+            return lock
+
+    @asynccontextmanager
+    async def turn(self, conversation_id: str) -> AsyncIterator[None]:
+        lock = self.turn_lock(conversation_id)
+        async with lock:
+            yield
@@ -0,0 +1,152 @@
+"""대화방 기억: 최근 N턴 원문 + 오래된 턴의 누적 요약 + 관련 과거 턴 검색.
+
+프롬프트에 대화 전체를 넣지 않고 다음 세 가지만 넣어, 대화가 길어져도 크기가 일정하다.
+
+- recent: 마지막 ESG_MEMORY_RECENT_TURNS 턴(사용자+응답)을 원문 그대로
+- summary: 그보다 오래된 메시지의 누적 요약. 요약되지 않은 메시지가
+  ESG_MEMORY_SUMMARY_BATCH개 이상 쌓이면 이전 요약 + 새 메시지로 다시 요약 (gpt-4o-mini)
+- recalled: 지난 턴을 대화방 벡터 저장소(memory 컬렉션)에 임베딩해 두고,
+  현재 질문과 관련된 오래된 턴만 ESG_MEMORY_RECALL_K개 검색
+
+요약/임베딩은 응답 저장 뒤 background 풀에서 실행한다. 진행 위치와 요약은 대화방 메타
+(memory_summary, memory_summarized_through, memory_indexed_through)로 저장되어
+재시작 후에도 이어지며, 이 기능 이전의 긴 대화방도 다음 턴에 나눠서 채워진다.
+"""
+
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+LOGGER = logging.getLogger(__name__)
+RECENT_TURNS = int(os.getenv("ESG_MEMORY_RECENT_TURNS", "6"))
+SUMMARY_BATCH = int(os.getenv("ESG_MEMORY_SUMMARY_BATCH", "6"))
+RECALL_K = int(os.getenv("ESG_MEMORY_RECALL_K", "3"))
+SUMMARY_MAX_CHARS = 1500
+# 한 번의 요약 호출에 넣는 최대 메시지 수 (기존 긴 대화는 여러 번에 나눠 요약)
+SUMMARY_CHUNK = 40
+
+SUMMARY_FIELD = "memory_summary"
+# 요약에 반영된 메시지 수 (messages[:n]까지 요약됨)
+SUMMARIZED_FIELD = "memory_summarized_through"
+# memory 컬렉션에 임베딩된 메시지 수 (이전 대화방은 다음 턴에 한꺼번에 채워짐)
+INDEXED_FIELD = "memory_indexed_through"
+
+_SUMMARY_PROMPT = (
+    "너는 ESG 상담 대화의 기억을 관리하는 비서야. 기존 요약과 새로 추가된 대화를 합쳐 "
+    "사용자의 목표, 회사/사업 정보, 확인된 수치·규제·결정 사항, 남은 질문을 한국어 글머리표로 "
+    "간결하게 정리해. 새 대화에 없는 내용을 지어내지 말고 1000자 이내로 답해."
+)
+
+
+def _format_turn(user_text: str, assistant_text: str) -> str:
+    return f"User: {user_text}\nAssistant: {assistant_text}"
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        vectorstore: Callable[..., Any],
+        *,
+        recent_turns: int = RECENT_TURNS,
+        summary_batch: int = SUMMARY_BATCH,
+        recall_k: int = RECALL_K,
+    ) -> None:
+        # (대화방 ID, create=) → memory 컬렉션 (Chroma, create=False면 없을 때 None)
+        self._vectorstore = vectorstore
+        self._recent_messages = max(recent_turns, 1) * 2
+        self._summary_batch = summary_batch
+        self._recall_k = recall_k
+        self._summary_llm: Optional[ChatOpenAI] = None
+
+    # ------------------------------------------------------------------
+    # 프롬프트용 조회
+    # ------------------------------------------------------------------
+    def context(self, conversation: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """프롬프트에 넣을 기억: summary(문자열), recalled(과거 턴 문자열 리스트), recent(메시지 리스트)"""
+        messages = conversation.get("messages", [])
+        cutoff = max(len(messages) - self._recent_messages, 0)
+        return {
+            "summary": conversation.get(SUMMARY_FIELD, "") or "",
+            "recalled": self.recall(conversation["id"], query, before=cutoff) if cutoff else [],
+            "recent": messages[cutoff:],
+        }
+
+    def recall(self, conversation_id: str, query: str, *, before: int) -> List[str]:
+        """messages[:before] 범위의 턴 중 query와 관련된 것 (오래된 순)"""
+        if self._recall_k <= 0 or not query:
+            return []
+        try:
+            vectorstore = self._vectorstore(conversation_id, create=False)
+            if vectorstore is None:
+                return []
+            docs = vectorstore.similarity_search(query, k=self._recall_k, filter={"turn": {"$lt": before}})
+        except Exception as exc:  # pragma: no cover - 컬렉션이 비었거나 검색 실패
+            LOGGER.debug("대화 기억 검색 실패(%s): %s", conversation_id, exc)
+            return []
+        docs.sort(key=lambda doc: doc.metadata.get("turn", 0))
+        return [doc.page_content for doc in docs]
+
+    # ------------------------------------------------------------------
+    # 턴이 끝난 뒤 갱신 (background 풀에서 호출)
+    # ------------------------------------------------------------------
+    def remember(self, conversation_id: str, messages: List[Dict[str, Any]], start: int) -> int:
+        """messages[start:]의 완료된 턴(질문+응답)을 한 문서씩 memory 컬렉션에 임베딩.
+
+        다음에 이어서 임베딩할 위치(응답이 아직 없는 마지막 질문 또는 끝)를 반환한다.
+        문서 ID가 턴 위치로 정해지므로 다시 넣어도 중복되지 않는다.
+        """
+        texts, metadatas, ids = [], [], []
+        index = start
+        resume = len(messages)
+        while index < len(messages):
+            entry = messages[index]
+            if entry.get("role") != "user":
+                index += 1
+                continue
+            if index + 1 >= len(messages):
+                resume = index
+                break
+            reply = messages[index + 1]
+            if reply.get("role") == "assistant":
+                texts.append(_format_turn(entry.get("content", ""), reply.get("content", "")))
+                metadatas.append({"turn": index})
+                ids.append(f"turn-{index}")
+                index += 2
+            else:
+                index += 1
+        if texts:
+            self._vectorstore(conversation_id).add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        return resume
+
+    def pending_summary(self, conversation: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """새로 요약할 메시지 범위 (start, end) 또는 None (최근 N턴은 요약하지 않음)"""
+        messages = conversation.get("messages", [])
+        start = int(conversation.get(SUMMARIZED_FIELD) or 0)
+        end = len(messages) - self._recent_messages
+        if end - start < self._summary_batch:
+            return None
+        return start, min(end, start + SUMMARY_CHUNK)
+
+    def summarize(self, previous: str, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """이전 요약 + 새 메시지로 갱신한 요약 (실패하면 None, 다음 턴에 다시 시도)"""
+        lines = [
+            f"{'User' if entry.get('role') == 'user' else 'Assistant'}: {entry.get('content', '')}"
+            for entry in messages
+        ]
+        try:
+            if self._summary_llm is None:
+                self._summary_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=600)
+            response = self._summary_llm.invoke(
+                [
+                    SystemMessage(content=_SUMMARY_PROMPT),
+                    HumanMessage(content=f"[기존 요약]\n{previous or '없음'}\n\n[새 대화]\n" + "\n".join(lines)),
+                ]
+            )
+        except Exception as exc:
+            LOGGER.warning("대화 요약 LLM 호출 실패: %s", exc)
+            return None
+        summary = (response.content or "").strip()
+        return summary[:SUMMARY_MAX_CHARS] or None
@@ -0,0 +1,177 @@
+"""대화방 벡터 저장소: 공유 Chroma 클라이언트 하나 + 컬렉션 핸들 LRU.
+
+예전에는 업로드·채팅 턴마다 ``vector_db/conversations/<id>``에 새 Chroma 객체(클라이언트 포함)를
+만들었다. 이제는 ``vector_db/conversations/shared``의 PersistentClient 하나에 대화방별 컬렉션
+(``convo_<id>``: 업로드 파일 청크, ``memory_<id>``: 지난 대화 턴)을 두고, 최근에 쓴 컬렉션
+핸들을 ESG_VECTOR_HANDLES개까지 재사용한다.
+
+- 존재를 확인한 컬렉션 이름은 메모리에 들고 있어 다시 확인하지 않는다. 모르는 이름은
+  조회 때마다 클라이언트에 물어, 다른 워커가 만든 컬렉션도 바로 보인다.
+- 예전 디렉터리에만 있는 컬렉션은 처음 쓸 때 임베딩째 공유 클라이언트로 복사한다
+  (다시 임베딩하지 않음). 예전 디렉터리는 대화방마다 한 번만 열고, 대화방을 삭제할 때만 지운다.
+
+여러 워커 프로세스가 같은 디렉터리를 열면 각자 클라이언트와 핸들 LRU를 가지며, 컬렉션 목록은
+위와 같이 공유 디렉터리의 상태를 따른다. 다른 워커가 삭제한 컬렉션의 핸들은 다음 검색에서
+오류가 나고 검색 결과가 비는 것으로 처리된다.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+
+LOGGER = logging.getLogger(__name__)
+MAX_HANDLES = int(os.getenv("ESG_VECTOR_HANDLES", "64"))
+SHARED_DIR_NAME = "shared"
+COLLECTIONS = ("convo", "memory")
+_MIGRATE_BATCH = 500
+
+
+def collection_name(conversation_id: str, collection: str) -> str:
+    return f"{collection}_{conversation_id}"
+
+
+class ConversationVectorStores:
+    def __init__(self, embeddings: Any, root: Path, *, max_handles: int = MAX_HANDLES) -> None:
+        self._embeddings = embeddings
+        self._root = Path(root)
+        self._max_handles = max_handles
+        self._client = chromadb.PersistentClient(path=str(self._root / SHARED_DIR_NAME))
+        self._lock = threading.Lock()
+        self._handles: "OrderedDict[str, Chroma]" = OrderedDict()
+        # 존재를 확인한 컬렉션 이름. 여기 없는 이름은 조회 때마다 클라이언트에 다시 확인한다
+        # (버전에 따라 list_collections가 이름 또는 Collection 객체를 반환)
+        self._known: Set[str] = {getattr(item, "name", item) for item in self._client.list_collections()}
+        # 대화방 ID → 이전(migration) 잠금
+        self._migrations: Dict[str, threading.Lock] = {}
+        # 예전 디렉터리를 이미 확인한 대화방 ID (옮겼든 없었든 다시 열지 않음)
+        self._legacy_checked: Set[str] = set()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "migrated": 0}
+
+    def get(self, conversation_id: str, collection: str = "convo", *, create: bool = True) -> Optional[Chroma]:
+        """대화방 컬렉션 핸들 (create=False면 컬렉션이 없을 때 None)"""
+        name = collection_name(conversation_id, collection)
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                self._stats["hits"] += 1
+                return handle
+            self._stats["misses"] += 1
+        # 조회·이전은 전역 잠금 밖에서 (큰 이전 작업이 다른 대화방 조회를 막지 않도록)
+        exists = self._exists(name) or self._migrate_legacy(conversation_id, name)
+        if not exists and not create:
+            return None
+        handle = Chroma(client=self._client, collection_name=name, embedding_function=self._embeddings)
+        with self._lock:
+            self._known.add(name)
+            current = self._handles.setdefault(name, handle)
+            self._handles.move_to_end(name)
+            while len(self._handles) > self._max_handles:
+                self._handles.popitem(last=False)
+                self._stats["evictions"] += 1
+            return current
+
+    def _exists(self, name: str) -> bool:
+        """컬렉션 존재 여부. 다른 워커가 만든 컬렉션도 보이도록 모르는 이름은 클라이언트에 다시 묻는다"""
+        with self._lock:
+            if name in self._known:
+                return True
+        try:
+            self._client.get_collection(name)
+        except Exception:
+            return False
+        with self._lock:
+            self._known.add(name)
+        return True
+
+    def drop(self, conversation_id: str) -> None:
+        """대화방 삭제 시 컬렉션과 핸들 정리 (다른 워커가 만든 컬렉션도 삭제).
+
+        예전 디렉터리 확인 기록도 지우므로, 다시 옮겨지지 않도록 예전 디렉터리도 함께 지운다.
+        """
+        names = [collection_name(conversation_id, collection) for collection in COLLECTIONS]
+        with self._lock:
+            for name in names:
+                self._handles.pop(name, None)
+                self._known.discard(name)
+            self._migrations.pop(conversation_id, None)
+            self._legacy_checked.discard(conversation_id)
+        for name in names:
+            try:
+                self._client.delete_collection(name)
+            except Exception as exc:  # 없는 컬렉션 등
+                LOGGER.debug("컬렉션 삭제 건너뜀(%s): %s", name, exc)
+        legacy_dir = self._root / conversation_id
+        if conversation_id != SHARED_DIR_NAME and legacy_dir.parent == self._root:
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"handles": len(self._handles), "collections": len(self._known), **self._stats}
+
+    def _migrate_legacy(self, conversation_id: str, name: str) -> bool:
+        """예전 대화방 디렉터리의 컬렉션을 임베딩째 공유 클라이언트로 복사. name이 옮겨졌으면 True
+
+        디렉터리는 대화방마다 한 번만 열어 그 안의 컬렉션(convo, memory)을 함께 옮기고, 확인한
+        대화방은 기록해 둔다. 없는 컬렉션 조회(create=False)가 턴마다 예전 디렉터리의 클라이언트를
+        다시 만들지 않도록 하기 위함이다. 같은 대화방을 동시에 두 번 옮기지 않도록 대화방별 잠금만 잡는다.
+        """
+        with self._lock:
+            if conversation_id in self._legacy_checked:
+                return False
+        legacy_dir = self._root / conversation_id
+        if not (legacy_dir / "chroma.sqlite3").exists():
+            with self._lock:
+                self._legacy_checked.add(conversation_id)
+            return False
+        with self._lock:
+            migration_lock = self._migrations.setdefault(conversation_id, threading.Lock())
+        with migration_lock:
+            with self._lock:
+                # 기다리는 동안 다른 스레드가 이미 확인했을 수 있음
+                if conversation_id in self._legacy_checked:
+                    return self._exists(name)
+            try:
+                legacy_client = chromadb.PersistentClient(path=str(legacy_dir))
+            except Exception as exc:
+                LOGGER.warning("이전 대화방 디렉터리를 열지 못했습니다(%s): %s", legacy_dir, exc)
+                legacy_client = None
+            if legacy_client is not None:
+                for collection in COLLECTIONS:
+                    self._copy_collection(legacy_client, collection_name(conversation_id, collection))
+            with self._lock:
+                self._legacy_checked.add(conversation_id)
+        return self._exists(name)
+
+    def _copy_collection(self, legacy_client: Any, name: str) -> None:
+        if self._exists(name):
+            return
+        try:
+            data = legacy_client.get_collection(name).get(include=["embeddings", "documents", "metadatas"])
+        except Exception as exc:
+            LOGGER.debug("이전 대화방 컬렉션 없음(%s): %s", name, exc)
+            return
+        ids = data.get("ids") or []
+        if not ids:
+            return
+        target = self._client.get_or_create_collection(name)
+        embeddings, documents, metadatas = data["embeddings"], data["documents"], data["metadatas"]
+        for start in range(0, len(ids), _MIGRATE_BATCH):
+            end = start + _MIGRATE_BATCH
+            target.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+            )
+        with self._lock:
+            self._known.add(name)
+            self._stats["migrated"] += 1
+        LOGGER.info("이전 대화방 벡터 %d개를 공유 저장소로 옮겼습니다(%s).", len(ids), name)
@@ -0,0 +1,65 @@
+"""대화방 변경 이벤트 (프로세스 내 pub/sub).
+
+백그라운드 작업(제목 생성 등)이 대화방을 바꾸면 publish하고, SSE 핸들러는
+subscribe로 받은 asyncio.Queue에서 이벤트를 꺼내 클라이언트에 보낸다.
+publish는 어느 스레드에서 호출해도 되며 구독자의 이벤트 루프로 전달된다.
+
+워커 프로세스마다 따로 동작하므로 여러 워커로 띄우면 같은 워커에 연결된
+구독자만 이벤트를 받는다 (클라이언트는 목록 API로 최종 상태를 다시 확인).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+# 느린 구독자 때문에 메모리가 늘지 않도록 구독자별 대기 이벤트 수를 제한 (넘치면 오래된 것부터 버림)
+EVENT_QUEUE_MAX = int(os.getenv("ESG_EVENT_QUEUE_MAX", "100"))
+
+Event = Dict[str, Any]
+
+
+class ConversationEvents:
+    def __init__(self, max_queue: int = EVENT_QUEUE_MAX) -> None:
+        self._max_queue = max_queue
+        self._lock = threading.Lock()
+        # (구독 대화방 ID 또는 None=전체, 큐, 큐가 속한 이벤트 루프)
+        self._subscribers: List[Tuple[Optional[str], "asyncio.Queue[Event]", asyncio.AbstractEventLoop]] = []
+
+    @asynccontextmanager
+    async def subscribe(self, conversation_id: Optional[str] = None) -> AsyncIterator["asyncio.Queue[Event]"]:
+        """conversation_id의 이벤트(None이면 전체)를 받는 큐. 블록을 벗어나면 구독 해제"""
+        queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=self._max_queue)
+        subscriber = (conversation_id, queue, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(subscriber)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, event: Event) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        target = event.get("conversation_id")
+        for conversation_id, queue, loop in subscribers:
+            if conversation_id is not None and conversation_id != target:
+                continue
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # 구독자의 이벤트 루프가 이미 닫힘
+                LOGGER.debug("닫힌 이벤트 루프의 구독자를 건너뜁니다.")
+
+    @staticmethod
+    def _offer(queue: "asyncio.Queue[Event]", event: Event) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+conversation_events = ConversationEvents()
@@ -0,0 +1,177 @@
+"""에이전트 실행용 executor 계층.
+
+run_*_agent의 동기 코드(LLM 호출, Chroma 조회, SentenceTransformer 인코딩)를
+이벤트 루프 밖에서 실행해 한 요청이 워커 전체를 멈추지 않게 한다.
+
+- io: LLM/HTTP/Chroma 호출용 스레드 풀 (ESG_IO_WORKERS)
+- cpu: 임베딩·점수 계산용 프로세스 풀 (ESG_CPU_WORKERS, 0이면 io 풀에서 실행)
+  프로세스마다 모델을 따로 올리므로 기본값은 작게 둔다. 함수와 인자는 pickle
+  가능해야 한다 (모듈 수준 함수 또는 상태 없는 객체의 메서드).
+- background: 응답을 기다리지 않는 후속 작업(대화 제목 생성 등)용 스레드 풀
+  (ESG_BACKGROUND_WORKERS). 요청 처리용 io 풀의 자리를 차지하지 않는다.
+- ingest: 업로드 파일 추출·임베딩 작업용 스레드 풀 (ESG_INGEST_WORKERS = 동시에 처리할 업로드 수).
+  수 분 걸리는 작업이 제목 생성 같은 짧은 후속 작업을 막지 않도록 분리한다.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+LOGGER = logging.getLogger(__name__)
+IO_WORKERS = int(os.getenv("ESG_IO_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+CPU_WORKERS = int(os.getenv("ESG_CPU_WORKERS", "2"))
+BACKGROUND_WORKERS = int(os.getenv("ESG_BACKGROUND_WORKERS", "2"))
+INGEST_WORKERS = int(os.getenv("ESG_INGEST_WORKERS", "2"))
+# torch 등을 올린 부모 프로세스를 fork하면 교착될 수 있어 기본은 spawn
+CPU_START_METHOD = os.getenv("ESG_CPU_START_METHOD", "spawn")
+
+
+class _PoolStats:
+    """풀별 제출/완료 건수와 대기열 깊이 (in_flight - 워커 수)"""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def finish(self, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+class AgentExecutors:
+    def __init__(
+        self,
+        io_workers: int = IO_WORKERS,
+        cpu_workers: int = CPU_WORKERS,
+        background_workers: int = BACKGROUND_WORKERS,
+        ingest_workers: int = INGEST_WORKERS,
+    ) -> None:
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="agent-io")
+        self._background = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="agent-bg")
+        self._ingest = ThreadPoolExecutor(max_workers=ingest_workers, thread_name_prefix="agent-ingest")
+        self._cpu_workers = cpu_workers
+        # 프로세스 풀은 처음 쓰일 때 만든다 (import 시 프로세스를 띄우지 않음)
+        self._cpu: Optional[ProcessPoolExecutor] = None
+        self._cpu_lock = threading.Lock()
+        self._stats = {
+            "io": _PoolStats(io_workers),
+            "cpu": _PoolStats(cpu_workers),
+            "background": _PoolStats(background_workers),
+            "ingest": _PoolStats(ingest_workers),
+        }
+
+    async def run_io(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """블로킹 I/O 함수를 스레드 풀에서 실행"""
+        return await self._run("io", self._io, func, *args, **kwargs)
+
+    async def run_cpu(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """CPU 위주 함수를 프로세스 풀에서 실행 (풀이 없거나 깨지면 스레드 풀로 대체)"""
+        pool = self._cpu_pool()
+        if pool is None:
+            return await self._run("io", self._io, func, *args, **kwargs)
+        try:
+            return await self._run("cpu", pool, func, *args, **kwargs)
+        except BrokenProcessPool:
+            LOGGER.error("CPU 프로세스 풀이 비정상 종료되어 다시 만듭니다.")
+            with self._cpu_lock:
+                if self._cpu is pool:
+                    self._cpu = None
+            pool.shutdown(wait=False)
+            return await self._run("io", self._io, func, *args, **kwargs)
+
+    def submit_background(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """결과를 기다리지 않는 작업을 background 풀에 넣고 Future 반환 (예외는 로그로 남김)"""
+        return self._submit("background", self._background, func, *args, **kwargs)
+
+    def submit_ingest(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """업로드 처리 작업을 ingest 풀에 넣고 Future 반환"""
+        return self._submit("ingest", self._ingest, func, *args, **kwargs)
+
+    def _submit(self, name: str, pool: Executor, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        stats = self._stats[name]
+        stats.start()
+        future = pool.submit(func, *args, **kwargs)
+
+        def _done(finished: Future) -> None:
+            error = None if finished.cancelled() else finished.exception()
+            if error is not None:
+                LOGGER.error("%s 작업 실패(%s): %s", name, getattr(func, "__name__", func), error)
+            stats.finish(not finished.cancelled() and error is None)
+
+        future.add_done_callback(_done)
+        return future
+
+    async def _run(self, name: str, pool: Executor, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        stats = self._stats[name]
+        stats.start()
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+            ok = True
+            return result
+        finally:
+            stats.finish(ok)
+
+    def _cpu_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._cpu_workers <= 0:
+            return None
+        with self._cpu_lock:
+            if self._cpu is None:
+                self._cpu = ProcessPoolExecutor(
+                    max_workers=self._cpu_workers,
+                    mp_context=multiprocessing.get_context(CPU_START_METHOD),
+                )
+            return self._cpu
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._io.shutdown(wait=wait)
+        self._background.shutdown(wait=wait)
+        self._ingest.shutdown(wait=wait)
+        with self._cpu_lock:
+            if self._cpu is not None:
+                self._cpu.shutdown(wait=wait)
+                self._cpu = None
+
+
+executors = AgentExecutors()
@@ -0,0 +1,212 @@
+"""업로드 파일 비동기 처리 (추출 → 청크 분할·임베딩 파이프라인).
+
+POST /api/upload는 파일만 저장하고 작업 ID를 바로 돌려준다. 작업은 ingest 풀에서
+두 단계로 겹쳐 실행된다.
+
+- 추출: 페이지를 ESG_INGEST_PAGE_BATCH장씩 묶어 큐에 넣는 생산자 스레드
+  (text_extractor가 큰 PDF의 뒤 페이지를 프로세스 풀에서 미리 추출하고,
+  끝까지 읽은 텍스트는 extracted_text_cache에 저장되어 보고서 생성 등에서 다시 파싱하지 않음)
+- 임베딩: 묶음마다 청크로 나눠 대화방 컬렉션에 넣는 소비자 (넣는 즉시 RAG 검색 대상)
+
+진행 상황은 GET /api/uploads/{job_id}와 conversation_events("upload.progress")로
+알린다. 작업 상태는 이 워커 프로세스 메모리에만 있으므로 여러 워커로 띄우면
+업로드를 받은 워커에서만 조회된다.
+"""
+
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from backend.events import conversation_events
+from backend.executors import executors
+from backend.manager import agent_manager
+from src.extraction.text_cache import extracted_text_cache
+from src.extraction.text_extractor import page_count
+
+LOGGER = logging.getLogger(__name__)
+PAGE_BATCH = int(os.getenv("ESG_INGEST_PAGE_BATCH", "8"))
+# 추출이 임베딩보다 너무 앞서가지 않도록 대기 묶음 수 제한
+QUEUE_DEPTH = int(os.getenv("ESG_INGEST_QUEUE_DEPTH", "4"))
+JOBS_MAX = int(os.getenv("ESG_UPLOAD_JOBS_MAX", "200"))
+# 대화방 파일 항목에 남기는 본문 길이 (AgentManager.record_conversation_file과 동일)
+FILE_TEXT_CHARS = 10000
+
+TERMINAL_STATUSES = {"done", "failed"}
+_DONE = object()
+
+
+class _ConversationDeleted(Exception):
+    """처리 도중 대상 대화방이 삭제됨"""
+
+
+class UploadIngestion:
+    def __init__(self, manager: Any, *, batch_pages: int = PAGE_BATCH, max_jobs: int = JOBS_MAX) -> None:
+        self._manager = manager
+        self._batch_pages = batch_pages
+        self._max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def submit(
+        self, conversation_id: str, *, filename: str, path: str, size_bytes: int, sha256: str
+    ) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "filename": filename,
+            "sha256": sha256,
+            "size_bytes": size_bytes,
+            "status": "queued",
+            "stage": None,
+            "pages_total": None,
+            "pages_extracted": 0,
+            "pages_embedded": 0,
+            "chunks_embedded": 0,
+            "file_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            # 같은 대화방에 같은 파일을 처리 중이면 그 작업을 돌려줌
+            for running in self._jobs.values():
+                if (
+                    running["conversation_id"] == conversation_id
+                    and running["sha256"] == sha256
+                    and running["status"] not in TERMINAL_STATUSES
+                ):
+                    return dict(running)
+            self._jobs[job["job_id"]] = job
+            self._prune()
+        executors.submit_ingest(self._run, job["job_id"], path)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    # ------------------------------------------------------------------
+    # 파이프라인 (ingest 풀에서 실행)
+    # ------------------------------------------------------------------
+    def _run(self, job_id: str, path: str) -> None:
+        job = self.get(job_id)
+        conversation_id, filename = job["conversation_id"], job["filename"]
+        batches: "queue.Queue[Any]" = queue.Queue(maxsize=QUEUE_DEPTH)
+        cancel = threading.Event()
+        producer = threading.Thread(
+            target=self._extract,
+            args=(job_id, path, batches, cancel),
+            name=f"ingest-extract-{job_id[:8]}",
+            daemon=True,
+        )
+        self._update(job_id, status="processing", stage="extracting")
+        producer.start()
+        head: List[str] = []
+        head_chars = 0
+        chunks_embedded = 0
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                first_page, pages = item
+                # 삭제된 대화방에 임베딩하면 컬렉션이 다시 생기므로 묶음마다 확인
+                if self._manager.get_conversation(conversation_id) is None:
+                    raise _ConversationDeleted(conversation_id)
+                text = "\n".join(pages)
+                if head_chars < FILE_TEXT_CHARS:
+                    head.append(text)
+                    head_chars += len(text)
+                chunks = self._manager.split_file_text(text)
+                chunks_embedded += self._manager.add_conversation_chunks(
+                    conversation_id,
+                    filename,
+                    chunks,
+                    start=chunks_embedded,
+                    metadata={"page_start": first_page + 1, "page_end": first_page + len(pages)},
+                    source_id=job["sha256"],
+                )
+                self._update(
+                    job_id,
+                    stage="embedding",
+                    pages_embedded=first_page + len(pages),
+                    chunks_embedded=chunks_embedded,
+                )
+            entry = self._manager.record_conversation_file(
+                conversation_id,
+                filename=filename,
+                path=path,
+                size_bytes=job["size_bytes"],
+                text="\n".join(head),
+                extra={
+                    "job_id": job_id,
+                    "chunks": chunks_embedded,
+                    "sha256": job["sha256"],
+                },
+            )
+            self._update(job_id, status="done", stage=None, file_id=entry["id"])
+        except Exception as exc:
+            cancel.set()
+            if self._manager.get_conversation(conversation_id) is None:
+                # 확인과 임베딩 사이에 삭제됐을 수도 있으므로 넣은 청크를 지운다
+                self._manager.drop_conversation_chunks(conversation_id)
+                LOGGER.info("대화방이 삭제되어 업로드 처리 중단(%s, %s)", filename, job_id)
+                self._update(job_id, status="failed", stage=None, error="conversation deleted")
+                return
+            LOGGER.error("업로드 처리 실패(%s, %s): %s", filename, job_id, exc)
+            self._update(job_id, status="failed", stage=None, error=str(exc))
+        finally:
+            producer.join(timeout=5)
+
+    def _extract(self, job_id: str, path: str, batches: "queue.Queue[Any]", cancel: threading.Event) -> None:
+        try:
+            self._update(job_id, pages_total=page_count(path))
+            for first_page, pages in extracted_text_cache.iter_page_batches(path, self._batch_pages):
+                if not self._put(batches, (first_page, pages), cancel):
+                    return
+                self._update(job_id, pages_extracted=first_page + len(pages))
+            self._put(batches, _DONE, cancel)
+        except Exception as exc:
+            self._put(batches, exc, cancel)
+
+    @staticmethod
+    def _put(batches: "queue.Queue[Any]", item: Any, cancel: threading.Event) -> bool:
+        # 소비자가 실패해 멈춘 경우 생산자가 큐에서 영원히 기다리지 않도록 주기적으로 확인
+        while not cancel.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _update(self, job_id: str, **changes: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(changes, updated_at=datetime.now(timezone.utc).isoformat())
+            snapshot = dict(job)
+        conversation_events.publish(
+            {"type": "upload.progress", "conversation_id": snapshot["conversation_id"], "job": snapshot}
+        )
+
+    def _prune(self) -> None:
+        # 오래된 완료 작업부터 정리 (진행 중인 작업은 남김)
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self._max_jobs:
+                break
+            if self._jobs[job_id]["status"] in TERMINAL_STATUSES:
+                del self._jobs[job_id]
+
+
+upload_ingestion = UploadIngestion(agent_manager)
@@ -0,0 +1,239 @@
+"""보고서/체크리스트 생성 요청 판별기 (LLM 호출 전 로컬 1차 분류).
+
+1. 임베딩 최근접 이웃: AgentManager가 이미 올린 BGE-M3로 라벨된 예시 문장과
+   코사인 유사도를 비교해 상위 k개의 가중 투표로 판별
+2. 어휘 규칙: 생성 동사(작성/만들어/generate...)와 산출물(보고서/체크리스트/report...),
+   질문 표현(설명/요약/what...)의 조합으로 판별 (임베딩이 없거나 실패하면 이것만 사용)
+
+신뢰도가 ESG_INTENT_CONFIDENCE 이상인 결과가 있으면 그대로 쓰고, 둘 다 애매하거나
+서로 다르게 판단하면 escalate(LLM)로 넘긴다. 결과는 정규화한 질문별로 LRU 캐시한다.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.workflows.agent_cache import normalize
+
+LOGGER = logging.getLogger(__name__)
+CONFIDENCE_THRESHOLD = float(os.getenv("ESG_INTENT_CONFIDENCE", "0.75"))
+CACHE_SIZE = int(os.getenv("ESG_INTENT_CACHE_MAX", "1024"))
+
+# 최근접 이웃 투표 수와, 이보다 덜 비슷하면 라벨 예시 밖의 질문으로 보고 신뢰도를 낮추는 기준
+_TOP_K = 5
+_MIN_SIMILARITY = 0.45
+
+# (예시 문장, 생성 요청 여부)
+LABELLED_EXAMPLES: Tuple[Tuple[str, bool], ...] = (
+    ("안전 보고서 만들어줘", True),
+    ("ESG 체크리스트 생성해줘", True),
+    ("지속가능경영 보고서 초안 작성해 주세요", True),
+    ("업로드한 파일로 K-ESG 보고서 작성해줘", True),
+    ("협력사 실사 체크리스트 만들어 줄래?", True),
+    ("이사회 보고용 ESG 리포트 뽑아줘", True),
+    ("중대재해 대응 점검표를 작성해줘", True),
+    ("탄소중립 로드맵 문서를 만들어 주세요", True),
+    ("경영진 대상 요약 보고서를 생성해줘", True),
+    ("Make a safety report", True),
+    ("Generate a checklist for ESG", True),
+    ("Write a draft sustainability report", True),
+    ("Create an ESG disclosure document for the board", True),
+    ("Prepare a supplier due diligence checklist", True),
+    ("K-ESG가 뭐야?", False),
+    ("이 파일 요약해줘", False),
+    ("안전 정책 설명해줘", False),
+    ("최근 ESG 규제 동향 알려줘", False),
+    ("중대재해처벌법 대응 현황은 어때?", False),
+    ("보고서에 들어갈 지표는 무엇인가요?", False),
+    ("체크리스트 항목 중 가장 중요한 건 뭐야?", False),
+    ("우리 회사 탄소배출 리스크 수준은?", False),
+    ("Scope 3 배출량 산정 방법 알려줘", False),
+    ("공급망 인권 리스크를 평가해줘", False),
+    ("What is K-ESG?", False),
+    ("Summarize this file", False),
+    ("Explain the safety policy", False),
+    ("What does the report say about emissions?", False),
+    ("How should we respond to the CSRD?", False),
+)
+
+_GENERATE_PATTERN = re.compile(
+    r"(만들|작성|생성|뽑아|써\s*줘|써\s*주|초안\s*(?:을|를)?\s*(?:잡|짜)|짜\s*줘|"
+    r"\b(?:make|generate|create|write|draft|prepare|build|produce)\b)"
+)
+_ARTIFACT_PATTERN = re.compile(
+    r"(보고서|리포트|체크리스트|점검표|문서|초안|로드맵|"
+    r"\b(?:report|checklist|document|draft|roadmap|memo)s?\b)"
+)
+_QUESTION_PATTERN = re.compile(
+    r"(\?|뭐|무엇|무슨|어떻|어때|어떤|왜|설명|요약|알려|차이|의미|"
+    r"\b(?:what|why|how|which|explain|summari[sz]e|tell|does|is|are)\b)"
+)
+
+
+@dataclass(frozen=True)
+class IntentDecision:
+    is_generation_request: bool
+    confidence: float
+    # embedding | lexical | llm | fallback
+    source: str
+    cached: bool = False
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _dot(left: Sequence[float], right: Sequence[float]) -> float:
+    return sum(a * b for a, b in zip(left, right))
+
+
+def lexical_intent(query: str) -> IntentDecision:
+    """어휘 규칙 판별 (생성 동사 + 산출물이면 생성 요청, 질문 표현이 있으면 신뢰도를 낮춤)"""
+    text = normalize(query)
+    generate = bool(_GENERATE_PATTERN.search(text))
+    artifact = bool(_ARTIFACT_PATTERN.search(text))
+    question = bool(_QUESTION_PATTERN.search(text))
+    if generate and artifact:
+        return IntentDecision(True, 0.65 if question else 0.9, "lexical")
+    if not generate:
+        # 산출물 단어만 있는 질문("보고서에 뭐가 있어?")은 대부분 조회 요청
+        return IntentDecision(False, 0.85 if (question or not artifact) else 0.6, "lexical")
+    # 생성 동사만 있음 ("만들어줘") - 대상이 불분명
+    return IntentDecision(True, 0.5, "lexical")
+
+
+class ReportIntentClassifier:
+    """임베딩 최근접 이웃 + 어휘 규칙 + LLM escalation + 질문별 캐시"""
+
+    def __init__(
+        self,
+        embeddings: Any = None,
+        *,
+        examples: Sequence[Tuple[str, bool]] = LABELLED_EXAMPLES,
+        threshold: float = CONFIDENCE_THRESHOLD,
+        cache_size: int = CACHE_SIZE,
+    ) -> None:
+        self._embeddings = embeddings
+        self._examples = tuple(examples)
+        self._threshold = threshold
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        # 예시 문장 임베딩은 첫 분류 때 한 번만 계산
+        self._vectors: Optional[List[Tuple[List[float], bool]]] = None
+        self._cache: "OrderedDict[str, IntentDecision]" = OrderedDict()
+        self._stats: Dict[str, float] = {
+            "requests": 0,
+            "cache_hits": 0,
+            "embedding": 0,
+            "lexical": 0,
+            "llm": 0,
+            "fallback": 0,
+            "local_ms_total": 0.0,
+        }
+
+    def attach_embeddings(self, embeddings: Any) -> None:
+        """embed_query/embed_documents를 제공하는 임베딩 (HuggingFaceEmbeddings 등)"""
+        with self._lock:
+            self._embeddings = embeddings
+            self._vectors = None
+
+    def classify(self, query: str, escalate: Optional[Callable[[str], bool]] = None) -> IntentDecision:
+        """질문을 판별. 로컬 판별이 애매하면 escalate(query)로 LLM에 묻는다 (블로킹)"""
+        key = normalize(query)
+        with self._lock:
+            self._stats["requests"] += 1
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return IntentDecision(cached.is_generation_request, cached.confidence, cached.source, cached=True)
+
+        started = time.perf_counter()
+        decision = self.classify_locally(query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if decision.confidence < self._threshold and escalate is not None:
+            try:
+                decision = IntentDecision(bool(escalate(query)), 1.0, "llm")
+            except Exception as exc:
+                # LLM 실패 시 로컬 추정을 쓰되 다음 요청에서 다시 묻도록 캐시하지 않음
+                LOGGER.warning("의도 분류 LLM 호출 실패, 로컬 판별 사용: %s", exc)
+                with self._lock:
+                    self._stats["fallback"] += 1
+                    self._stats["local_ms_total"] += elapsed_ms
+                return IntentDecision(decision.is_generation_request, decision.confidence, "fallback")
+
+        with self._lock:
+            self._stats[decision.source] += 1
+            self._stats["local_ms_total"] += elapsed_ms
+            self._cache[key] = decision
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return decision
+
+    def classify_locally(self, query: str) -> IntentDecision:
+        """LLM 없이 판별 (임베딩과 어휘 규칙 중 신뢰도 기준을 넘는 결과, 충돌하면 신뢰도를 낮춤)"""
+        lexical = lexical_intent(query)
+        nearest = self._nearest(query)
+        if nearest is None:
+            return lexical
+        confident = [decision for decision in (nearest, lexical) if decision.confidence >= self._threshold]
+        if len(confident) == 2 and nearest.is_generation_request != lexical.is_generation_request:
+            # 두 판별이 모두 확신하지만 서로 다름 → escalation 대상
+            return IntentDecision(nearest.is_generation_request, min(nearest.confidence, lexical.confidence) / 2, "embedding")
+        if confident:
+            return max(confident, key=lambda decision: decision.confidence)
+        return nearest if nearest.confidence >= lexical.confidence else lexical
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        local = stats["requests"] - stats["cache_hits"]
+        stats["escalation_rate"] = (stats["llm"] + stats["fallback"]) / local if local else 0.0
+        stats["local_ms_avg"] = stats["local_ms_total"] / local if local else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # 내부 구현
+    # ------------------------------------------------------------------
+    def _example_vectors(self) -> Optional[List[Tuple[List[float], bool]]]:
+        with self._lock:
+            if self._vectors is not None or self._embeddings is None:
+                return self._vectors
+            embeddings = self._embeddings
+        texts = [text for text, _ in self._examples]
+        vectors = [_unit(vector) for vector in embeddings.embed_documents(texts)]
+        with self._lock:
+            self._vectors = [(vector, label) for vector, (_, label) in zip(vectors, self._examples)]
+            return self._vectors
+
+    def _nearest(self, query: str) -> Optional[IntentDecision]:
+        try:
+            examples = self._example_vectors()
+            if not examples:
+                return None
+            vector = _unit(self._embeddings.embed_query(query))
+        except Exception as exc:
+            LOGGER.warning("의도 분류 임베딩 실패, 어휘 규칙만 사용: %s", exc)
+            return None
+        scored = sorted(((_dot(vector, example), label) for example, label in examples), reverse=True)[:_TOP_K]
+        weights = {True: 0.0, False: 0.0}
+        for similarity, label in scored:
+            weights[label] += max(similarity, 0.0)
+        total = weights[True] + weights[False]
+        if total <= 0:
+            return None
+        is_generation = weights[True] >= weights[False]
+        confidence = weights[is_generation] / total
+        if scored[0][0] < _MIN_SIMILARITY:
+            confidence *= scored[0][0] / _MIN_SIMILARITY
+        return IntentDecision(is_generation, confidence, "embedding")
+
+
+intent_classifier = ReportIntentClassifier()
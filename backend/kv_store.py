@@ -1,41 +1,406 @@
 import json
 import logging
 import os
-from typing import Any, Dict, Optional
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 try:
     import redis  # type: ignore
 except ImportError:  # pragma: no cover - optional dependency
     redis = None
 
+from backend.conversation_index import decode_cursor, encode_cursor
+from backend.serialization import Payload, payload_codec
+
 LOGGER = logging.getLogger(__name__)
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# 과거 버전이 전체 컨텍스트를 한 덩어리 JSON으로 저장하던 키 (마이그레이션 대상)
 CONTEXT_KEY = os.getenv("ESG_CONTEXT_KEY", "esg_ai_agent_context")
+KEY_PREFIX = os.getenv("ESG_KV_PREFIX", "esg_ai_agent")
+# auto: Redis 연결되면 Redis, 아니면 SQLite / redis / sqlite 로 강제 지정 가능
+# 기본 경로는 /static으로 공개되는 data/ 밖(state/)에 둔다
+KV_BACKEND = os.getenv("ESG_KV_BACKEND", "auto").lower()
+SQLITE_PATH = os.getenv(
+    "ESG_SQLITE_PATH",
+    str(Path(__file__).resolve().parent.parent / "state" / "esg_state.sqlite3"),
+)
+
+# 대화방 dict 중 리스트로 따로 저장하는 필드 (나머지는 메타 해시에 저장)
+CONVERSATION_LIST_FIELDS = ("messages", "files", "reports")
+# 저장소가 관리하는 필드 (메타로 저장하지 않음)
+VERSION_FIELD = "version"
+DEFAULT_CONVERSATION_TITLE = "새 대화"
+# 목록 화면용 마지막 메시지 미리보기 길이
+PREVIEW_CHARS = 200
+
+# write_batch 결과: 대화방 ID -> (저장 후 버전, 이번 배치에서 반영한 변경 수)
+BatchVersions = Dict[str, Tuple[int, int]]
+
+
+def preview_text(content: str) -> str:
+    return (content or "")[:PREVIEW_CHARS]
+
+
+def updated_score(conversation: Dict[str, Any]) -> float:
+    """updated_at(ISO 문자열)을 정렬 인덱스 score(epoch 초)로 변환"""
+    value = conversation.get("updated_at")
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def conversation_meta(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """대화방 dict에서 리스트 필드와 저장소 관리 필드를 뺀 메타만 추출"""
+    return {
+        key: value
+        for key, value in conversation.items()
+        if key not in CONVERSATION_LIST_FIELDS and key != VERSION_FIELD
+    }
+
+
+def merge_conversation_meta(current: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+    """여러 워커의 메타 쓰기를 병합 (Redis Lua 스크립트와 같은 규칙).
+
+    - updated_at/last_message: 더 최신 updated_at일 때만 덮어씀
+    - title: 기본 제목으로 되돌리는 쓰기는 무시
+    - id/created_at: 최초 값 유지
+    """
+    merged = dict(current)
+    newer = not current.get("updated_at") or (incoming.get("updated_at") or "") >= current["updated_at"]
+    for key, value in incoming.items():
+        if key in ("updated_at", "last_message"):
+            if newer:
+                merged[key] = value
+        elif key == "title":
+            current_title = current.get("title")
+            if not current_title or current_title == DEFAULT_CONVERSATION_TITLE or value != DEFAULT_CONVERSATION_TITLE:
+                merged[key] = value
+        elif key in ("id", "created_at"):
+            merged.setdefault(key, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+# KEYS: 메타 hash, 버전 키, 정렬 zset / ARGV: 대화방 ID, score, 기본 제목(JSON), field, value, ...
+_MERGE_META_LUA = """
+local current_updated = redis.call('HGET', KEYS[1], 'updated_at')
+local incoming_updated = nil
+for i = 4, #ARGV, 2 do
+  if ARGV[i] == 'updated_at' then incoming_updated = ARGV[i + 1] end
+end
+local newer = (not current_updated) or (incoming_updated ~= nil and incoming_updated >= current_updated)
+for i = 4, #ARGV, 2 do
+  local field, value = ARGV[i], ARGV[i + 1]
+  if field == 'updated_at' or field == 'last_message' then
+    if newer then redis.call('HSET', KEYS[1], field, value) end
+  elseif field == 'title' then
+    local current_title = redis.call('HGET', KEYS[1], 'title')
+    if (not current_title) or current_title == ARGV[3] or value ~= ARGV[3] then
+      redis.call('HSET', KEYS[1], field, value)
+    end
+  elseif field == 'id' or field == 'created_at' then
+    redis.call('HSETNX', KEYS[1], field, value)
+  else
+    redis.call('HSET', KEYS[1], field, value)
+  end
+end
+if newer then redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1]) end
+return redis.call('INCR', KEYS[2])
+"""
 
 
 class RedisKVStore:
-    """간단한 키-값 스토어 래퍼 (Redis 없으면 비활성)."""
+    """간단한 키-값 스토어 래퍼 (Redis 없으면 비활성).
+
+    컨텍스트를 한 번에 덮어쓰지 않고 아래처럼 키를 나눠 저장한다.
+    - ``{prefix}:globals``: 에이전트 결과 등 전역 키 (hash, 필드별 payload_codec 인코딩)
+    - ``{prefix}:conversations:by_updated``: 대화방 ID 정렬 인덱스 (zset, score=updated_at)
+    - ``{prefix}:conv:{id}``: 대화방 메타 (hash, 필드별 JSON - Lua 병합 스크립트가 비교)
+    - ``{prefix}:conv:{id}:messages|files|reports``: 항목별 payload_codec 인코딩 리스트
+    - ``{prefix}:conv:{id}:version``: 변경마다 1씩 증가하는 버전 (워커 간 캐시 검증용)
+
+    모든 변경은 RPUSH/INCR 또는 Lua 병합 스크립트로 키 단위 원자적으로 반영되므로
+    여러 uvicorn 워커가 같은 대화방에 동시에 써도 변경이 유실되지 않는다.
+    """
 
     def __init__(self) -> None:
         self._client: Optional["redis.Redis"] = None
+        self._merge_meta = None
         if redis is None:
             LOGGER.warning("redis 패키지가 설치되지 않아 KV 스토어 기능이 비활성화됩니다.")
             return
         try:
-            self._client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+            # 항목 값이 압축 바이너리일 수 있어 응답을 bytes로 받고 키/ID만 직접 디코딩
+            self._client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
             self._client.ping()
+            self._merge_meta = self._client.register_script(_MERGE_META_LUA)
             LOGGER.info("Redis KV 스토어 연결 성공: %s", REDIS_URL)
         except Exception as exc:  # pragma: no cover - 네트워크 예외
             # Redis is optional, suppress loud warning
             # LOGGER.warning("Redis 연결 실패(%s): %s", REDIS_URL, exc)
-            LOGGER.info("Redis 연결 실패 (선택 사항): 메모리 모드로 동작합니다.")
+            LOGGER.info("Redis 연결 실패 (선택 사항): 로컬 저장소 또는 메모리 모드로 동작합니다.")
             self._client = None
 
     @property
     def available(self) -> bool:
         return self._client is not None
 
+    # ------------------------------------------------------------------
+    # 키 구성
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _globals_key() -> str:
+        return f"{KEY_PREFIX}:globals"
+
+    @staticmethod
+    def _conversation_index_key() -> str:
+        return f"{KEY_PREFIX}:conversations:by_updated"
+
+    @staticmethod
+    def _conversation_key(conversation_id: str, field: Optional[str] = None) -> str:
+        base = f"{KEY_PREFIX}:conv:{conversation_id}"
+        return f"{base}:{field}" if field else base
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False)
+
+    @staticmethod
+    def _loads(raw: Optional[Payload]) -> Any:
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            LOGGER.error("저장된 메타 JSON 파싱 실패")
+            return None
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return payload_codec.dumps(value)
+
+    @staticmethod
+    def _decode(raw: Optional[Payload]) -> Any:
+        """헤더 포맷 또는 레거시 JSON 텍스트를 복원 (실패 시 None)"""
+        try:
+            return payload_codec.loads(raw)
+        except (ValueError, UnicodeDecodeError) as exc:
+            LOGGER.error("저장된 값 디코딩 실패: %s", exc)
+            return None
+
+    @staticmethod
+    def _text(raw: Payload) -> str:
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    # ------------------------------------------------------------------
+    # 전역 컨텍스트
+    # ------------------------------------------------------------------
+    def load_globals(self) -> Dict[str, Any]:
+        if not self._client:
+            return {}
+        raw = self._client.hgetall(self._globals_key())
+        return {self._text(key): self._decode(value) for key, value in raw.items()}
+
+    def save_global(self, key: str, value: Any) -> bool:
+        return self._write_safely(globals={key: value})
+
+    # ------------------------------------------------------------------
+    # 대화방
+    # ------------------------------------------------------------------
+    def list_conversation_ids(self) -> List[str]:
+        if not self._client:
+            return []
+        # 최근 업데이트 순
+        return [self._text(member) for member in self._client.zrevrange(self._conversation_index_key(), 0, -1)]
+
+    def list_conversation_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """ZSET에서 cursor 이후 limit개만 읽어 메타 요약을 반환 (최신 순)"""
+        if not self._client:
+            return [], None
+        max_score: Any = "+inf"
+        cursor_key = None
+        if cursor:
+            cursor_key = decode_cursor(cursor)
+            max_score = updated_score({"updated_at": cursor_key[0]})
+        # score가 cursor와 같은(동일 시각) 항목 중 이미 보낸 것은 걸러내므로, 걸러낸 뒤 limit + 1개가
+        # 남을 때까지 start를 옮겨 가며 읽는다 (같은 score 항목이 아무리 많아도 페이지가 끊기지 않음).
+        # score는 epoch 초 double이라 마이크로초 단위 updated_at까지 구분된다.
+        rows: List[Tuple[str, float]] = []
+        start = 0
+        batch = -1 if limit is None else limit + 1
+        while True:
+            if batch < 0:
+                chunk = self._client.zrevrangebyscore(self._conversation_index_key(), max_score, "-inf", withscores=True)
+            else:
+                chunk = self._client.zrevrangebyscore(
+                    self._conversation_index_key(), max_score, "-inf", start=start, num=batch, withscores=True
+                )
+            for member, score in chunk:
+                member = self._text(member)
+                if cursor_key is None or score < max_score or member < cursor_key[1]:
+                    rows.append((member, score))
+            if batch < 0 or len(chunk) < batch or len(rows) > limit:
+                break
+            start += len(chunk)
+            batch *= 2
+        has_more = limit is not None and len(rows) > limit
+        if limit is not None:
+            rows = rows[:limit]
+        summaries = self.load_conversation_summaries(member for member, _ in rows)
+        next_cursor = None
+        if has_more and summaries:
+            last = summaries[-1]
+            next_cursor = encode_cursor((last.get("updated_at") or "", last["id"]))
+        return summaries, next_cursor
+
+    def conversation_version(self, conversation_id: str) -> int:
+        if not self._client:
+            return 0
+        return int(self._client.get(self._conversation_key(conversation_id, VERSION_FIELD)) or 0)
+
+    def load_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """대화방 하나를 메타 + 메시지/파일/보고서 리스트 + 버전으로 복원"""
+        if not self._client:
+            return None
+        # MULTI로 묶어 다른 워커의 쓰기 도중 일부만 읽히는 일을 막는다
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hgetall(self._conversation_key(conversation_id))
+        for field in CONVERSATION_LIST_FIELDS:
+            pipe.lrange(self._conversation_key(conversation_id, field), 0, -1)
+        pipe.get(self._conversation_key(conversation_id, VERSION_FIELD))
+        meta_raw, *lists, version = pipe.execute()
+        if not meta_raw:
+            return None
+        conversation = {self._text(key): self._loads(value) for key, value in meta_raw.items()}
+        for field, items in zip(CONVERSATION_LIST_FIELDS, lists):
+            conversation[field] = [self._decode(item) for item in items]
+        conversation[VERSION_FIELD] = int(version or 0)
+        return conversation
+
+    def load_conversation_summaries(self, conversation_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """목록 화면용: 메타와 마지막 메시지만 읽어 본문 전체 로딩을 피한다"""
+        if not self._client:
+            return []
+        ids = list(conversation_ids)
+        if not ids:
+            return []
+        pipe = self._client.pipeline()
+        for conversation_id in ids:
+            pipe.hgetall(self._conversation_key(conversation_id))
+            pipe.lindex(self._conversation_key(conversation_id, "messages"), -1)
+        results = pipe.execute()
+        summaries: List[Dict[str, Any]] = []
+        for idx in range(0, len(results), 2):
+            meta_raw, last_raw = results[idx], results[idx + 1]
+            if not meta_raw:
+                continue
+            meta = {self._text(key): self._loads(value) for key, value in meta_raw.items()}
+            if "last_message" not in meta:
+                # 미리보기 필드가 없던 이전 데이터는 마지막 메시지에서 만든다
+                last_message = self._decode(last_raw) or {}
+                meta["last_message"] = preview_text(last_message.get("content", ""))
+            summaries.append(meta)
+        return summaries
+
+    def save_conversation_meta(self, conversation: Dict[str, Any]) -> bool:
+        """리스트 필드를 제외한 메타(title, updated_at 등)만 병합 저장"""
+        return self._write_safely(metas={conversation["id"]: conversation_meta(conversation)})
+
+    def append_conversation_item(self, conversation_id: str, field: str, item: Dict[str, Any]) -> bool:
+        """메시지/파일/보고서 한 건만 RPUSH (기존 항목은 다시 쓰지 않음)"""
+        if field not in CONVERSATION_LIST_FIELDS:
+            raise ValueError(f"Unknown conversation field: {field}")
+        return self._write_safely(appends=[(conversation_id, field, item)])
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        return self._write_safely(deletes=[conversation_id])
+
+    def _write_safely(self, **changes: Any) -> bool:
+        if not self._client:
+            return False
+        batch = {"globals": {}, "metas": {}, "appends": [], "deletes": []}
+        batch.update(changes)
+        try:
+            self.write_batch(**batch)
+            return True
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.error("Redis 저장 실패: %s", exc)
+            return False
+
+    def write_batch(
+        self,
+        *,
+        globals: Dict[str, Any],
+        metas: Dict[str, Dict[str, Any]],
+        appends: List[Tuple[str, str, Dict[str, Any]]],
+        deletes: List[str],
+    ) -> BatchVersions:
+        """write-behind 큐가 모은 변경을 파이프라인 한 번으로 전송 (실패 시 예외)"""
+        if not self._client:
+            return {}
+        pipe = self._client.pipeline(transaction=False)
+        # 버전을 돌려주는 명령의 파이프라인 내 위치와 대화방 ID
+        version_slots: List[Tuple[int, str]] = []
+        position = 0
+        for conversation_id in deletes:
+            pipe.delete(
+                self._conversation_key(conversation_id),
+                self._conversation_key(conversation_id, VERSION_FIELD),
+                *[self._conversation_key(conversation_id, field) for field in CONVERSATION_LIST_FIELDS],
+            )
+            pipe.zrem(self._conversation_index_key(), conversation_id)
+            position += 2
+        if globals:
+            pipe.hset(
+                self._globals_key(),
+                mapping={key: self._encode(value) for key, value in globals.items()},
+            )
+            position += 1
+        for conversation_id, meta in metas.items():
+            args: List[Any] = [conversation_id, updated_score(meta), self._dumps(DEFAULT_CONVERSATION_TITLE)]
+            for key, value in conversation_meta(meta).items():
+                args.extend([key, self._dumps(value)])
+            self._merge_meta(
+                keys=[
+                    self._conversation_key(conversation_id),
+                    self._conversation_key(conversation_id, VERSION_FIELD),
+                    self._conversation_index_key(),
+                ],
+                args=args,
+                client=pipe,
+            )
+            version_slots.append((position, conversation_id))
+            position += 1
+        for conversation_id, field, item in appends:
+            pipe.rpush(self._conversation_key(conversation_id, field), self._encode(item))
+            pipe.incr(self._conversation_key(conversation_id, VERSION_FIELD))
+            version_slots.append((position + 1, conversation_id))
+            position += 2
+        results = pipe.execute()
+
+        versions: BatchVersions = {}
+        for slot, conversation_id in version_slots:
+            latest, count = versions.get(conversation_id, (0, 0))
+            versions[conversation_id] = (max(latest, int(results[slot])), count + 1)
+        return versions
+
+    # ------------------------------------------------------------------
+    # 레거시 단일 JSON 마이그레이션
+    # ------------------------------------------------------------------
     def load_context(self) -> Optional[Dict[str, Any]]:
+        """레거시 단일 JSON 컨텍스트 읽기 (마이그레이션 전용)"""
         if not self._client:
             return None
         data = self._client.get(CONTEXT_KEY)
@@ -47,16 +412,335 @@ class RedisKVStore:
             LOGGER.error("Redis에 저장된 컨텍스트 JSON 파싱 실패")
             return None
 
-    def save_context(self, context: Dict[str, Any]) -> bool:
+    def migrate_legacy_context(self) -> bool:
+        """``esg_ai_agent_context`` 한 덩어리 JSON을 키별 저장 구조로 옮긴다.
+
+        RENAMENX로 레거시 키를 백업 키로 먼저 옮기므로 여러 워커가 동시에
+        기동해도 한 프로세스만 마이그레이션을 수행한다. 백업 키는 지우지 않는다.
+        """
         if not self._client:
             return False
+        backup_key = f"{CONTEXT_KEY}:migrated"
         try:
-            payload = json.dumps(context, ensure_ascii=False)
-            self._client.set(CONTEXT_KEY, payload)
-            return True
+            if not self._client.exists(CONTEXT_KEY):
+                return False
+            if not self._client.renamenx(CONTEXT_KEY, backup_key):
+                LOGGER.warning("레거시 컨텍스트 백업 키(%s)가 이미 있어 마이그레이션을 건너뜁니다.", backup_key)
+                return False
         except Exception as exc:  # pragma: no cover - 네트워크 예외
-            LOGGER.error("Redis 컨텍스트 저장 실패: %s", exc)
+            LOGGER.error("레거시 컨텍스트 마이그레이션 준비 실패: %s", exc)
+            return False
+
+        try:
+            legacy = json.loads(self._client.get(backup_key) or "{}")
+        except json.JSONDecodeError:
+            LOGGER.error("레거시 컨텍스트 JSON 파싱 실패 - 백업 키(%s)만 남깁니다.", backup_key)
             return False
 
+        conversations = legacy.pop("conversations", {}) or {}
+        pipe = self._client.pipeline()
+        for key, value in legacy.items():
+            pipe.hset(self._globals_key(), key, self._encode(value))
+        for conversation_id, conversation in conversations.items():
+            conversation.setdefault("id", conversation_id)
+            meta = {key: self._dumps(value) for key, value in conversation_meta(conversation).items()}
+            pipe.hset(self._conversation_key(conversation_id), mapping=meta)
+            pipe.zadd(self._conversation_index_key(), {conversation_id: updated_score(conversation)})
+            for field in CONVERSATION_LIST_FIELDS:
+                items = conversation.get(field) or []
+                list_key = self._conversation_key(conversation_id, field)
+                pipe.delete(list_key)
+                if items:
+                    pipe.rpush(list_key, *[self._encode(item) for item in items])
+        pipe.execute()
+        LOGGER.info("레거시 컨텍스트 마이그레이션 완료: 대화방 %d개", len(conversations))
+        return True
+
+
+class SQLiteKVStore:
+    """Redis가 없을 때 쓰는 단일 노드용 내장 저장소 (SQLite WAL 모드).
+
+    RedisKVStore와 같은 메서드를 제공하며 대화방 메타/메시지/파일/보고서를
+    각각 인덱스가 걸린 테이블에 저장한다. 리스트 항목은 INSERT만 하므로
+    한 턴에 쓰는 양이 대화 길이와 무관하다. 쓰기는 BEGIN IMMEDIATE 트랜잭션으로
+    직렬화되어 같은 파일을 여러 워커가 공유해도 메타 병합이 유실되지 않는다.
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS globals (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        meta TEXT NOT NULL,
+        updated_at TEXT,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations(updated_at, id);
+    CREATE TABLE IF NOT EXISTS messages (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT NOT NULL,
+        payload TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, seq);
+    CREATE TABLE IF NOT EXISTS files (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT NOT NULL,
+        payload TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_files_conversation ON files(conversation_id, seq);
+    CREATE TABLE IF NOT EXISTS reports (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT NOT NULL,
+        payload TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reports_conversation ON reports(conversation_id, seq);
+    """
+
+    # 모든 SQL은 상수 문자열이라 sqlite3의 statement 캐시에서 prepared statement로 재사용된다
+    _UPSERT_GLOBAL = "INSERT INTO globals(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+    _SELECT_META = "SELECT meta FROM conversations WHERE id = ?"
+    _UPSERT_META = (
+        "INSERT INTO conversations(id, meta, updated_at, version) VALUES (?, ?, ?, 1) "
+        "ON CONFLICT(id) DO UPDATE SET meta = excluded.meta, updated_at = excluded.updated_at, "
+        "version = version + 1"
+    )
+    _BUMP_VERSION = "UPDATE conversations SET version = version + 1 WHERE id = ?"
+    _SELECT_VERSION = "SELECT version FROM conversations WHERE id = ?"
+    _INSERT_ITEM = {
+        field: f"INSERT INTO {field}(conversation_id, payload) VALUES (?, ?)"
+        for field in CONVERSATION_LIST_FIELDS
+    }
+    _SELECT_ITEMS = {
+        field: f"SELECT payload FROM {field} WHERE conversation_id = ? ORDER BY seq"
+        for field in CONVERSATION_LIST_FIELDS
+    }
+    _DELETE_ITEMS = {
+        field: f"DELETE FROM {field} WHERE conversation_id = ?"
+        for field in CONVERSATION_LIST_FIELDS
+    }
+    _SELECT_LAST_MESSAGE = "SELECT payload FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT 1"
+    _SELECT_PAGE = "SELECT meta FROM conversations ORDER BY updated_at DESC, id DESC LIMIT ?"
+    _SELECT_PAGE_AFTER = (
+        "SELECT meta FROM conversations WHERE (updated_at, id) < (?, ?) "
+        "ORDER BY updated_at DESC, id DESC LIMIT ?"
+    )
+
+    def __init__(self, path: str = SQLITE_PATH) -> None:
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: 트랜잭션은 _transaction()에서 직접 BEGIN IMMEDIATE로 연다
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self._SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(conversations)")}
+            if VERSION_FIELD not in columns:
+                conn.execute("ALTER TABLE conversations ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            self._conn = conn
+            LOGGER.info("SQLite KV 스토어 사용: %s", path)
+        except sqlite3.Error as exc:
+            LOGGER.warning("SQLite KV 스토어 초기화 실패(%s): %s - 메모리 모드로 동작합니다.", path, exc)
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    _dumps = staticmethod(RedisKVStore._dumps)
+    _loads = staticmethod(RedisKVStore._loads)
+    _encode = staticmethod(RedisKVStore._encode)
+    _decode = staticmethod(RedisKVStore._decode)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # 전역 컨텍스트
+    # ------------------------------------------------------------------
+    def load_globals(self) -> Dict[str, Any]:
+        if not self._conn:
+            return {}
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM globals").fetchall()
+        return {key: self._decode(value) for key, value in rows}
+
+    def save_global(self, key: str, value: Any) -> bool:
+        return self._write_safely(globals={key: value})
+
+    # ------------------------------------------------------------------
+    # 대화방
+    # ------------------------------------------------------------------
+    def list_conversation_ids(self) -> List[str]:
+        if not self._conn:
+            return []
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM conversations ORDER BY updated_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def list_conversation_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """(updated_at, id) 인덱스를 타고 cursor 이후 limit개만 읽는다"""
+        if not self._conn:
+            return [], None
+        fetch = -1 if limit is None else limit + 1
+        with self._lock:
+            if cursor:
+                updated_at, conversation_id = decode_cursor(cursor)
+                rows = self._conn.execute(self._SELECT_PAGE_AFTER, (updated_at, conversation_id, fetch)).fetchall()
+            else:
+                rows = self._conn.execute(self._SELECT_PAGE, (fetch,)).fetchall()
+        has_more = limit is not None and len(rows) > limit
+        metas = [self._loads(row[0]) or {} for row in rows[:limit]]
+        next_cursor = None
+        if has_more and metas:
+            next_cursor = encode_cursor((metas[-1].get("updated_at") or "", metas[-1]["id"]))
+        return metas, next_cursor
+
+    def conversation_version(self, conversation_id: str) -> int:
+        if not self._conn:
+            return 0
+        with self._lock:
+            row = self._conn.execute(self._SELECT_VERSION, (conversation_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def load_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        if not self._conn:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT meta, version FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conversation = self._loads(row[0]) or {"id": conversation_id}
+            for field in CONVERSATION_LIST_FIELDS:
+                items = self._conn.execute(self._SELECT_ITEMS[field], (conversation_id,)).fetchall()
+                conversation[field] = [self._decode(item[0]) for item in items]
+        conversation[VERSION_FIELD] = int(row[1])
+        return conversation
+
+    def load_conversation_summaries(self, conversation_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        if not self._conn:
+            return []
+        summaries: List[Dict[str, Any]] = []
+        with self._lock:
+            for conversation_id in conversation_ids:
+                row = self._conn.execute(self._SELECT_META, (conversation_id,)).fetchone()
+                if row is None:
+                    continue
+                meta = self._loads(row[0]) or {"id": conversation_id}
+                if "last_message" not in meta:
+                    last = self._conn.execute(self._SELECT_LAST_MESSAGE, (conversation_id,)).fetchone()
+                    content = (self._decode(last[0]) or {}).get("content", "") if last else ""
+                    meta["last_message"] = preview_text(content)
+                summaries.append(meta)
+        return summaries
+
+    def save_conversation_meta(self, conversation: Dict[str, Any]) -> bool:
+        return self._write_safely(metas={conversation["id"]: conversation_meta(conversation)})
+
+    def append_conversation_item(self, conversation_id: str, field: str, item: Dict[str, Any]) -> bool:
+        if field not in CONVERSATION_LIST_FIELDS:
+            raise ValueError(f"Unknown conversation field: {field}")
+        return self._write_safely(appends=[(conversation_id, field, item)])
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        return self._write_safely(deletes=[conversation_id])
+
+    def _write_safely(self, **changes: Any) -> bool:
+        if not self._conn:
+            return False
+        batch = {"globals": {}, "metas": {}, "appends": [], "deletes": []}
+        batch.update(changes)
+        try:
+            self.write_batch(**batch)
+            return True
+        except sqlite3.Error as exc:
+            LOGGER.error("SQLite 저장 실패: %s", exc)
+            return False
+
+    def _delete_rows(self, conn: sqlite3.Connection, conversation_ids: List[str]) -> None:
+        params = [(conversation_id,) for conversation_id in conversation_ids]
+        for field in CONVERSATION_LIST_FIELDS:
+            conn.executemany(self._DELETE_ITEMS[field], params)
+        conn.executemany("DELETE FROM conversations WHERE id = ?", params)
+
+    def write_batch(
+        self,
+        *,
+        globals: Dict[str, Any],
+        metas: Dict[str, Dict[str, Any]],
+        appends: List[Tuple[str, str, Dict[str, Any]]],
+        deletes: List[str],
+    ) -> BatchVersions:
+        """write-behind 배치를 트랜잭션 하나로 bulk insert (실패 시 예외)"""
+        if not self._conn:
+            return {}
+        rows: Dict[str, List[Tuple[str, bytes]]] = {field: [] for field in CONVERSATION_LIST_FIELDS}
+        counts: Dict[str, int] = {conversation_id: 1 for conversation_id in metas}
+        for conversation_id, field, item in appends:
+            rows[field].append((conversation_id, self._encode(item)))
+            counts[conversation_id] = counts.get(conversation_id, 0) + 1
+        with self._transaction() as conn:
+            if deletes:
+                self._delete_rows(conn, deletes)
+            if globals:
+                conn.executemany(
+                    self._UPSERT_GLOBAL,
+                    [(key, self._encode(value)) for key, value in globals.items()],
+                )
+            meta_rows = []
+            for conversation_id, meta in metas.items():
+                current = conn.execute(self._SELECT_META, (conversation_id,)).fetchone()
+                current_meta = (self._loads(current[0]) or {}) if current else {}
+                merged = merge_conversation_meta(current_meta, conversation_meta(meta))
+                meta_rows.append((conversation_id, self._dumps(merged), merged.get("updated_at")))
+            if meta_rows:
+                conn.executemany(self._UPSERT_META, meta_rows)
+            for field, field_rows in rows.items():
+                if field_rows:
+                    conn.executemany(self._INSERT_ITEM[field], field_rows)
+                    conn.executemany(self._BUMP_VERSION, [(conversation_id,) for conversation_id, _ in field_rows])
+            versions: BatchVersions = {}
+            for conversation_id, count in counts.items():
+                row = conn.execute(self._SELECT_VERSION, (conversation_id,)).fetchone()
+                if row is not None:
+                    versions[conversation_id] = (int(row[0]), count)
+        return versions
+
+    def load_context(self) -> Optional[Dict[str, Any]]:
+        # 레거시 단일 JSON 포맷은 Redis에만 존재
+        return None
+
+    def migrate_legacy_context(self) -> bool:
+        return False
+
+
+def _create_kv_store():
+    """ESG_KV_BACKEND 설정에 따라 저장소 선택 (auto: Redis → SQLite 순으로 시도)"""
+    if KV_BACKEND == "sqlite":
+        return SQLiteKVStore()
+    store = RedisKVStore()
+    if store.available or KV_BACKEND == "redis":
+        return store
+    LOGGER.info("Redis를 사용할 수 없어 SQLite KV 스토어로 대체합니다.")
+    return SQLiteKVStore()
+
 
-kv_store = RedisKVStore()
+kv_store = _create_kv_store()
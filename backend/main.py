@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api import router as api_router
+from backend.manager import agent_manager
+from src.extraction.text_extractor import text_extractor
 
 app = FastAPI(title="ESG AI Agent API")
 from fastapi.staticfiles import StaticFiles
@@ -21,10 +23,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("shutdown")
+async def flush_pending_state():
+    # write-behind 큐에 남은 대화/컨텍스트 변경을 종료 전에 저장
+    agent_manager.shutdown()
+    text_extractor.shutdown(wait=False)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to ESG AI Agent API"}
@@ -1,9 +1,13 @@
 import sys
 import os
+import asyncio
+import hashlib
 import logging
+import threading
 import uuid
+from concurrent.futures import Future
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
 # Add project root to sys.path to allow importing src
@@ -13,8 +17,20 @@ from src.tools.regulation_tool import _monitor_instance as regulation_monitor
 from src.tools.risk import RiskToolOrchestrator
 from src.tools.policy_tool import policy_guideline_tool
 from src.tools.report_tool import draft_report
-from src.workflows.custom_graph import run_langgraph_pipeline
-from backend.kv_store import kv_store
+from src.workflows.agent_cache import cache_stats as agent_cache_stats, get_cache
+from src.workflows.custom_graph import pipeline_stats, regulation_cache_key, run_langgraph_pipeline
+from src.extraction.text_cache import extracted_text_cache
+from backend.kv_store import DEFAULT_CONVERSATION_TITLE, kv_store, preview_text
+from backend.blob_store import blob_store
+from backend.conversation_cache import TieredConversationCache
+from backend.conversation_index import ConversationIndex
+from backend.conversation_locks import ConversationLocks
+from backend.conversation_vectors import ConversationVectorStores
+from backend.conversation_memory import INDEXED_FIELD, SUMMARIZED_FIELD, SUMMARY_FIELD, ConversationMemory
+from backend.events import conversation_events
+from backend.executors import executors
+from backend.intent_classifier import intent_classifier
+from backend.write_behind import WriteBehindQueue
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
@@ -23,10 +39,15 @@ from langchain_core.messages import SystemMessage, HumanMessage
 
 LOGGER = logging.getLogger(__name__)
 CONVERSATION_VECTOR_DIR = Path("vector_db/conversations")
+# uvicorn --workers N 처럼 여러 프로세스가 같은 저장소를 쓸 때 1로 설정:
+# 저장소를 원본으로 보고 대화방 캐시를 버전으로 검증하며, 목록도 저장소에서 읽는다
+SHARED_STATE = os.getenv("ESG_SHARED_STATE", "0") == "1"
 
 
 class AgentManager:
-    DEFAULT_TITLE = "새 대화"
+    DEFAULT_TITLE = DEFAULT_CONVERSATION_TITLE
+    # 저장/캐시 검증용 내부 필드: 대화방 응답(project_conversation)에는 내보내지 않음
+    INTERNAL_FIELDS = frozenset({"version", SUMMARY_FIELD, SUMMARIZED_FIELD, INDEXED_FIELD})
 
     def __init__(self):
         # ① 업로드된 파일·규제 업데이트·정책 분석 등 모든 컨텍스트를 저장
@@ -37,11 +58,12 @@ class AgentManager:
             "risk_assessment": None,
             "report_draft": None,
             "chat_history": [],  # legacy
-            # 대화방별로 메시지를 보관하기 위한 저장소
-            "conversations": {},
         }
-        persisted = kv_store.load_context() or {}
-        # ④ Redis에 저장된 값이 있다면 기본 컨텍스트 위에 덮어써 복원
+        # ④ 레거시 단일 JSON이 남아 있으면 키별 저장 구조로 옮긴 뒤 전역 키만 복원
+        #    (대화방은 get_conversation 시점에 한 건씩 지연 로딩)
+        kv_store.migrate_legacy_context()
+        persisted = kv_store.load_globals()
+        persisted.pop("conversations", None)
         default_context.update(persisted)
         
         # [Strict Session] 서버 시작 시 과거 업로드 파일 기록은 초기화함 (User Request)
@@ -49,50 +71,136 @@ class AgentManager:
         default_context["uploaded_files"] = [] 
         
         self.shared_context = default_context
+        # 상태 변경은 dirty 표시만 하고 백그라운드에서 모아서 저장 (저장소 없으면 메모리 모드)
+        self._writer: Optional[WriteBehindQueue] = (
+            WriteBehindQueue(kv_store, on_flush=self._on_flush) if kv_store.available else None
+        )
+        self._shared = SHARED_STATE and kv_store.available
+        # 목록 API용 updated_at 정렬 인덱스: 기동 시 메타만 한 번 읽고 이후에는 변경 시점에 갱신
+        # (멀티 워커 모드에서는 저장소의 정렬 인덱스를 직접 읽는다)
+        self._index = ConversationIndex()
+        # 대화방별 잠금: 변경은 대화방 단위로 직렬화하고 서로 다른 대화방은 병렬 처리
+        self._locks = ConversationLocks()
+        # 로딩된 대화방 캐시: 최근 대화방만 메모리에 두고 나머지는 압축해 디스크로 내림
+        self._conversations = TieredConversationCache(self._locks)
+        if not self._shared:
+            for meta in kv_store.load_conversation_summaries(kv_store.list_conversation_ids()):
+                self._index.upsert(self._summarize(meta))
         self._risk_orchestrator = RiskToolOrchestrator()
         CONVERSATION_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
         # 업로드 파일용 임베딩/텍스트 분할기 (벡터DB에 재사용)
         # 업로드 파일을 Chroma에 넣기 위한 임베딩/청크 분리기
         self._conv_embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
         self._conv_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=120)
+        # 대화방 컬렉션은 공유 Chroma 클라이언트 하나에서 핸들을 재사용
+        self._vectors = ConversationVectorStores(self._conv_embeddings, CONVERSATION_VECTOR_DIR)
+        # 대화 기억: 최근 턴 원문 + 누적 요약 + 지난 턴 검색 (대화방 벡터 저장소의 memory 컬렉션)
+        self._memory = ConversationMemory(
+            lambda conversation_id, create=True: self._get_conversation_vectorstore(conversation_id, "memory", create=create)
+        )
+        # 대화방별 기억 갱신 작업 상태 (True면 실행 중에 새 턴이 들어와 한 번 더 갱신)
+        self._memory_jobs: Dict[str, bool] = {}
+        self._memory_jobs_lock = threading.Lock()
+        # 채팅의 보고서 생성 의도 판별도 같은 임베딩 모델을 재사용
+        intent_classifier.attach_embeddings(self._conv_embeddings)
         self._title_llm: Optional[ChatOpenAI] = None
+        # 대화방별 진행 중인 LLM 제목 생성 작업
+        self._title_jobs: Dict[str, Future] = {}
 
     def get_context(self) -> Dict[str, Any]:
         return self.shared_context
 
+    def get_context_summary(self, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """API 응답용 전역 컨텍스트: 요청한 키만 반환"""
+        return {
+            key: value
+            for key, value in self.shared_context.items()
+            if keys is None or key in keys
+        }
+
     def update_context(self, key: str, value: Any):
         self.shared_context[key] = value
-        self._persist_context()
+        self._persist_global(key)
+
+    def _persist_global(self, key: str):
+        # ⑤ 바뀐 전역 키 하나만 dirty 표시 (대화방은 _persist_conversation_* 로 따로 저장)
+        if key == "conversations" or self._writer is None:
+            return
+        self._writer.mark_global(key, self.shared_context.get(key))
+
+    def _persist_conversation_meta(self, conversation: Dict[str, Any]):
+        if self._writer is not None:
+            self._writer.mark_conversation_meta(conversation)
 
-    def _persist_context(self):
-        # ⑤ Redis 사용 가능 시 전체 컨텍스트를 JSON으로 동기화
-        if not kv_store.save_context(self.shared_context):
-            LOGGER.warning("Redis 컨텍스트 저장 실패 - 메모리 모드로 지속")
+    def _persist_conversation_item(self, conversation_id: str, field: str, item: Dict[str, Any]):
+        if self._writer is not None:
+            self._writer.mark_conversation_item(conversation_id, field, item)
+
+    def _on_flush(self, versions: Dict[str, Tuple[int, int]]):
+        """flush 결과 버전으로 로컬 캐시 버전을 갱신.
+
+        저장 전 버전 + 이번에 반영한 건수 == 저장 후 버전이면 다른 워커의 변경이
+        끼어들지 않은 것이므로 캐시를 최신으로 본다. 아니면 그대로 두어 다음
+        get_conversation에서 다시 읽게 한다.
+        """
+        for conversation_id, (version, applied) in versions.items():
+            conversation = self._conversations.peek(conversation_id)
+            if conversation is not None and conversation.get("version", 0) + applied == version:
+                conversation["version"] = version
+
+    def flush(self) -> bool:
+        """write-behind 큐에 남은 변경을 즉시 저장"""
+        return self._writer.flush() if self._writer is not None else True
+
+    def shutdown(self):
+        """서버 종료 시 남은 변경을 flush하고 백그라운드 스레드 정리"""
+        if self._writer is not None:
+            self._writer.close()
+        self._conversations.close()
+        executors.shutdown(wait=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        """/api/metrics 용 내부 지표"""
+        return {
+            "conversation_cache": self._conversations.stats(),
+            "write_behind": dict(self._writer.stats) if self._writer is not None else None,
+            "executors": executors.stats(),
+            "agent_cache": agent_cache_stats(),
+            "intent": intent_classifier.stats(),
+            "vector_stores": self._vectors.stats(),
+            "pipeline": pipeline_stats(),
+        }
 
     def _now(self) -> str:
         return datetime.now(timezone.utc).isoformat()
 
-    def _get_conversations(self) -> Dict[str, Any]:
-        # Redis 복원 시 conversations 키가 없을 수 있으므로 setdefault 사용
-        return self.shared_context.setdefault("conversations", {})
-
-    def list_conversations(self) -> List[Dict[str, Any]]:
-        conversations = self._get_conversations()
-        summaries: List[Dict[str, Any]] = []
-        for convo in conversations.values():
-            messages = convo.get("messages", [])
-            last_message = messages[-1]["content"] if messages else ""
-            summaries.append({
-                "id": convo.get("id"),
-                "title": convo.get("title", "새 대화"),
-                "updated_at": convo.get("updated_at"),
-                "last_message": last_message,
-            })
-        return sorted(
-            summaries,
-            key=lambda item: item.get("updated_at") or "",
-            reverse=True,
-        )
+    def _summarize(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": conversation.get("id"),
+            "title": conversation.get("title", self.DEFAULT_TITLE),
+            "updated_at": conversation.get("updated_at"),
+            "last_message": conversation.get("last_message", ""),
+        }
+
+    def _touch_conversation(self, conversation: Dict[str, Any]):
+        """메타 변경(제목·updated_at·미리보기)을 저장하고 정렬 인덱스를 갱신"""
+        if self._writer is not None and self._writer.is_deleted(conversation["id"]):
+            # 삭제 전에 대화방을 잡아 둔 작업이 늦게 끝난 경우 목록에 다시 넣지 않음
+            return
+        self._index.upsert(self._summarize(conversation))
+        self._conversations.touch(conversation["id"])
+        self._persist_conversation_meta(conversation)
+
+    def list_conversations(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """최근 업데이트 순 대화방 요약 한 페이지와 다음 페이지 커서"""
+        if self._shared:
+            metas, next_cursor = kv_store.list_conversation_page(limit=limit, cursor=cursor)
+            return [self._summarize(meta) for meta in metas], next_cursor
+        return self._index.page(limit=limit, cursor=cursor)
 
     def create_conversation(self, title: Optional[str] = None) -> Dict[str, Any]:
         # ChatGPT처럼 UUID 기반 세션을 생성
@@ -106,22 +214,131 @@ class AgentManager:
             "reports": [],
             "created_at": now,
             "updated_at": now,
+            "version": 0,
         }
-        conversations = self._get_conversations()
-        conversations[conv_id] = conversation
-        self.update_context("conversations", conversations)
+        self._conversations.put(conv_id, conversation)
+        self._touch_conversation(conversation)
         return conversation
 
     def delete_conversation(self, conversation_id: str) -> bool:
-        conversations = self._get_conversations()
-        if conversation_id in conversations:
-            conversations.pop(conversation_id)
-            self.update_context("conversations", conversations)
-            return True
-        return False
+        with self._locks.mutation(conversation_id):
+            if self.get_conversation(conversation_id) is None:
+                return False
+            self._conversations.pop(conversation_id)
+            self._index.remove(conversation_id)
+            if self._writer is not None:
+                self._writer.mark_conversation_deleted(conversation_id)
+        self._vectors.drop(conversation_id)
+        return True
 
     def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
-        return self._get_conversations().get(conversation_id)
+        if self._writer is not None and self._writer.is_deleted(conversation_id):
+            # 삭제가 아직 flush되지 않았어도 저장소에서 다시 읽어 되살리지 않음
+            return None
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None and self._shared and self._is_stale(conversation):
+            # 다른 워커가 변경한 대화방: 저장소에서 다시 읽는다
+            conversation = None
+        if conversation is None:
+            # 지연 로딩: 캐시에 없는 대화방만 kv_store에서 읽어 메모리에 올림
+            conversation = kv_store.load_conversation(conversation_id)
+            if conversation is not None:
+                self._conversations.put(conversation_id, conversation)
+            else:
+                self._conversations.pop(conversation_id)
+        return conversation
+
+    def _is_stale(self, conversation: Dict[str, Any]) -> bool:
+        # 아직 flush되지 않은 로컬 변경이 있으면 캐시가 더 최신이므로 유지
+        if self._writer is not None and self._writer.has_pending(conversation["id"]):
+            return False
+        return kv_store.conversation_version(conversation["id"]) != conversation.get("version", 0)
+
+    def project_conversation(
+        self,
+        conversation: Dict[str, Any],
+        *,
+        fields: Optional[List[str]] = None,
+        messages_since: Optional[str] = None,
+        include_file_text: bool = False,
+    ) -> Dict[str, Any]:
+        """대화방 응답을 필요한 필드만 잘라 반환.
+
+        - fields: 포함할 최상위 필드 (id는 항상 포함). None이면 전체
+        - messages_since: 이 시각(ISO) 이후 메시지만 포함
+        - include_file_text: 파일 본문 포함 여부 (기본은 메타만)
+        보고서 본문은 /reports 엔드포인트에서 읽으므로 여기서는 참조만 남긴다.
+        INTERNAL_FIELDS(version, 대화 기억 요약/위치)는 항상 뺀다.
+        """
+        projected: Dict[str, Any] = {"id": conversation.get("id")}
+        for key, value in conversation.items():
+            if key in self.INTERNAL_FIELDS:
+                continue
+            if fields is None or key in fields:
+                projected[key] = value
+        if "messages" in projected and messages_since:
+            projected["messages"] = [
+                message
+                for message in projected["messages"]
+                if (message.get("timestamp") or "") > messages_since
+            ]
+        if "files" in projected:
+            if include_file_text:
+                projected["files"] = [self._resolve(entry, "text") for entry in projected["files"]]
+            else:
+                projected["files"] = [
+                    {key: value for key, value in entry.items() if key != "text"}
+                    for entry in projected["files"]
+                ]
+        if "reports" in projected:
+            projected["reports"] = [
+                {key: value for key, value in report.items() if key != "content"}
+                for report in projected["reports"]
+            ]
+        return projected
+
+    def get_conversation_delta(self, conversation_id: str, since: str) -> Optional[Dict[str, Any]]:
+        """since(ISO) 이후에 추가된 메시지/파일/보고서와 현재 메타만 반환 (폴링용)"""
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            return None
+        delta = self.project_conversation(
+            conversation,
+            fields=["title", "updated_at", "last_message"],
+        )
+        delta["since"] = since
+        delta["messages"] = [
+            message for message in conversation.get("messages", [])
+            if (message.get("timestamp") or "") > since
+        ]
+        new_items = self.project_conversation(
+            {
+                "files": [entry for entry in conversation.get("files", []) if (entry.get("uploaded_at") or "") > since],
+                "reports": [report for report in conversation.get("reports", []) if (report.get("created_at") or "") > since],
+            }
+        )
+        delta["files"] = new_items["files"]
+        delta["reports"] = new_items["reports"]
+        return delta
+
+    @staticmethod
+    def conversation_etag(conversation: Dict[str, Any], *variant: Any) -> str:
+        """대화방 상태 + 응답 형태(projection 파라미터)로 만든 약한 ETag.
+
+        write-behind flush 전에는 version이 갱신되지 않으므로 updated_at과
+        항목 개수도 함께 넣어 로컬 변경을 반영한다.
+        """
+        state = (
+            conversation.get("id"),
+            conversation.get("version", 0),
+            conversation.get("updated_at"),
+            conversation.get("title"),
+            len(conversation.get("messages", [])),
+            len(conversation.get("files", [])),
+            len(conversation.get("reports", [])),
+        ) + variant
+        digest = hashlib.sha1(repr(state).encode("utf-8")).hexdigest()[:20]
+        return f'W/"{digest}"'
 
     def get_conversation_history(self, conversation_id: str) -> List[Dict[str, Any]]:
         conversation = self.get_conversation(conversation_id)
@@ -143,23 +360,37 @@ class AgentManager:
             for entry in files
         ]
 
+    def conversation_turn(self, conversation_id: str):
+        """채팅 한 턴(사용자 메시지 저장 → 응답 저장)을 대화방 단위로 직렬화하는 async 컨텍스트"""
+        return self._locks.turn(conversation_id)
+
     def append_conversation_message(self, conversation_id: str, role: str, content: str):
-        conversations = self._get_conversations()
-        conversation = conversations.get(conversation_id)
-        if conversation is None:
-            raise KeyError(f"Conversation not found: {conversation_id}")
-        now = self._now()
-        conversation.setdefault("messages", []).append({
-            "role": role,
-            "content": content,
-            "timestamp": now,
-        })
-        if role == "user":
-            title = conversation.get("title", "")
-            if not title or title == self.DEFAULT_TITLE:
-                conversation["title"] = self._guess_conversation_title(content)
-        conversation["updated_at"] = now
-        self.update_context("conversations", conversations)
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                raise KeyError(f"Conversation not found: {conversation_id}")
+            now = self._now()
+            message = {
+                "role": role,
+                "content": content,
+                "timestamp": now,
+            }
+            conversation.setdefault("messages", []).append(message)
+            provisional_title = None
+            if role == "user":
+                title = conversation.get("title", "")
+                if not title or title == self.DEFAULT_TITLE:
+                    # 우선 첫 줄로 만든 임시 제목을 쓰고 LLM 제목은 백그라운드에서 갱신
+                    provisional_title = self._guess_conversation_title(content)
+                    conversation["title"] = provisional_title
+            conversation["updated_at"] = now
+            conversation["last_message"] = preview_text(content)
+            self._persist_conversation_item(conversation_id, "messages", message)
+            self._touch_conversation(conversation)
+        if provisional_title is not None:
+            self._schedule_title(conversation_id, content, provisional_title)
+        if role == "assistant":
+            self._schedule_memory_update(conversation_id)
 
     def add_conversation_file(
         self,
@@ -170,10 +401,26 @@ class AgentManager:
         size_bytes: int,
         text: str,
     ):
-        conversations = self._get_conversations()
-        conversation = conversations.get(conversation_id)
-        if conversation is None:
-            raise KeyError(f"Conversation not found: {conversation_id}")
+        self.record_conversation_file(
+            conversation_id, filename=filename, path=path, size_bytes=size_bytes, text=text
+        )
+        # 대화방 전용 Chroma에 즉시 임베딩 upsert (오래 걸리므로 잠금 밖에서 실행)
+        try:
+            self._upsert_conversation_embeddings(conversation_id, text, filename)
+        except Exception as exc:  # pragma: no cover - 임베딩 실패 시 로그만 남김
+            LOGGER.warning("대화방 임베딩 추가 실패(%s): %s", conversation_id, exc)
+
+    def record_conversation_file(
+        self,
+        conversation_id: str,
+        *,
+        filename: str,
+        path: str,
+        size_bytes: int,
+        text: str,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """업로드 파일 항목만 대화방에 추가 (임베딩은 add_conversation_chunks로 따로)"""
         file_entry = {
             "id": str(uuid.uuid4()),
             "filename": filename,
@@ -181,51 +428,94 @@ class AgentManager:
             "size_bytes": size_bytes,
             "uploaded_at": self._now(),
             "text": (text or "")[:10000],
+            **(extra or {}),
         }
-        conversation.setdefault("files", []).append(file_entry)
+        # 본문은 blob 저장소로 옮기고 대화방에는 참조만 남김 (잠금 밖에서 저장)
+        file_entry = self._externalize(file_entry, "text")
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                raise KeyError(f"Conversation not found: {conversation_id}")
+            # 같은 내용의 파일이 동시에 두 번 올라온 경우 먼저 기록된 항목을 그대로 사용
+            existing = self._find_file(conversation, file_entry.get("sha256"))
+            if existing is not None:
+                return existing
+            conversation.setdefault("files", []).append(file_entry)
+            conversation["updated_at"] = self._now()
+            self._persist_conversation_item(conversation_id, "files", file_entry)
+            self._touch_conversation(conversation)
         # 전역 uploaded_files에도 정보 남겨두어 기존 로직 영향 최소화
         uploaded = self.shared_context.setdefault("uploaded_files", [])
         uploaded = [entry for entry in uploaded if entry.get("filename") != filename]
         uploaded.append({"filename": filename, "path": path})
         if len(uploaded) > 50:
             uploaded = uploaded[-50:]
-        self.shared_context["uploaded_files"] = uploaded
-        conversation["updated_at"] = self._now()
-        # 대화방 전용 Chroma에 즉시 임베딩 upsert
-        try:
-            self._upsert_conversation_embeddings(conversation_id, text, filename)
-        except Exception as exc:  # pragma: no cover - 임베딩 실패 시 로그만 남김
-            LOGGER.warning("대화방 임베딩 추가 실패(%s): %s", conversation_id, exc)
-        self.update_context("conversations", conversations)
+        self.update_context("uploaded_files", uploaded)
+        return file_entry
+
+    def find_conversation_file(self, conversation_id: str, sha256: str) -> Optional[Dict[str, Any]]:
+        """대화방에 같은 내용(sha256)의 파일이 이미 있으면 그 항목"""
+        conversation = self.get_conversation(conversation_id)
+        return self._find_file(conversation, sha256) if conversation else None
+
+    @staticmethod
+    def _find_file(conversation: Dict[str, Any], sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not sha256:
+            return None
+        return next((entry for entry in conversation.get("files", []) if entry.get("sha256") == sha256), None)
 
     def add_conversation_report(self, conversation_id: str, report_data: Dict[str, Any]):
-        conversations = self._get_conversations()
-        conversation = conversations.get(conversation_id)
-        if conversation is None:
-            raise KeyError(f"Conversation not found: {conversation_id}")
-        
         # report_data expected to have id, title, content, creates_at etc. 
         # If ID is missing, generate one
         if "id" not in report_data:
             report_data["id"] = str(uuid.uuid4())
         if "created_at" not in report_data:
             report_data["created_at"] = self._now()
-            
-        conversation.setdefault("reports", []).append(report_data)
-        conversation["updated_at"] = self._now()
-        self.update_context("conversations", conversations)
+        report_data = self._externalize(report_data, "content")
+
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                raise KeyError(f"Conversation not found: {conversation_id}")
+            conversation.setdefault("reports", []).append(report_data)
+            conversation["updated_at"] = self._now()
+            self._persist_conversation_item(conversation_id, "reports", report_data)
+            self._touch_conversation(conversation)
 
     def list_conversation_reports(self, conversation_id: str) -> List[Dict[str, Any]]:
         conversation = self.get_conversation(conversation_id)
         if not conversation:
             return []
-        return conversation.get("reports", [])
+        return [self._resolve(report, "content") for report in conversation.get("reports", [])]
+
+    @staticmethod
+    def _externalize(entry: Dict[str, Any], field: str) -> Dict[str, Any]:
+        """entry[field] 본문을 blob 저장소에 넣고 ``{field}_ref`` 참조만 남긴 사본 반환.
+
+        blob 저장에 실패하면 이전처럼 본문을 인라인으로 유지한다.
+        """
+        value = entry.get(field)
+        if not isinstance(value, str) or not value:
+            return entry
+        ref = blob_store.put_text(value)
+        if ref is None:
+            return entry
+        slim = {key: item for key, item in entry.items() if key != field}
+        slim[f"{field}_ref"] = ref
+        return slim
+
+    @staticmethod
+    def _resolve(entry: Dict[str, Any], field: str) -> Dict[str, Any]:
+        """``{field}_ref`` 참조를 blob 저장소에서 읽어 본문을 채운 사본 반환 (인라인 데이터는 그대로)"""
+        ref = entry.get(f"{field}_ref")
+        if field in entry or not ref:
+            return entry
+        resolved = dict(entry)
+        resolved[field] = blob_store.get_text(ref) or ""
+        return resolved
 
     def _guess_conversation_title(self, content: str) -> str:
-        """LLM을 사용해 대화 제목을 생성하고 실패 시 간단 요약으로 대체"""
-        generated = self._generate_title_with_llm(content)
-        if generated:
-            return generated
+        """첫 메시지의 첫 줄로 만든 임시 제목 (LLM 호출 없음)"""
         first_line = content.strip().splitlines()[0].strip()
         if first_line.endswith("?"):
             first_line = first_line[:-1]
@@ -233,8 +523,111 @@ class AgentManager:
             first_line = first_line[:20] + "..."
         return first_line or self.DEFAULT_TITLE
 
+    def _schedule_title(self, conversation_id: str, content: str, provisional: str) -> None:
+        future = executors.submit_background(self._refine_title, conversation_id, content, provisional)
+        self._title_jobs[conversation_id] = future
+
+        def _forget(finished: Future) -> None:
+            if self._title_jobs.get(conversation_id) is finished:
+                self._title_jobs.pop(conversation_id, None)
+
+        future.add_done_callback(_forget)
+
+    def _refine_title(self, conversation_id: str, content: str, provisional: str) -> None:
+        """LLM 제목으로 임시 제목을 교체하고 conversation.updated 이벤트 발행 (background 풀에서 실행)"""
+        title = self._generate_title_with_llm(content)
+        if not title or title == provisional:
+            return
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            # 그 사이 삭제되었거나 제목이 바뀌었으면 덮어쓰지 않음
+            if conversation is None or conversation.get("title") != provisional:
+                return
+            conversation["title"] = title
+            self._touch_conversation(conversation)
+            updated_at = conversation.get("updated_at")
+        conversation_events.publish(
+            {
+                "type": "conversation.updated",
+                "conversation_id": conversation_id,
+                "title": title,
+                "updated_at": updated_at,
+            }
+        )
+
+    async def wait_for_title(self, conversation_id: str, timeout: float) -> None:
+        """진행 중인 제목 생성이 있으면 최대 timeout초 기다린다 (SSE 응답 마무리용)"""
+        future = self._title_jobs.get(conversation_id)
+        if future is None or timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except Exception:
+            pass
+
+    def get_conversation_memory(self, conversation_id: str, query: str) -> Dict[str, Any]:
+        """프롬프트용 대화 기억 (summary, recalled, recent) - 대화가 길어져도 크기 일정"""
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            return {"summary": "", "recalled": [], "recent": []}
+        return self._memory.context(conversation, query)
+
+    def _schedule_memory_update(self, conversation_id: str) -> None:
+        with self._memory_jobs_lock:
+            if conversation_id in self._memory_jobs:
+                self._memory_jobs[conversation_id] = True
+                return
+            self._memory_jobs[conversation_id] = False
+        executors.submit_background(self._update_memory, conversation_id)
+
+    def _update_memory(self, conversation_id: str) -> None:
+        """완료된 턴을 임베딩하고 최근 N턴 밖으로 밀려난 메시지를 요약에 반영 (background 풀)"""
+        while True:
+            try:
+                self._refresh_memory(conversation_id)
+            except Exception as exc:  # pragma: no cover - 임베딩/요약 실패 시 다음 턴에 재시도
+                LOGGER.warning("대화 기억 갱신 실패(%s): %s", conversation_id, exc)
+            with self._memory_jobs_lock:
+                if not self._memory_jobs.get(conversation_id):
+                    self._memory_jobs.pop(conversation_id, None)
+                    return
+                self._memory_jobs[conversation_id] = False
+
+    def _refresh_memory(self, conversation_id: str) -> None:
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                return
+            messages = list(conversation.get("messages", []))
+            indexed = int(conversation.get(INDEXED_FIELD) or 0)
+            summary = conversation.get(SUMMARY_FIELD) or ""
+            summarized = int(conversation.get(SUMMARIZED_FIELD) or 0)
+        # 임베딩과 요약 LLM 호출은 잠금 밖에서 (메시지는 뒤에 덧붙기만 하므로 위치가 유지됨)
+        indexed_through = self._memory.remember(conversation_id, messages, indexed)
+        summarized_through = summarized
+        pending = self._memory.pending_summary({"messages": messages, SUMMARIZED_FIELD: summarized})
+        while pending is not None:
+            start, end = pending
+            updated = self._memory.summarize(summary, messages[start:end])
+            if updated is None:
+                break
+            summary, summarized_through = updated, end
+            pending = self._memory.pending_summary({"messages": messages, SUMMARIZED_FIELD: end})
+        if indexed_through == indexed and summarized_through == summarized:
+            return
+        with self._locks.mutation(conversation_id):
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                return
+            conversation[INDEXED_FIELD] = indexed_through
+            if summarized_through != summarized:
+                conversation[SUMMARY_FIELD] = summary
+                conversation[SUMMARIZED_FIELD] = summarized_through
+            self._touch_conversation(conversation)
+
     def build_file_context(self, conversation_id: str, *, max_total_chars: int = 4000) -> str:
-        files = self.get_conversation_files_with_text(conversation_id)
+        conversation = self.get_conversation(conversation_id)
+        files = conversation.get("files", []) if conversation else []
         if not files:
             return ""
         # 개수만큼 분배해 너무 긴 텍스트 방지
@@ -243,55 +636,85 @@ class AgentManager:
             slice_len = max_total_chars
         contexts = []
         for entry in files:
-            text = (entry.get("text") or "")[:slice_len]
+            text = self._file_text(entry)[:slice_len]
             if not text:
                 continue
             contexts.append(f"[파일: {entry.get('filename')}]\n{text}")
         return "\n\n".join(contexts)
 
+    def _file_text(self, entry: Dict[str, Any]) -> str:
+        """업로드 파일 본문: 추출 텍스트 캐시(전체) → 없으면 업로드 때 저장한 앞부분(blob)"""
+        sha256 = entry.get("sha256")
+        if sha256:
+            cached = extracted_text_cache.get(sha256, path=entry.get("path", ""))
+            if cached is not None:
+                return cached.text
+        return self._resolve(entry, "text").get("text") or ""
+
+    def get_conversation_file_texts(self, conversation_id: str) -> List[Tuple[str, str]]:
+        """대화방 파일별 (파일명, 본문). 본문은 sha256으로 추출 텍스트 캐시에서 찾는다 (파일을 다시 파싱하지 않음)"""
+        conversation = self.get_conversation(conversation_id)
+        if not conversation:
+            return []
+        return [(entry.get("filename") or "", self._file_text(entry)) for entry in conversation.get("files", [])]
+
     def get_conversation_files_with_text(self, conversation_id: str) -> List[Dict[str, Any]]:
         conversation = self.get_conversation(conversation_id)
         if not conversation:
             return []
-        return conversation.get("files", [])
-
-    def _get_conversation_vector_path(self, conversation_id: str) -> Path:
-        return CONVERSATION_VECTOR_DIR / conversation_id
-
-    def _get_conversation_vectorstore(self, conversation_id: str) -> Chroma:
-        persist_dir = str(self._get_conversation_vector_path(conversation_id))
-        os.makedirs(persist_dir, exist_ok=True)
-        return Chroma(
-            collection_name=f"convo_{conversation_id}",
-            embedding_function=self._conv_embeddings,
-            persist_directory=persist_dir,
-        )
+        return [self._resolve(entry, "text") for entry in conversation.get("files", [])]
+
+    def _get_conversation_vectorstore(
+        self, conversation_id: str, collection: str = "convo", *, create: bool = True
+    ) -> Optional[Chroma]:
+        """대화방 벡터 저장소의 컬렉션 (convo: 업로드 파일 청크, memory: 지난 대화 턴)"""
+        return self._vectors.get(conversation_id, collection, create=create)
+
+    def split_file_text(self, text: str) -> List[str]:
+        return self._conv_splitter.split_text(text) if text else []
+
+    def add_conversation_chunks(
+        self,
+        conversation_id: str,
+        filename: str,
+        chunks: List[str],
+        *,
+        start: int = 0,
+        metadata: Optional[Dict[str, Any]] = None,
+        source_id: Optional[str] = None,
+    ) -> int:
+        """이미 나눈 청크 한 묶음을 대화방 컬렉션에 임베딩 (넣는 즉시 RAG 검색 대상). 넣은 개수 반환
+
+        청크 ID는 source_id(파일 sha256) + 청크 번호라서 같은 파일을 다시 넣어도 벡터가 늘지 않는다.
+        """
+        if not chunks:
+            return 0
+        vectorstore = self._get_conversation_vectorstore(conversation_id)
+        metadatas = [{"filename": filename, "chunk": start + idx, **(metadata or {})} for idx in range(len(chunks))]
+        if source_id:
+            ids = [f"{source_id}-{start + idx}" for idx in range(len(chunks))]
+        else:
+            ids = [f"{filename}-{uuid.uuid4()}" for _ in chunks]
+        vectorstore.add_texts(texts=chunks, metadatas=metadatas, ids=ids)
+        return len(chunks)
+
+    def drop_conversation_chunks(self, conversation_id: str) -> None:
+        """삭제된 대화방에 뒤늦게 들어간 청크 정리 (add_conversation_chunks가 컬렉션을 다시 만든 경우)"""
+        self._vectors.drop(conversation_id)
 
     def _upsert_conversation_embeddings(self, conversation_id: str, text: str, filename: str):
         """대화방 전용 Chroma 컬렉션에 파일 청크를 업로드"""
         if not text:
             return
-        chunks = self._conv_splitter.split_text(text)
-        if not chunks:
-            return
-        vectorstore = self._get_conversation_vectorstore(conversation_id)
-        metadatas = [
-            {
-                "filename": filename,
-                "chunk": idx,
-            }
-            for idx, _ in enumerate(chunks)
-        ]
-        ids = [f"{filename}-{uuid.uuid4()}" for _ in chunks]
-        vectorstore.add_texts(texts=chunks, metadatas=metadatas, ids=ids)
+        source_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.add_conversation_chunks(conversation_id, filename, self.split_file_text(text), source_id=source_id)
 
     def retrieve_conversation_snippets(self, conversation_id: str, query: str, k: int = 4) -> List[str]:
         """대화방별 업로드 문서에서 쿼리와 유사한 청크를 검색"""
-        vector_path = self._get_conversation_vector_path(conversation_id)
-        if not vector_path.exists() or not any(vector_path.iterdir()):
-            return []
         try:
-            vectorstore = self._get_conversation_vectorstore(conversation_id)
+            vectorstore = self._get_conversation_vectorstore(conversation_id, create=False)
+            if vectorstore is None:
+                return []
             docs = vectorstore.similarity_search(query, k=k)
         except Exception as exc:  # pragma: no cover - 오류 발생 시 빈 컨텍스트 반환
             LOGGER.warning("대화방 RAG 검색 실패(%s): %s", conversation_id, exc)
@@ -327,14 +750,16 @@ class AgentManager:
         """
         print(f"🚀 [AgentManager] Starting Regulation Agent with query: {query}")
         
-        # Run the existing monitor logic
-        # Note: monitor_all is synchronous, might block if not careful, 
-        # but for now we run it directly. In production, use a thread pool or background task.
+        # 동기 코드(LLM 호출·크롤링)는 executor 스레드 풀에서 실행해 이벤트 루프를 막지 않음
         try:
             # report = regulation_monitor.monitor_all(query)
             # Use generate_report for instant response (browsing happens in background)
             # ② regulation/policy/risk/report agent 실행
-            report = regulation_monitor.generate_report(query)
+            # 파이프라인 regulation 노드와 같은 캐시를 공유 (동시 요청은 한 번만 생성)
+            report = await get_cache("regulation").aget_or_compute(
+                regulation_cache_key(),
+                lambda: executors.run_io(regulation_monitor.generate_report, query),
+            )
             self.update_context("regulation_updates", report)
             return report
         except Exception as e:
@@ -344,7 +769,11 @@ class AgentManager:
 
     async def run_policy_agent(self, query: str) -> str:
         try:
-            result = policy_guideline_tool(query)
+            cache = get_cache("policy")
+            result = await cache.aget_or_compute(
+                cache.key(query=query),
+                lambda: executors.run_io(policy_guideline_tool, query),
+            )
             self.update_context("policy_analysis", result)
             return result
         except Exception as exc:
@@ -355,7 +784,12 @@ class AgentManager:
     async def run_risk_agent(self, query: str, focus_area: Optional[str] = None) -> str:
         """리스크 오케스트레이터를 호출해 ISO31000/Materiality 결과를 생성하고 컨텍스트에 저장"""
         try:
-            result = self._risk_orchestrator.run(query=query, focus_area=focus_area)
+            # 임베딩 인코딩·점수 계산 위주라 프로세스 풀에서 실행 (오케스트레이터는 상태가 없어 pickle 가능)
+            cache = get_cache("risk")
+            result = await cache.aget_or_compute(
+                cache.key(query=query, focus_area=focus_area),
+                lambda: executors.run_cpu(self._risk_orchestrator.run, query=query, focus_area=focus_area),
+            )
             # ③ 최신 리스크 분석 리포트를 공유 컨텍스트에 넣어 챗봇·리포트 에이전트에서 활용
             self.update_context("risk_assessment", result)
             return result
@@ -366,7 +800,11 @@ class AgentManager:
 
     async def run_report_agent(self, query: str, audience: Optional[str] = None) -> str:
         try:
-            result = draft_report(query, audience)
+            cache = get_cache("report")
+            result = await cache.aget_or_compute(
+                cache.key(query=query, audience=audience),
+                lambda: executors.run_io(draft_report, query, audience),
+            )
             self.update_context("report_draft", result)
             return result
         except Exception as exc:
@@ -374,18 +812,34 @@ class AgentManager:
             LOGGER.error(error_msg)
             return error_msg
 
-    async def run_custom_agent(self, query: str, *, focus_area: Optional[str] = None, audience: Optional[str] = None) -> Dict[str, str]:
-        """LangGraph 기반 파이프라인으로 4개 모듈을 동시에 실행"""
-        result = run_langgraph_pipeline(query, focus_area, audience)
-        self.update_context("policy_analysis", result.get("policy"))
-        self.update_context("regulation_updates", result.get("regulation"))
-        self.update_context("risk_assessment", result.get("risk"))
-        self.update_context("report_draft", result.get("report"))
+    async def run_custom_agent(
+        self,
+        query: str,
+        *,
+        focus_area: Optional[str] = None,
+        audience: Optional[str] = None,
+        modules: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """LangGraph 파이프라인으로 질문에 필요한 모듈만 동시에 실행 (modules로 직접 지정 가능)"""
+        result = await executors.run_io(run_langgraph_pipeline, query, focus_area, audience, modules)
+        # 실행한 노드의 성공 결과만 컨텍스트에 반영 (생략·실패한 노드는 직전 값 유지)
+        failed = {error.get("node") for error in result.get("errors", [])}
+        route = result.get("route", [])
+        for node, context_key in (
+            ("policy", "policy_analysis"),
+            ("regulation", "regulation_updates"),
+            ("risk", "risk_assessment"),
+            ("report", "report_draft"),
+        ):
+            if node in route and node not in failed:
+                self.update_context(context_key, result.get(node))
         return {
             "policy": result.get("policy", ""),
             "regulation": result.get("regulation", ""),
             "risk": result.get("risk", ""),
             "report": result.get("report", ""),
+            "route": route,
+            "skipped": result.get("skipped", []),
         }
 
 # Singleton instance
@@ -0,0 +1,385 @@
+"""채팅 프롬프트 토큰 예산 관리.
+
+/chat, /chat/stream의 시스템 프롬프트에 들어가는 컨텍스트(대화 기록, 업로드 파일 발췌,
+RAG 세그먼트, 에이전트 결과 등)를 섹션으로 나누고, 전체 예산(ESG_PROMPT_BUDGET 토큰)을
+우선순위대로 나눠 준 뒤 각 섹션을 잘라 맞춘다.
+
+- 섹션별 상한(max_tokens)을 넘으면 잘라내고, 예산이 모자라면 우선순위가 낮은 섹션부터 줄인다.
+- 항목 리스트(대화 기록, 검색 세그먼트)는 항목 단위로 남긴다 (keep="tail"이면 최근 항목 우선).
+- HTML 보고서 등은 태그를 걷어낸 뒤 센다.
+
+토큰 수는 tiktoken(gpt-4o 인코딩)으로 세며, 설치되지 않았으면 UTF-8 바이트 수 기반 근사치를 쓴다.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+LOGGER = logging.getLogger(__name__)
+PROMPT_BUDGET = int(os.getenv("ESG_PROMPT_BUDGET", "6000"))
+PROMPT_MODEL = os.getenv("ESG_PROMPT_MODEL", "gpt-4o")
+
+TRUNCATION_MARK = " …(생략)"
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def _load_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(PROMPT_MODEL)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as exc:  # pragma: no cover - 인코딩 파일 다운로드 실패 등
+            LOGGER.warning("tiktoken 인코딩을 불러오지 못해 근사치로 셉니다: %s", exc)
+            return None
+
+
+_encoding = _load_encoding()
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # 한글 1자(3바이트) ≈ 1토큰, 영문 약 4자 ≈ 1토큰 → 바이트/3은 약간 넉넉한 추정
+    return math.ceil(len(text.encode("utf-8")) / 3)
+
+
+def truncate_tokens(text: str, max_tokens: int, *, keep: str = "head") -> str:
+    """text를 max_tokens 이하로 자른다 (keep="tail"이면 뒷부분 유지). 잘렸으면 생략 표시를 붙인다"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    limit = max(max_tokens - count_tokens(TRUNCATION_MARK), 1)
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        kept = tokens[-limit:] if keep == "tail" else tokens[:limit]
+        piece = _encoding.decode(kept)
+    else:
+        # 근사 모드: 바이트 예산에 맞춰 문자 단위로 자름
+        budget = limit * 3
+        chars: List[str] = []
+        used = 0
+        for char in reversed(text) if keep == "tail" else text:
+            used += len(char.encode("utf-8"))
+            if used > budget:
+                break
+            chars.append(char)
+        piece = "".join(reversed(chars)) if keep == "tail" else "".join(chars)
+    return TRUNCATION_MARK.strip() + " " + piece if keep == "tail" else piece + TRUNCATION_MARK
+
+
+def strip_html(text: str) -> str:
+    """보고서 HTML에서 태그를 걷어내 본문만 남긴다"""
+    return _BLANK_LINES.sub("\n", _TAG_PATTERN.sub(" ", text or "")).strip()
+
+
+@dataclass
+class PromptSection:
+    name: str
+    # 문자열 하나 또는 항목 리스트 (리스트는 항목 단위로 자른다)
+    content: Union[str, Sequence[str], None]
+    # 작을수록 먼저 예산을 받는다
+    priority: int = 5
+    max_tokens: Optional[int] = None
+    # head: 앞부분 유지, tail: 뒷부분(최근 항목) 유지
+    keep: str = "head"
+    separator: str = "\n\n"
+    empty: str = "None"
+
+
+@dataclass
+class FittedPrompt:
+    """섹션 이름 → 예산에 맞춘 텍스트, 섹션별 토큰 사용량"""
+
+    sections: Dict[str, str] = field(default_factory=dict)
+    usage: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(entry["used"] for entry in self.usage.values())
+
+
+class PromptBudget:
+    def __init__(self, budget: int = PROMPT_BUDGET) -> None:
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._prompts = 0
+
+    def fit(self, sections: Sequence[PromptSection]) -> FittedPrompt:
+        items = {section.name: self._items(section) for section in sections}
+        needs = {
+            section.name: count_tokens(section.separator.join(items[section.name]))
+            for section in sections
+        }
+        # 우선순위 순으로 min(필요량, 섹션 상한)만큼 배정
+        remaining = self.budget
+        allocation: Dict[str, int] = {}
+        for section in sorted(sections, key=lambda entry: entry.priority):
+            wanted = needs[section.name]
+            if section.max_tokens is not None:
+                wanted = min(wanted, section.max_tokens)
+            allocation[section.name] = min(wanted, remaining)
+            remaining -= allocation[section.name]
+
+        fitted = FittedPrompt()
+        for section in sections:
+            text = self._render(section, items[section.name], allocation[section.name])
+            used = count_tokens(text) if text else 0
+            fitted.sections[section.name] = text or section.empty
+            fitted.usage[section.name] = {
+                "available": needs[section.name],
+                "allocated": allocation[section.name],
+                "used": used,
+                "truncated": int(used < needs[section.name]),
+            }
+        self._record(fitted)
+        LOGGER.debug("프롬프트 섹션 토큰 사용량 (총 %d/%d): %s", fitted.total_tokens, self.budget, fitted.usage)
+        return fitted
+
+    def stats(self) -> Dict[str, object]:
+        """섹션별 누적 사용량 (프롬프트 수, 평균 토큰, 잘린 횟수)"""
+        with self._lock:
+            prompts = self._prompts
+            sections = {
+                name: {
+                    "avg_used": entry["used"] / prompts if prompts else 0.0,
+                    "avg_available": entry["available"] / prompts if prompts else 0.0,
+                    "truncated": entry["truncated"],
+                }
+                for name, entry in self._stats.items()
+            }
+        return {"budget": self.budget, "prompts": prompts, "sections": sections}
+
+    # ------------------------------------------------------------------
+    # 내부 구현
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _items(section: PromptSection) -> List[str]:
+        content = section.content
+        if content is None:
+            return []
+        if isinstance(content, str):
+            return [content] if content.strip() else []
+        return [str(item) for item in content if item and str(item).strip()]
+
+    @staticmethod
+    def _render(section: PromptSection, items: List[str], allocation: int) -> str:
+        if allocation <= 0 or not items:
+            return ""
+        joined = section.separator.join(items)
+        if count_tokens(joined) <= allocation:
+            return joined
+        if len(items) == 1:
+            return truncate_tokens(items[0], allocation, keep=section.keep)
+        # 항목 단위로 넣고, 첫 항목조차 넘치면 그 항목만 잘라 넣는다
+        ordered = list(reversed(items)) if section.keep == "tail" else items
+        separator_tokens = count_tokens(section.separator)
+        kept: List[str] = []
+        remaining = allocation
+        for item in ordered:
+            cost = count_tokens(item) + (separator_tokens if kept else 0)
+            if cost <= remaining:
+                kept.append(item)
+                remaining -= cost
+                continue
+            if not kept:
+                kept.append(truncate_tokens(item, remaining, keep=section.keep))
+            break
+        if section.keep == "tail":
+            kept.reverse()
+        return section.separator.join(kept)
+
+    def _record(self, fitted: FittedPrompt) -> None:
+        with self._lock:
+            self._prompts += 1
+            for name, usage in fitted.usage.items():
+                entry = self._stats.setdefault(name, {"used": 0, "available": 0, "truncated": 0})
+                entry["used"] += usage["used"]
+                entry["available"] += usage["available"]
+                entry["truncated"] += usage["truncated"]
+
+
+prompt_budget = PromptBudget()
+
+
+def build_chat_context(
+    context: Dict[str, object],
+    *,
+    file_names: Sequence[str],
+    file_context: str,
+    rag_snippets: Sequence[str],
+    history: Sequence[Dict[str, str]] = (),
+    summary: str = "",
+    recalled: Sequence[str] = (),
+    budget: Optional[PromptBudget] = None,
+) -> FittedPrompt:
+    """채팅 시스템 프롬프트의 컨텍스트 섹션을 예산에 맞춘다 (/chat, /chat/stream 공용).
+
+    history는 최근 턴 원문, summary는 그 이전 대화의 누적 요약, recalled는 질문과 관련된 지난 턴.
+    """
+    history_lines = [
+        f"User: {entry.get('content', '')}" if entry.get("role") == "user" else f"Assistant: {entry.get('content', '')}"
+        for entry in history
+    ]
+    report_draft = context.get("report_draft")
+    sections = [
+        PromptSection("files", list(file_names), priority=0, max_tokens=200, separator=", "),
+        # 질문과 직접 관련된 근거가 가장 중요
+        PromptSection("rag", list(rag_snippets), priority=1, max_tokens=1500),
+        PromptSection("history", history_lines, priority=2, max_tokens=1500, keep="tail", separator="\n"),
+        PromptSection("summary", summary, priority=2, max_tokens=500),
+        PromptSection("recall", list(recalled), priority=3, max_tokens=800),
+        PromptSection("file_context", file_context, priority=3, max_tokens=1200),
+        PromptSection("regulation", _as_text(context.get("regulation_updates")), priority=4, max_tokens=300),
+        PromptSection("policy", _as_text(context.get("policy_analysis")), priority=4, max_tokens=600),
+        PromptSection("risk", _as_text(context.get("risk_assessment")), priority=5, max_tokens=300),
+        PromptSection("report", strip_html(_as_text(report_draft)), priority=6, max_tokens=400),
+    ]
+    return (budget or prompt_budget).fit(sections)
+
+
+def _as_text(value: object) -> str:
+    return "" if value is None else str(value)
+
+
+# ----------------------------------------------------------------------
+# 프롬프트 배치 (provider prompt-prefix 캐시용)
+# ----------------------------------------------------------------------
+# 정적 앞부분(페르소나·지침·형식 규칙)은 바이트 단위로 항상 같아야 캐시된다.
+# 그 뒤에는 같은 대화방 안에서 덜 바뀌는 것부터 둔다: 업로드 파일 → 요약 → 기록(뒤에 덧붙기만 함).
+# 에이전트 결과는 프로세스 전역 컨텍스트라 다른 대화방의 에이전트 실행으로도 바뀌므로
+# 검색 세그먼트와 함께 맨 뒤 턴별 구간에 둔다.
+#
+# provider(OpenAI)는 PROMPT_CACHE_MIN_TOKENS 이상인 앞부분만 캐시한다. 정적 지침만으로는
+# 이 길이에 못 미치고, 파일 발췌와 대화 기록이 쌓이면서 넘어선다 (scripts/check_prompt_prefix.py).
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+CHAT_INSTRUCTIONS = """You are an expert ESG AI Assistant. Provide concise, tailored answers that reflect the user's goal and constraints.
+
+[Instructions]
+- Start by tagging the user's goal/constraints in one line; if unclear, ask ONE short clarifying question, then proceed.
+- Use evidence in this priority: Regulation Updates → Policy Analysis → Risk Assessment → Report Draft → Uploaded Files → Chat History; if absent, note '해당 근거 없음'.
+- Keep internal reasoning to 3 short lines before responding.
+- Do not invent numbers/dates absent from context; flag missing data explicitly. When giving numbers, cite the source inline. If regulation/policy is mentioned, add a one-line note that this is not legal advice.
+- Tone: professional and friendly; keep sections 2–4 bullets/lines; keep the whole response concise (~200 words).
+- Language follows the user (default Korean); avoid mixing languages. Use - or * for bullets, **bold** for emphasis, `code` for technical terms.
+- If confidence is low, mark it (신뢰도: 높음/중간/낮음) and suggest what to check next (file/regulation/data).
+- ALWAYS use MARKDOWN formatting.
+- 업로드된 파일이나 검색된 세그먼트에서 중요 근거가 있으면 인용해 설명하라.
+- 중요한 숫자·지표·정책명은 굵게 표시해 주목성을 높여라.
+- 모르는 내용은 솔직하게 밝혀라
+- 기본 언어는 한국어이지만, 사용자가 영어로 질문하면 동일 언어로 답하라.
+
+If you don't know, say so and recommend running the appropriate agent (Regulation, Policy, Risk, Report)
+"""
+
+STREAM_GUIDELINES = """You are an expert ESG AI Assistant. Provide concise, tailored answers that reflect the user's goal and constraints.
+
+[Guidelines]
+- 질문 의도에 맞춰 유연하게 Markdown을 사용하되, 필요하면 요약/근거/권고 등으로 자연스럽게 나눠라.
+- Regulation 관련 질문에는 최신 규제 업데이트를 우선적으로 언급하라.
+- 업로드 파일/검색된 세그먼트에서 나온 핵심 증거를 우선 인용하라.
+- 주요 수치나 정책명은 **굵게** 표시해 강조하고, 근거가 부족하면 솔직히 말하고 어떤 에이전트를 호출해야 할지 제안하라.
+- 기본 언어는 한국어이며, 사용자가 영어로 질문하면 영어로 답하라.
+"""
+
+# 여기부터는 턴마다(또는 다른 대화방의 에이전트 실행으로) 바뀌는 데이터
+DYNAMIC_MARKER = "[Agent Results]"
+
+
+def compose_system_prompt(
+    static_prefix: str,
+    fitted: FittedPrompt,
+    *,
+    notes: Sequence[str] = (),
+) -> str:
+    """정적 지침 → 업로드 파일 → 요약 → 기록 → 턴별 데이터(에이전트 결과, 검색 세그먼트, 관련 지난 턴, 메모) 순서로 조립"""
+    sections = fitted.sections
+    semi_static = [
+        # 대화방의 파일 목록·발췌는 업로드할 때만 바뀜
+        "[Uploaded Files]",
+        sections["files"],
+        "",
+        "[Uploaded File Excerpts]",
+        sections["file_context"],
+        # 요약은 가끔만 갱신되고 최근 기록은 뒤에 덧붙기만 하므로 앞 턴과 같은 앞부분을 유지
+        "",
+        "[Conversation Summary]",
+        sections["summary"],
+        "",
+        "[Conversation History]",
+        sections["history"],
+    ]
+    dynamic = [
+        DYNAMIC_MARKER,
+        f"- Latest Regulation Updates: {sections['regulation']}",
+        f"- Policy Analysis: {sections['policy']}",
+        f"- Risk Assessment: {sections['risk']}",
+        f"- Report Draft: {sections['report']}",
+        "",
+        "[Retrieved Segments from Uploaded Files]",
+        sections["rag"],
+        "",
+        "[Relevant Earlier Turns]",
+        sections["recall"],
+    ]
+    for note in notes:
+        dynamic += ["", "[System Note]", note]
+    return "\n".join([static_prefix, *semi_static, "", *dynamic, ""])
+
+
+class PromptCacheStats:
+    """LLM 응답 usage에서 provider 프롬프트 캐시 적중 토큰을 집계"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats = {"responses": 0, "input_tokens": 0, "cached_tokens": 0}
+
+    def record(self, message: object) -> None:
+        """AIMessage/AIMessageChunk의 usage를 기록 (usage가 없으면 무시)"""
+        input_tokens, cached_tokens = _usage_of(message)
+        if input_tokens is None:
+            return
+        with self._lock:
+            self._stats["responses"] += 1
+            self._stats["input_tokens"] += input_tokens
+            self._stats["cached_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+        stats["uncached_tokens"] = stats["input_tokens"] - stats["cached_tokens"]
+        stats["cached_ratio"] = stats["cached_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0
+        return stats
+
+
+def _usage_of(message: object):
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        details = usage.get("input_token_details") or {}
+        return int(usage["input_tokens"]), int(details.get("cache_read") or 0)
+    # 이전 langchain-openai: response_metadata.token_usage.prompt_tokens_details.cached_tokens
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    if token_usage.get("prompt_tokens") is None:
+        return None, 0
+    details = token_usage.get("prompt_tokens_details") or {}
+    return int(token_usage["prompt_tokens"]), int(details.get("cached_tokens") or 0)
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,157 @@
+"""kv_store에 저장하는 값(메시지/파일/보고서 항목, 전역 컨텍스트)의 직렬화.
+
+저장 포맷: ``MAGIC(2) + 포맷 버전(1) + 직렬화기 ID(1) + 압축 ID(1) + 본문``.
+헤더가 없는 값은 이전 버전이 ``json.dumps(..., ensure_ascii=False)``로 저장한
+텍스트로 보고 그대로 JSON 파싱하므로 기존 데이터는 마이그레이션 없이 읽힌다.
+
+직렬화기/압축은 설치된 패키지에 따라 선택된다.
+- ESG_SERIALIZER: auto(orjson → json) | json | orjson | msgpack
+- ESG_COMPRESSION: auto(zstd → lz4 → zlib) | none | zlib | zstd | lz4
+- ESG_COMPRESS_MIN_BYTES: 이보다 작은 값은 압축하지 않음 (기본 512)
+
+읽기는 헤더의 ID를 보고 복원하므로 설정을 바꿔도 이전에 쓴 값을 읽을 수 있다.
+"""
+
+import json
+import logging
+import os
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+LOGGER = logging.getLogger(__name__)
+SERIALIZER = os.getenv("ESG_SERIALIZER", "auto").lower()
+COMPRESSION = os.getenv("ESG_COMPRESSION", "auto").lower()
+COMPRESS_MIN_BYTES = int(os.getenv("ESG_COMPRESS_MIN_BYTES", "512"))
+
+MAGIC = b"\x00E"
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+# 헤더에 기록하는 ID. 한 번 쓴 번호는 바꾸지 않는다
+SERIALIZER_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+COMPRESSION_IDS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+Payload = Union[bytes, str]
+_Pair = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(raw: bytes) -> Any:
+    return json.loads(raw.decode("utf-8"))
+
+
+def _serializers() -> Dict[str, _Pair]:
+    pairs: Dict[str, _Pair] = {"json": (_json_dumps, _json_loads)}
+    if orjson is not None:
+        # orjson은 json과 같은 바이트를 만들지만 ID를 따로 두어 어떤 쪽으로도 읽을 수 있다
+        pairs["orjson"] = (orjson.dumps, orjson.loads)
+    if msgpack is not None:
+        pairs["msgpack"] = (
+            lambda value: msgpack.packb(value, use_bin_type=True),
+            lambda raw: msgpack.unpackb(raw, raw=False),
+        )
+    return pairs
+
+
+def _compressors() -> Dict[str, _Pair]:
+    pairs: Dict[str, _Pair] = {
+        "none": (bytes, bytes),
+        "zlib": (lambda raw: zlib.compress(raw, 6), zlib.decompress),
+    }
+    if zstandard is not None:
+        pairs["zstd"] = (
+            lambda raw: zstandard.ZstdCompressor(level=3).compress(raw),
+            lambda raw: zstandard.ZstdDecompressor().decompress(raw),
+        )
+    if lz4_frame is not None:
+        pairs["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+    return pairs
+
+
+def _pick(requested: str, available: Dict[str, _Pair], preference: Tuple[str, ...], kind: str) -> str:
+    if requested == "auto":
+        return next(name for name in preference if name in available)
+    if requested not in available:
+        fallback = next(name for name in preference if name in available)
+        LOGGER.warning("%s '%s'을(를) 사용할 수 없어 '%s'로 대체합니다.", kind, requested, fallback)
+        return fallback
+    return requested
+
+
+class PayloadCodec:
+    """헤더가 붙은 바이트로 값을 인코딩/디코딩"""
+
+    def __init__(
+        self,
+        serializer: str = "auto",
+        compression: str = "auto",
+        *,
+        min_compress_bytes: int = COMPRESS_MIN_BYTES,
+    ) -> None:
+        self._serializers = _serializers()
+        self._compressors = _compressors()
+        self.serializer = _pick(serializer, self._serializers, ("orjson", "json"), "직렬화기")
+        self.compression = _pick(compression, self._compressors, ("zstd", "lz4", "zlib", "none"), "압축")
+        self.min_compress_bytes = min_compress_bytes
+        self._by_serializer_id = {SERIALIZER_IDS[name]: pair for name, pair in self._serializers.items()}
+        self._by_compression_id = {COMPRESSION_IDS[name]: pair for name, pair in self._compressors.items()}
+
+    def dumps(self, value: Any) -> bytes:
+        body = self._serializers[self.serializer][0](value)
+        compression = "none"
+        if self.compression != "none" and len(body) >= self.min_compress_bytes:
+            compressed = self._compressors[self.compression][0](body)
+            # 압축 이득이 없으면(이미 짧거나 난수성 데이터) 원본 유지
+            if len(compressed) < len(body):
+                body, compression = compressed, self.compression
+        header = MAGIC + bytes((FORMAT_VERSION, SERIALIZER_IDS[self.serializer], COMPRESSION_IDS[compression]))
+        return header + body
+
+    def loads(self, raw: Optional[Payload]) -> Any:
+        """헤더가 있으면 해당 포맷으로, 없으면 레거시 JSON 텍스트로 복원"""
+        if raw is None:
+            return None
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not raw.startswith(MAGIC):
+            return json.loads(raw.decode("utf-8"))
+        version, serializer_id, compression_id = raw[len(MAGIC):HEADER_SIZE]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported payload format version: {version}")
+        serializer = self._by_serializer_id.get(serializer_id)
+        compressor = self._by_compression_id.get(compression_id)
+        if serializer is None or compressor is None:
+            # 다른 환경에서 msgpack/zstd 등으로 쓴 값을 패키지 없이 읽으려는 경우
+            raise ValueError(
+                f"Payload codec not available (serializer={serializer_id}, compression={compression_id})"
+            )
+        return serializer[1](compressor[1](raw[HEADER_SIZE:]))
+
+    def describe(self) -> str:
+        return f"{self.serializer}+{self.compression}"
+
+
+payload_codec = PayloadCodec(SERIALIZER, COMPRESSION)
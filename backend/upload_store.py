@@ -0,0 +1,79 @@
+"""업로드 원본 파일의 content-addressed 저장소.
+
+파일은 내용의 SHA-256으로 ``data/uploads/objects/ab/<sha256><확장자>``에 한 번만 저장하고,
+대화방 파일 항목은 이 경로와 sha256만 참조한다. 이름이 같은 다른 파일이 서로를 덮어쓰지
+않고, 같은 파일을 여러 대화방에 올려도 원본은 하나다.
+
+저장 중에는 임시 파일에 쓰면서 해시를 계산하고, 같은 객체가 이미 있으면 임시 파일을 버린다.
+객체는 여러 대화방이 공유하므로 대화방 삭제 시 함께 지우지 않는다 (blob_store와 동일).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict
+
+LOGGER = logging.getLogger(__name__)
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "uploads")
+OBJECTS_DIR = "objects"
+# /static/uploads/... 경로로 공개되는 파일 (레거시 uploaded_files 항목)
+STATIC_PREFIX = "/static/uploads/"
+_COPY_BLOCK = 1 << 20
+
+
+def _suffix(filename: str) -> str:
+    # 추출기가 확장자로 형식을 판단하므로 원래 확장자는 유지 (경로 조작 방지를 위해 영숫자만)
+    suffix = Path(filename or "").suffix.lower()
+    if 1 < len(suffix) <= 10 and suffix[1:].isalnum():
+        return suffix
+    return ""
+
+
+class UploadStore:
+    def __init__(self, root: str = UPLOAD_DIR) -> None:
+        self._root = Path(root)
+
+    def save(self, source: BinaryIO, filename: str) -> Dict[str, Any]:
+        """source를 저장하고 {"sha256", "path", "size_bytes", "created"} 반환"""
+        objects = self._root / OBJECTS_DIR
+        objects.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size_bytes = 0
+        fd, tmp_path = tempfile.mkstemp(dir=objects, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for block in iter(lambda: source.read(_COPY_BLOCK), b""):
+                    digest.update(block)
+                    size_bytes += len(block)
+                    handle.write(block)
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256, filename)
+            created = not path.exists()
+            if created:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+            return {"sha256": sha256, "path": str(path), "size_bytes": size_bytes, "created": created}
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def path_for(self, sha256: str, filename: str) -> Path:
+        return self._root / OBJECTS_DIR / sha256[:2] / f"{sha256}{_suffix(filename)}"
+
+    def static_path(self, path: str) -> str:
+        """저장 경로 → /static/uploads/... 공개 경로"""
+        return STATIC_PREFIX + Path(path).relative_to(self._root).as_posix()
+
+    def resolve(self, entry: Dict[str, Any]) -> str:
+        """uploaded_files 항목의 실제 파일 경로 (레거시 항목은 uploads/<filename>)"""
+        path = entry.get("path") or ""
+        if path.startswith(STATIC_PREFIX):
+            return str(self._root / path[len(STATIC_PREFIX):])
+        if path and os.path.isabs(path):
+            return path
+        return str(self._root / (entry.get("filename") or ""))
+
+
+upload_store = UploadStore()
@@ -0,0 +1,192 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+# 첫 변경 이후 이 시간(초) 동안 들어온 쓰기를 모아 한 번에 flush
+FLUSH_INTERVAL = float(os.getenv("ESG_WRITE_BEHIND_INTERVAL", "0.05"))
+
+# 대화방 dict 중 메타가 아닌 리스트 필드 (kv_store와 동일)
+_LIST_FIELDS = ("messages", "files", "reports")
+# 삭제한 대화방 ID를 기억하는 개수 (ID는 uuid4라 재사용되지 않으므로 오래 들고 있어도 안전)
+TOMBSTONES_MAX = int(os.getenv("ESG_WRITE_BEHIND_TOMBSTONES", "10000"))
+
+
+class WriteBehindQueue:
+    """AgentManager 상태 변경을 모아 백그라운드 스레드에서 kv_store에 반영.
+
+    - 전역 키/대화방 메타는 마지막 값만 남기고 덮어써 coalescing
+    - 메시지/파일/보고서 추가는 순서를 보존해 한 번에 배치 전송
+    - 요청 경로에서는 dirty 표시만 하므로 Redis 왕복·직렬화 비용이 빠진다
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        *,
+        flush_interval: float = FLUSH_INTERVAL,
+        on_flush: Optional[Callable[[Dict[str, Tuple[int, int]]], None]] = None,
+    ) -> None:
+        self._store = store
+        # flush 후 저장소가 돌려준 대화방별 (버전, 반영 건수)를 전달받는 콜백
+        self._on_flush = on_flush
+        self._flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._globals: Dict[str, Any] = {}
+        self._metas: Dict[str, Dict[str, Any]] = {}
+        self._appends: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._deletes: List[str] = []
+        # 삭제된 대화방: 이후 들어오는 메타/항목 쓰기를 버려 늦게 끝난 작업이 대화방을 되살리지 않게 함
+        self._tombstones: "OrderedDict[str, None]" = OrderedDict()
+        self._closed = False
+        self._write_lock = threading.Lock()
+        self.stats = {"marked": 0, "flushes": 0, "written": 0, "failures": 0}
+        self._thread = threading.Thread(target=self._run, name="kv-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # 요청 경로에서 호출 (메모리 조작만 수행)
+    # ------------------------------------------------------------------
+    def mark_global(self, key: str, value: Any) -> None:
+        with self._cond:
+            self._globals[key] = value
+            self._notify()
+
+    def mark_conversation_meta(self, conversation: Dict[str, Any]) -> None:
+        meta = {key: value for key, value in conversation.items() if key not in _LIST_FIELDS}
+        with self._cond:
+            if meta["id"] in self._tombstones:
+                return
+            self._metas[meta["id"]] = meta
+            self._notify()
+
+    def mark_conversation_item(self, conversation_id: str, field: str, item: Dict[str, Any]) -> None:
+        with self._cond:
+            if conversation_id in self._tombstones:
+                return
+            self._appends.append((conversation_id, field, item))
+            self._notify()
+
+    def mark_conversation_deleted(self, conversation_id: str) -> None:
+        with self._cond:
+            # 아직 쓰지 않은 변경은 버리고 삭제만 남긴다
+            self._metas.pop(conversation_id, None)
+            self._appends = [op for op in self._appends if op[0] != conversation_id]
+            self._deletes.append(conversation_id)
+            self._tombstones[conversation_id] = None
+            while len(self._tombstones) > TOMBSTONES_MAX:
+                self._tombstones.popitem(last=False)
+            self._notify()
+
+    def is_deleted(self, conversation_id: str) -> bool:
+        with self._cond:
+            return conversation_id in self._tombstones
+
+    def _notify(self) -> None:
+        self.stats["marked"] += 1
+        self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # flush
+    # ------------------------------------------------------------------
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending_count()
+
+    def has_pending(self, conversation_id: str) -> bool:
+        with self._cond:
+            return conversation_id in self._metas or any(op[0] == conversation_id for op in self._appends)
+
+    def _pending_count(self) -> int:
+        return len(self._globals) + len(self._metas) + len(self._appends) + len(self._deletes)
+
+    def _take_batch(self) -> Dict[str, Any]:
+        batch = {
+            "globals": self._globals,
+            "metas": self._metas,
+            "appends": self._appends,
+            "deletes": self._deletes,
+        }
+        self._globals, self._metas, self._appends, self._deletes = {}, {}, [], []
+        return batch
+
+    def _requeue(self, batch: Dict[str, Any]) -> None:
+        # 실패한 배치는 그 사이 들어온 최신 값보다 앞에 다시 넣는다
+        for key, value in batch["globals"].items():
+            self._globals.setdefault(key, value)
+        for conversation_id, meta in batch["metas"].items():
+            self._metas.setdefault(conversation_id, meta)
+        self._appends = batch["appends"] + self._appends
+        self._deletes = batch["deletes"] + self._deletes
+
+    def _write(self, batch: Dict[str, Any]) -> bool:
+        try:
+            versions = self._store.write_batch(**batch)
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.error("write-behind flush 실패: %s", exc)
+            self.stats["failures"] += 1
+            return False
+        self.stats["flushes"] += 1
+        self.stats["written"] += sum(len(value) for value in batch.values())
+        if versions and self._on_flush is not None:
+            try:
+                self._on_flush(versions)
+            except Exception as exc:  # pragma: no cover - 콜백 오류는 저장 성공과 무관
+                LOGGER.warning("write-behind flush 콜백 실패: %s", exc)
+        return True
+
+    def _flush_once(self) -> bool:
+        # 백그라운드 flush와 명시적 flush가 겹쳐도 배치 순서가 바뀌지 않도록 직렬화
+        with self._write_lock:
+            with self._cond:
+                batch = self._take_batch()
+            if not any(batch.values()):
+                return True
+            ok = self._write(batch)
+            if not ok:
+                with self._cond:
+                    self._requeue(batch)
+            return ok
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._pending_count():
+                    self._cond.wait()
+                if self._closed and not self._pending_count():
+                    return
+                # 짧은 창 동안 들어오는 쓰기를 모아서 함께 보낸다 (close 시 즉시 flush)
+                deadline = time.monotonic() + self._flush_interval
+                while not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            if self._flush_once():
+                continue
+            with self._cond:
+                if self._closed:
+                    return
+                # 저장소 장애 시 바쁜 재시도 방지
+                self._cond.wait(max(self._flush_interval, 1.0))
+
+    def flush(self) -> bool:
+        """현재까지 쌓인 변경을 즉시 동기 반영 (종료·테스트용)"""
+        return self._flush_once()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """남은 변경을 모두 flush한 뒤 백그라운드 스레드를 종료"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self.pending:
+            self.flush()
@@ -118,6 +118,10 @@ function ChatBotPanel({ conversationId, onConversationUpdated, onConversationCha
               onConversationUpdated()
             }
           }
+          if (payload.conversation_updated && onConversationUpdated) {
+            // 백그라운드에서 생성된 대화 제목 등 메타 변경 → 목록 갱신
+            onConversationUpdated()
+          }
           if (payload.report) {
             // Signal MainContent to add this report
             // Simple logic: Use current query as title (or generic) and split items by newlines for now (since report is markdown)
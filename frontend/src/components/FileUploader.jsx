@@ -3,6 +3,7 @@ import fileIcon from "../assets/file_icon.png"
 
 export default function FileUploader({ conversationId, files = [], onUploadComplete }) {
     const [isDragging, setIsDragging] = useState(false)
+    const [jobs, setJobs] = useState({})
     const fileInputRef = useRef(null)
 
     const handleDragOver = (e) => {
@@ -27,6 +28,34 @@ export default function FileUploader({ conversationId, files = [], onUploadCompl
         await uploadFiles(selectedFiles)
     }
 
+    // 서버가 추출·임베딩을 끝내면 파일 목록을 다시 불러옴
+    const watchJob = (jobId) => {
+        const source = new EventSource(`http://localhost:8000/api/uploads/${jobId}/events`)
+        source.onmessage = (event) => {
+            const job = JSON.parse(event.data)
+            setJobs((prev) => ({ ...prev, [jobId]: job }))
+            if (job.status === "done" || job.status === "failed") {
+                source.close()
+                setJobs((prev) => {
+                    const next = { ...prev }
+                    delete next[jobId]
+                    return next
+                })
+                if (job.status === "failed") console.error("Upload processing failed:", job.error)
+                if (onUploadComplete) onUploadComplete()
+            }
+        }
+        source.onerror = () => {
+            source.close()
+            setJobs((prev) => {
+                const next = { ...prev }
+                delete next[jobId]
+                return next
+            })
+            if (onUploadComplete) onUploadComplete()
+        }
+    }
+
     const uploadFiles = async (fileList) => {
         if (!conversationId) {
             alert("먼저 대화를 선택하거나 생성하세요.")
@@ -44,6 +73,8 @@ export default function FileUploader({ conversationId, files = [], onUploadCompl
                     body: formData,
                 })
                 if (!response.ok) throw new Error("Upload failed")
+                const result = await response.json()
+                if (result.job_id) watchJob(result.job_id)
             } catch (error) {
                 console.error("Error uploading file:", error)
             }
@@ -83,6 +114,14 @@ export default function FileUploader({ conversationId, files = [], onUploadCompl
             <div className="mt-6 flex-1 overflow-y-auto">
                 <h3 className="font-semibold text-slate-900 mb-2">Uploaded Files</h3>
                 <ul className="space-y-2">
+                    {Object.values(jobs).map((job) => (
+                        <li key={job.job_id} className="bg-purple-100/60 p-2 rounded text-sm flex justify-between items-center shadow-sm">
+                            <span className="truncate">{job.filename}</span>
+                            <span className="text-slate-500 text-xs">
+                                처리 중 {job.pages_embedded || 0}/{job.pages_total ?? "?"}p
+                            </span>
+                        </li>
+                    ))}
                     {files.map((file) => (
                         <li key={file.id || file.filename} className="bg-white/80 p-2 rounded text-sm flex justify-between items-center shadow-sm">
                             <span className="truncate">{file.filename || file.name}</span>
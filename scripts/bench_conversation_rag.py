@@ -0,0 +1,121 @@
+"""대화방 RAG 검색 지연 벤치마크: 턴마다 Chroma 생성(이전) vs 공유 클라이언트 핸들 재사용.
+
+임시 디렉터리에 --conversations개 대화방을 예전 구조(``<root>/<id>/``마다 별도 Chroma)로
+만들고 --chunks개 청크를 넣은 뒤, 같은 질의 순서로 검색 지연 p50/p95를 잰다.
+
+- before: retrieve_conversation_snippets의 이전 구현 (iterdir 확인 + Chroma(persist_directory=...))
+- after: ConversationVectorStores.get(create=False) + similarity_search
+  (첫 조회에서 예전 디렉터리를 공유 클라이언트로 옮기므로 --warmup회는 제외)
+
+임베딩 모델 시간을 빼고 Chroma 쪽 비용만 보려고 해시 기반 가짜 임베딩을 쓴다.
+실제 서비스에서는 여기에 질의 임베딩(BGE-M3) 시간이 더해진다.
+
+사용법:
+    python scripts/bench_conversation_rag.py --conversations 20 --queries 400 --handles 8
+"""
+
+import argparse
+import hashlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from langchain_community.vectorstores import Chroma  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from backend.conversation_vectors import ConversationVectorStores, collection_name  # noqa: E402
+
+DIM = 384
+
+
+class HashEmbeddings(Embeddings):
+    def _embed(self, text: str) -> List[float]:
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        rng = random.Random(seed)
+        return [rng.uniform(-1, 1) for _ in range(DIM)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def _before(root: Path, conversation_id: str, query: str, embeddings: Embeddings) -> int:
+    vector_path = root / conversation_id
+    if not vector_path.exists() or not any(vector_path.iterdir()):
+        return 0
+    vectorstore = Chroma(
+        collection_name=collection_name(conversation_id, "convo"),
+        embedding_function=embeddings,
+        persist_directory=str(vector_path),
+    )
+    return len(vectorstore.similarity_search(query, k=4))
+
+
+def _after(stores: ConversationVectorStores, conversation_id: str, query: str) -> int:
+    vectorstore = stores.get(conversation_id, "convo", create=False)
+    return len(vectorstore.similarity_search(query, k=4)) if vectorstore is not None else 0
+
+
+def _report(name: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"  {name:<7} p50 {statistics.median(ordered) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--handles", type=int, default=64, help="핸들 LRU 크기 (대화방 수보다 작으면 eviction 포함)")
+    args = parser.parse_args()
+
+    embeddings = HashEmbeddings()
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ids = [f"conv-{index:04d}" for index in range(args.conversations)]
+        for conversation_id in ids:
+            Chroma(
+                collection_name=collection_name(conversation_id, "convo"),
+                embedding_function=embeddings,
+                persist_directory=str(root / conversation_id),
+            ).add_texts(
+                texts=[f"{conversation_id} 청크 {idx}: Scope 1·2 배출량 감축 목표" for idx in range(args.chunks)],
+                ids=[f"{conversation_id}-{idx}" for idx in range(args.chunks)],
+            )
+        plan = [(rng.choice(ids), f"질의 {turn}") for turn in range(args.queries)]
+
+        samples = []
+        for conversation_id, query in plan:
+            started = time.perf_counter()
+            _before(root, conversation_id, query, embeddings)
+            samples.append(time.perf_counter() - started)
+        print(f"{args.conversations} conversations x {args.chunks} chunks, {args.queries} queries")
+        _report("before", samples)
+
+        stores = ConversationVectorStores(embeddings, root, max_handles=args.handles)
+        started = time.perf_counter()
+        for conversation_id in ids:
+            stores.get(conversation_id, "convo", create=False)
+        print(f"  migrate {args.conversations} legacy directories: {(time.perf_counter() - started) * 1000:.0f} ms (one-off)")
+        samples = []
+        for conversation_id, query in plan:
+            started = time.perf_counter()
+            found = _after(stores, conversation_id, query)
+            samples.append(time.perf_counter() - started)
+            assert found == 4, "migrated collection returned no results"
+        _report("after", samples)
+        print(f"  stats {stores.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""보고서 생성 의도 분류기 정확도/지연 벤치마크 (오프라인).
+
+분류기 예시 문장과 겹치지 않는 라벨 데이터로 다음을 측정한다.
+
+- 로컬 판별(escalation 없음) 정확도와 질문당 지연 p50/p95
+- 신뢰도 기준 미만이라 LLM으로 넘어갈 비율과, 그 경우를 제외한 정확도
+- --llm: 애매한 질문을 실제로 gpt-4o-mini에 물었을 때의 최종 정확도 (OPENAI_API_KEY 필요)
+
+--embeddings를 주면 BGE-M3(langchain_huggingface)를 올려 임베딩 최근접 이웃까지
+사용하고, 없으면 어휘 규칙만 측정한다.
+
+사용법:
+    python scripts/bench_intent_classifier.py --embeddings --repeat 3
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from backend.intent_classifier import CONFIDENCE_THRESHOLD, ReportIntentClassifier  # noqa: E402
+
+LABELLED_SET = (
+    ("협력사 안전점검 보고서 작성 부탁해", True),
+    ("이번 분기 ESG 성과 리포트 만들어줘", True),
+    ("기후 리스크 공시 초안 써줘", True),
+    ("공급망 인권 실사 체크리스트를 생성해 주세요", True),
+    ("이사회에 올릴 탄소중립 보고서 좀 작성해줄래?", True),
+    ("업로드한 지속가능경영보고서 기반으로 K-ESG 리포트 생성", True),
+    ("현장 안전보건 점검표 만들어 줘", True),
+    ("TCFD 대응 문서 초안 작성해줘", True),
+    ("Generate an ESG report for our construction business", True),
+    ("Can you draft a checklist for supplier audits?", True),
+    ("Write a governance report for the board", True),
+    ("Create a safety inspection checklist", True),
+    ("K-ESG 가이드라인의 환경 항목은 뭐야?", False),
+    ("업로드한 보고서에서 온실가스 감축 목표 찾아줘", False),
+    ("중대재해처벌법 처벌 기준 설명해줘", False),
+    ("우리 회사 ESG 등급이 낮은 이유가 뭘까?", False),
+    ("체크리스트에 있는 항목 몇 개야?", False),
+    ("리포트의 결론 부분 요약해줘", False),
+    ("EU CSRD는 언제부터 적용돼?", False),
+    ("협력사 리스크가 가장 큰 영역은?", False),
+    ("안녕하세요", False),
+    ("고마워요", False),
+    ("What is the difference between GRI and SASB?", False),
+    ("Summarize the uploaded sustainability report", False),
+    ("How does the report describe Scope 3 emissions?", False),
+    ("Which regulations changed this month?", False),
+)
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _load_embeddings():
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name="BAAI/bge-m3")
+
+
+def _llm_escalation():
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_openai import ChatOpenAI
+
+    from backend.api import INTENT_SYSTEM_PROMPT, IntentAnalysis
+
+    structured = ChatOpenAI(model="gpt-4o-mini", temperature=0).with_structured_output(IntentAnalysis)
+
+    def escalate(query: str) -> bool:
+        return structured.invoke([SystemMessage(content=INTENT_SYSTEM_PROMPT), HumanMessage(content=query)]).is_generation_request
+
+    return escalate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", action="store_true", help="BGE-M3 임베딩 최근접 이웃 사용")
+    parser.add_argument("--llm", action="store_true", help="애매한 질문을 실제 LLM으로 escalation")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    embeddings = _load_embeddings() if args.embeddings else None
+    classifier = ReportIntentClassifier(embeddings)
+    # 예시 문장 임베딩은 첫 요청에서 계산되므로 측정에서 제외
+    classifier.classify_locally("warm up")
+
+    latencies = []
+    decisions = []
+    for _ in range(args.repeat):
+        decisions = []
+        for query, label in LABELLED_SET:
+            started = time.perf_counter()
+            decision = classifier.classify_locally(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            decisions.append((query, label, decision))
+
+    correct = sum(decision.is_generation_request == label for _, label, decision in decisions)
+    confident = [(query, label, decision) for query, label, decision in decisions if decision.confidence >= CONFIDENCE_THRESHOLD]
+    confident_correct = sum(decision.is_generation_request == label for _, label, decision in confident)
+
+    print(f"mode: {'embedding+lexical' if embeddings is not None else 'lexical'}  threshold={CONFIDENCE_THRESHOLD}")
+    print(f"local accuracy      {correct}/{len(decisions)} ({correct / len(decisions):.1%})")
+    print(f"escalation rate     {1 - len(confident) / len(decisions):.1%}")
+    if confident:
+        print(f"confident accuracy  {confident_correct}/{len(confident)} ({confident_correct / len(confident):.1%})")
+    print(
+        f"local latency       p50 {statistics.median(latencies):.2f} ms"
+        f"  p95 {_percentile(latencies, 95):.2f} ms  max {max(latencies):.2f} ms"
+    )
+    for query, label, decision in decisions:
+        if decision.is_generation_request != label:
+            print(f"  miss: {query!r} label={label} -> {decision}")
+
+    if args.llm:
+        escalate = _llm_escalation()
+        started = time.perf_counter()
+        final = [(label, classifier.classify(query, escalate=escalate)) for query, label in LABELLED_SET]
+        elapsed = time.perf_counter() - started
+        final_correct = sum(decision.is_generation_request == label for label, decision in final)
+        print(f"with LLM escalation {final_correct}/{len(final)} ({final_correct / len(final):.1%})  total {elapsed:.1f}s")
+        print(f"stats               {classifier.stats()}")
+
+
+if __name__ == "__main__":
+    main()
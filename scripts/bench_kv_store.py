@@ -0,0 +1,102 @@
+"""kv_store 백엔드 벤치마크 (SQLite WAL vs Redis).
+
+워크로드
+- append-message: 대화방 N개에 메시지를 한 건씩 추가 (단건 / write-behind 배치)
+- list-conversations: 전체 대화방 ID 조회 후 메타 + 마지막 메시지 요약 로딩
+
+사용법:
+    python scripts/bench_kv_store.py --conversations 300 --messages 20
+    REDIS_URL=redis://localhost:6379/0 python scripts/bench_kv_store.py
+
+Redis가 연결되지 않으면 SQLite 결과만 출력한다. Redis 측정은 별도
+키 prefix(esg_bench)를 쓰고 끝나면 해당 대화방 키를 삭제한다.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("ESG_KV_PREFIX", "esg_bench")
+# 모듈 import 시 기본 SQLite 파일(state/esg_state.sqlite3)이 만들어지지 않도록 함
+os.environ.setdefault("ESG_KV_BACKEND", "redis")
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from backend.kv_store import RedisKVStore, SQLiteKVStore  # noqa: E402
+
+SAMPLE_TEXT = "중대재해처벌법 대응을 위한 협력사 안전보건 관리체계 점검 결과를 요약해줘. " * 8
+
+
+def _conversation(conv_id: str) -> dict:
+    now = time.time()
+    return {"id": conv_id, "title": "벤치마크 대화", "created_at": now, "updated_at": now}
+
+
+def _timeit(label: str, count: int, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms  ({elapsed / max(count, 1) * 1e6:8.1f} us/op)")
+
+
+def run(store, name: str, conversations: int, messages: int) -> None:
+    print(f"[{name}]")
+    conv_ids = [str(uuid.uuid4()) for _ in range(conversations)]
+    for conv_id in conv_ids:
+        store.save_conversation_meta(_conversation(conv_id))
+
+    def append_single():
+        for idx in range(messages):
+            for conv_id in conv_ids:
+                store.append_conversation_item(
+                    conv_id, "messages", {"role": "user", "content": f"{idx} {SAMPLE_TEXT}"}
+                )
+
+    def append_batched():
+        for idx in range(messages):
+            store.write_batch(
+                globals={},
+                metas={conv_id: _conversation(conv_id) for conv_id in conv_ids},
+                appends=[
+                    (conv_id, "messages", {"role": "assistant", "content": f"{idx} {SAMPLE_TEXT}"})
+                    for conv_id in conv_ids
+                ],
+                deletes=[],
+            )
+
+    def list_conversations():
+        for _ in range(10):
+            store.load_conversation_summaries(store.list_conversation_ids())
+
+    total = conversations * messages
+    _timeit("append-message (single)", total, append_single)
+    _timeit("append-message (write_batch)", total, append_batched)
+    _timeit("list-conversations x10", 10, list_conversations)
+    _timeit("load_conversation (all)", conversations, lambda: [store.load_conversation(c) for c in conv_ids])
+
+    for conv_id in conv_ids:
+        store.delete_conversation(conv_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_store = SQLiteKVStore(os.path.join(tmp, "bench.sqlite3"))
+        run(sqlite_store, "sqlite-wal", args.conversations, args.messages)
+
+    redis_store = RedisKVStore()
+    if redis_store.available:
+        run(redis_store, "redis", args.conversations, args.messages)
+    else:
+        print("[redis] 연결 불가 - 건너뜀")
+
+
+if __name__ == "__main__":
+    main()
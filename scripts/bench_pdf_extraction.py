@@ -0,0 +1,122 @@
+"""PDF 텍스트 추출 벤치마크: 기존 PyPDF2 순차 추출 vs text_extractor(PyMuPDF).
+
+각 PDF에 대해 다음을 측정한다 (--repeat회 중 최솟값).
+
+- pypdf2: 이전 업로드 경로와 같은 PdfReader 페이지별 extract_text
+- pymupdf: text_extractor를 프로세스 풀 없이 (workers=1)
+- pymupdf-parallel: 페이지 범위를 --workers개 프로세스로 나눠 추출
+
+PDF를 주지 않으면 PyMuPDF로 --pages쪽짜리 합성 보고서를 임시로 만들어 쓴다
+(쉼표로 여러 쪽수를 주면 차례로 재서 병렬 추출이 이기기 시작하는 쪽수를 찾을 수 있다).
+실제 지속가능경영보고서(수백 쪽)로 재는 것을 권장한다.
+
+병렬 추출은 코어가 워커 수만큼 있을 때만 빨라진다. 코어가 부족하면 같은 일을 더 많은
+프로세스가 나눠 할 뿐이라 순차보다 느리다. 결과 머리에 CPU 수를 함께 출력하니,
+ESG_PDF_PARALLEL_MIN_PAGES는 실제 배포 호스트에서 잰 값으로 정한다.
+
+사용법:
+    python scripts/bench_pdf_extraction.py data/uploads/report.pdf --workers 4
+    python scripts/bench_pdf_extraction.py --pages 128,256,512,1024
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.extraction.text_extractor import PDF_WORKERS, TextExtractor, fitz  # noqa: E402
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+SAMPLE_PARAGRAPH = (
+    "제3장 기후변화 대응. 당사는 2030년까지 Scope 1·2 온실가스 배출량을 2020년 대비 42% 감축한다. "
+    "Scope 3 배출량은 협력사 데이터 수집 체계를 구축해 2025년부터 공시한다. "
+    "안전보건 경영시스템(ISO 45001) 인증 사업장 비율은 96%이며 중대재해는 0건이다. "
+)
+
+
+def _synthetic_pdf(pages: int, directory: str) -> str:
+    path = str(Path(directory) / f"synthetic_{pages}p.pdf")
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = f"Page {number + 1}\n" + (SAMPLE_PARAGRAPH * 12)
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def _pypdf2(path: str) -> str:
+    reader = PdfReader(path)
+    texts = []
+    for page in reader.pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            continue
+    return "\n".join(texts)
+
+
+def _best(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--pages", default="300", help="합성 PDF 쪽수, 쉼표로 여러 개 (PDF를 주지 않았을 때)")
+    parser.add_argument("--workers", type=int, default=max(PDF_WORKERS, 2))
+    parser.add_argument("--pages-per-task", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if fitz is None:
+        sys.exit("PyMuPDF(pip install pymupdf)가 필요합니다.")
+
+    cpus = os.cpu_count() or 1
+    print(f"CPU {cpus}, workers {args.workers}, pages/task {args.pages_per_task}")
+    if args.workers > cpus:
+        print("  주의: 워커 수가 CPU 수보다 많아 병렬 추출 결과는 과부하 상태의 수치입니다.")
+
+    sequential = TextExtractor(workers=1)
+    parallel = TextExtractor(workers=args.workers, pages_per_task=args.pages_per_task, parallel_min_pages=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = args.pdfs or [_synthetic_pdf(int(pages), tmp) for pages in args.pages.split(",")]
+        # 프로세스 풀 기동 비용은 서버 수명 동안 한 번이므로 측정에서 제외
+        list(parallel.iter_page_batches(pdfs[0], max_pages=args.workers))
+        for path in pdfs:
+            rows = []
+            if PdfReader is not None:
+                elapsed, text = _best(lambda: _pypdf2(path), args.repeat)
+                rows.append(("pypdf2", elapsed, len(text)))
+            elapsed, extracted = _best(lambda: sequential.extract(path), args.repeat)
+            rows.append(("pymupdf", elapsed, len(extracted.text)))
+            elapsed, extracted = _best(lambda: parallel.extract(path), args.repeat)
+            rows.append((f"pymupdf-parallel x{args.workers}", elapsed, len(extracted.text)))
+
+            baseline = rows[0][1]
+            print(f"\n{Path(path).name}: {extracted.page_count} pages")
+            for name, elapsed, chars in rows:
+                print(
+                    f"  {name:<22} {elapsed * 1000:9.1f} ms  "
+                    f"{extracted.page_count / elapsed:8.1f} pages/s  "
+                    f"x{baseline / elapsed:5.1f}  ({chars} chars)"
+                )
+    parallel.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""저장 포맷 벤치마크 (레거시 json.dumps vs payload_codec 조합).
+
+대화방 100개 분량의 컨텍스트(한국어 메시지, 업로드 파일 발췌, HTML 보고서, 에이전트 결과)를
+만들고 직렬화기/압축 조합별로 payload 크기와 encode/decode 시간을 측정한다.
+
+- whole: 컨텍스트 전체를 값 하나로 인코딩 (이전 save_context 방식)
+- per-item: kv_store처럼 메시지/파일/보고서 항목을 하나씩 인코딩
+
+본문은 같은 문장을 반복하면 압축률이 터무니없이 좋게 나오므로, 말뭉치(--corpus, 기본은
+docs/*.md와 data/의 평가 템플릿)에서 뽑은 단어를 실제 글처럼 빈도 순(Zipf) 가중치로 무작위
+조합하고 숫자·연도를 섞어 만든다. 단어 단위 무작위 문장은 실제 보고서보다 반복이 적어
+압축률을 보수적으로(덜 줄어드는 쪽으로) 보여 준다. 실제 보고서 텍스트를 --corpus로 주면 더 정확하다.
+
+설치되지 않은 패키지(msgpack, zstandard, lz4)의 조합은 건너뛴다.
+
+사용법:
+    python scripts/bench_serialization.py --conversations 100 --repeat 5
+    python scripts/bench_serialization.py --corpus extracted_report.txt
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from backend.serialization import PayloadCodec, _compressors, _serializers  # noqa: E402
+
+DEFAULT_CORPUS = ("docs/*.md", "data/*.json", "data/supplier_templates/*.json")
+# 말뭉치가 없을 때 쓰는 기본 어휘
+FALLBACK_WORDS = (
+    "협력사 안전보건 관리체계 점검 결과 중대재해처벌법 대응 현황 기후변화 온실가스 배출량 감축 목표 "
+    "재생에너지 전환 공정 효율화 공급망 인권 실사 리스크 등급 조치 이사회 독립성 윤리경영 반부패 교육 "
+    "지속가능경영보고서 공시 기준 중대성 평가 이해관계자 Scope TCFD GRI ISSB ESRS 탄소 수자원 폐기물 "
+    "생물다양성 지배구조 사외이사 감사위원회 평가 지표 데이터 검증 개선 계획 수립 완료 진행 필요"
+).split()
+VOCABULARY = 3000
+_WORD = re.compile(r"[가-힣A-Za-z][가-힣A-Za-z0-9·\-]+")
+
+
+def load_vocabulary(patterns: Sequence[str]) -> List[str]:
+    """말뭉치 단어를 빈도순으로 (자주 나오는 단어가 앞)"""
+    counts: Counter = Counter()
+    for pattern in patterns:
+        paths = [Path(pattern)] if Path(pattern).is_file() else sorted(ROOT.glob(pattern))
+        for path in paths:
+            counts.update(_WORD.findall(path.read_text(encoding="utf-8", errors="ignore")))
+    words = [word for word, _ in counts.most_common(VOCABULARY)]
+    return words if len(words) >= 100 else list(FALLBACK_WORDS)
+
+
+class TextGenerator:
+    def __init__(self, words: List[str], seed: int = 7) -> None:
+        self._rng = random.Random(seed)
+        self._words = words
+        # Zipf 분포: 실제 글처럼 상위 단어가 자주 나오도록
+        self._weights = [1.0 / (rank + 1) for rank in range(len(words))]
+
+    def sentence(self) -> str:
+        rng = self._rng
+        words = rng.choices(self._words, weights=self._weights, k=rng.randint(6, 16))
+        if rng.random() < 0.4:
+            words.insert(rng.randrange(len(words)), rng.choice((f"{rng.randint(1, 99)}%", f"{rng.randint(2015, 2035)}년", f"{rng.randint(1, 9999):,}tCO2eq")))
+        return " ".join(words) + "."
+
+    def text(self, chars: int) -> str:
+        parts: List[str] = []
+        length = 0
+        while length < chars:
+            parts.append(self.sentence())
+            length += len(parts[-1]) + 1
+        return " ".join(parts)[:chars]
+
+    def html(self, rows: int) -> str:
+        body = "".join(
+            f"<tr><td>{self.text(20)}</td><td>{self._rng.choice('ABCD')}</td><td>{self.text(60)}</td></tr>"
+            for _ in range(rows)
+        )
+        return f"<section><h2>{self.text(24)}</h2><p>{self.text(400)}</p><table>{body}</table></section>"
+
+    def timestamp(self) -> str:
+        rng = self._rng
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}+00:00"
+
+
+def build_context(conversations: int, words: List[str]) -> dict:
+    gen = TextGenerator(words)
+    context = {
+        "uploaded_files": [f"sustainability_report_{idx}.pdf" for idx in range(20)],
+        "regulation_updates": "\n".join(f"- 규제 업데이트 {idx}: " + gen.text(180) for idx in range(30)),
+        "policy_analysis": gen.text(6000),
+        "risk_assessment": gen.text(4500),
+        "conversations": {},
+    }
+    for conv_idx in range(conversations):
+        conv_id = f"conv-{conv_idx:04d}"
+        messages = []
+        for _ in range(12):
+            messages.append({"role": "user", "content": gen.text(60), "timestamp": gen.timestamp()})
+            messages.append({"role": "assistant", "content": gen.text(900), "timestamp": gen.timestamp()})
+        context["conversations"][conv_id] = {
+            "id": conv_id,
+            "title": gen.text(20),
+            "created_at": gen.timestamp(),
+            "updated_at": gen.timestamp(),
+            "messages": messages,
+            "files": [{"filename": f"report_{conv_idx}.pdf", "text": gen.text(10000)}],
+            "reports": [{"id": str(conv_idx), "title": gen.text(20), "content": gen.html(25), "items": []}],
+        }
+    return context
+
+
+def items_of(context: dict) -> list:
+    items = []
+    for conversation in context["conversations"].values():
+        for field in ("messages", "files", "reports"):
+            items.extend(conversation[field])
+    return items
+
+
+def _measure(encode, decode, values, repeat: int):
+    encoded = [encode(value) for value in values]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [encode(value) for value in values]
+    encode_ms = (time.perf_counter() - start) / repeat * 1000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for raw in encoded:
+            decode(raw)
+    decode_ms = (time.perf_counter() - start) / repeat * 1000
+    return sum(len(raw) for raw in encoded), encode_ms, decode_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus", nargs="*", default=list(DEFAULT_CORPUS), help="단어를 뽑을 텍스트 파일 또는 glob")
+    parser.add_argument("--min-compress-bytes", type=int, default=None, help="PayloadCodec 압축 최소 크기 (기본은 환경 설정)")
+    args = parser.parse_args()
+
+    words = load_vocabulary(args.corpus)
+    context = build_context(args.conversations, words)
+    print(f"vocabulary {len(words)} words")
+    workloads = {"whole": [context], "per-item": items_of(context)}
+
+    candidates = [("legacy-json", None)]
+    for serializer in _serializers():
+        for compression in _compressors():
+            options = {} if args.min_compress_bytes is None else {"min_compress_bytes": args.min_compress_bytes}
+            candidates.append((f"{serializer}+{compression}", PayloadCodec(serializer, compression, **options)))
+
+    for workload, values in workloads.items():
+        print(f"[{workload}] values={len(values)}")
+        baseline = None
+        for label, codec in candidates:
+            if codec is None:
+                encode = lambda value: json.dumps(value, ensure_ascii=False).encode("utf-8")  # noqa: E731
+                decode = json.loads
+            else:
+                encode, decode = codec.dumps, codec.loads
+            size, encode_ms, decode_ms = _measure(encode, decode, values, args.repeat)
+            baseline = baseline or size
+            print(
+                f"  {label:<18} {size / 1024:10.1f} KiB ({size / baseline:6.1%})"
+                f"  encode {encode_ms:8.1f} ms  decode {decode_ms:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""채팅 시스템 프롬프트의 앞부분이 턴마다 바이트 단위로 유지되는지 검사.
+
+provider 프롬프트 캐시는 앞부분이 정확히 같을 때만 적중하므로 다음을 확인한다.
+
+1. 정적 지침(CHAT_INSTRUCTIONS/STREAM_GUIDELINES)은 항상 프롬프트 맨 앞에 그대로 있다.
+2. 같은 대화방에서 질문·검색 세그먼트만 바뀌면 DYNAMIC_MARKER 앞까지 완전히 같다.
+3. 에이전트 결과(프로세스 전역)가 바뀌어도 대화 기록 끝까지 앞부분이 같다.
+4. 대화 기록이 예산 안에서 늘어나는 동안에는 이전 턴 프롬프트의 기록 부분까지 앞부분이 같다.
+5. 이전 턴과 같은 앞부분이 파일 발췌·대화 기록이 쌓이면 provider 캐시 최소 길이
+   (PROMPT_CACHE_MIN_TOKENS)를 넘는다. 파일이 있는 대화방과 기록만 있는 대화방을 각각 본다.
+
+토큰 수는 프롬프트 예산과 같은 count_tokens로 센다 (tiktoken이 없으면 UTF-8 바이트/3 근사치).
+
+사용법:
+    python scripts/check_prompt_prefix.py --turns 8
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from backend.prompt_builder import (  # noqa: E402
+    CHAT_INSTRUCTIONS,
+    DYNAMIC_MARKER,
+    PROMPT_CACHE_MIN_TOKENS,
+    STREAM_GUIDELINES,
+    PromptBudget,
+    build_chat_context,
+    compose_system_prompt,
+    count_tokens,
+    tiktoken,
+)
+
+CONTEXT = {
+    "regulation_updates": "- 2024-05 환경부 온실가스 배출권 할당 지침 개정",
+    "policy_analysis": "협력사 행동강령에 인권 실사 조항이 없음",
+    "risk_assessment": "공급망 인권 리스크 C등급",
+    "report_draft": "<section><h2>ESG 리스크 진단</h2><p>탄소배출 B등급</p></section>",
+}
+FILE_CONTEXT = "\n".join(
+    f"[{page}쪽] 제{page}장 기후변화 대응. 당사는 2030년까지 Scope 1·2 배출량을 2020년 대비 {30 + page}% 감축하고, "
+    f"사업장 {page * 3}곳의 재생에너지 전환율을 {page * 7}%까지 높인다. 협력사 {page * 40}곳을 대상으로 "
+    "인권·안전 실사를 진행했으며 고위험 협력사에는 개선 계획 제출을 요구했다."
+    for page in range(1, 13)
+)
+ANSWER = (
+    "**요약**: 협력사 인권 실사는 진행 중이며 고위험 협력사 개선 계획을 점검하고 있습니다.\n"
+    "- 근거: sustainability_report.pdf 제3장, 실사 대상 협력사 수와 개선 요구 현황\n"
+    "- 권고: 고위험 협력사의 개선 이행률을 분기별로 점검하고 다음 보고서에 공시하세요.\n"
+    "신뢰도: 중간 (세부 이행률 데이터가 파일에 없음)"
+)
+
+
+def _common_prefix(left: str, right: str) -> int:
+    length = 0
+    for a, b in zip(left, right):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+def _run(file_context: str, turns: int) -> int:
+    """turns번 대화하며 1~4를 검사하고, 이전 턴과 같은 앞부분이 캐시 최소 길이를 처음 넘은 턴을 반환 (못 넘으면 -1)"""
+    file_names = ["sustainability_report.pdf"] if file_context else []
+    budget = PromptBudget()
+    history = []
+    previous = None
+    reached = -1
+
+    def fit(context, rag_snippets):
+        return build_chat_context(
+            context,
+            file_names=file_names,
+            file_context=file_context,
+            rag_snippets=rag_snippets,
+            history=history,
+            budget=budget,
+        )
+
+    for turn in range(turns):
+        fitted = fit(CONTEXT, [f"[파일:sustainability_report.pdf] 세그먼트 {turn}-{idx}" for idx in range(3)])
+        prompt = compose_system_prompt(CHAT_INSTRUCTIONS, fitted)
+        stream_prompt = compose_system_prompt(STREAM_GUIDELINES, fitted, notes=["note"])
+        assert prompt.startswith(CHAT_INSTRUCTIONS), "정적 지침이 맨 앞에 있지 않습니다"
+        assert stream_prompt.startswith(STREAM_GUIDELINES), "스트림 정적 지침이 맨 앞에 있지 않습니다"
+
+        # 같은 턴에서 질문/검색 결과만 다른 경우: 동적 구간 앞까지 동일해야 함
+        stable = prompt.index(DYNAMIC_MARKER)
+        other_prompt = compose_system_prompt(CHAT_INSTRUCTIONS, fit(CONTEXT, ["완전히 다른 검색 결과"]))
+        assert prompt[:stable] == other_prompt[:stable], "동적 구간 앞부분이 질문에 따라 바뀝니다"
+
+        # 다른 대화방에서 에이전트를 실행해 전역 결과만 바뀐 경우: 대화 기록 끝까지 동일해야 함
+        rerun = {**CONTEXT, "risk_assessment": f"공급망 인권 리스크 재평가 {turn}"}
+        rerun_prompt = compose_system_prompt(CHAT_INSTRUCTIONS, fit(rerun, []))
+        assert prompt.index("[Conversation History]") < stable, "대화 기록이 동적 구간 뒤에 있습니다"
+        assert prompt[:stable] == rerun_prompt[:stable], "에이전트 결과가 대화 기록 앞부분을 바꿉니다"
+
+        if previous is not None:
+            shared = _common_prefix(previous, prompt)
+            assert shared >= len(CHAT_INSTRUCTIONS), "이전 턴과 정적 지침이 다릅니다"
+            if history[:-2] and not fitted.usage["history"]["truncated"]:
+                # 기록이 잘리지 않았다면 이전 턴의 기록 끝(동적 구간 직전)까지 같아야 함
+                assert shared >= previous.index(DYNAMIC_MARKER) - 1, "대화 기록 앞부분이 턴마다 바뀝니다"
+            shared_tokens = count_tokens(prompt[:shared])
+            if reached < 0 and shared_tokens >= PROMPT_CACHE_MIN_TOKENS:
+                reached = turn
+            print(f"  turn {turn}: prompt {count_tokens(prompt)} tokens, shared prefix with previous turn {shared_tokens} tokens")
+        previous = prompt
+        history += [
+            {"role": "user", "content": f"{turn}번째 질문: 협력사 인권 실사 현황은?"},
+            {"role": "assistant", "content": ANSWER},
+        ]
+    return reached
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+
+    method = "tiktoken" if tiktoken is not None else "byte estimate"
+    print(
+        f"static prefix {count_tokens(CHAT_INSTRUCTIONS)} (chat) / {count_tokens(STREAM_GUIDELINES)} (stream) tokens "
+        f"by {method}; provider caches prefixes >= {PROMPT_CACHE_MIN_TOKENS}"
+    )
+    for label, file_context in (("with uploaded file", FILE_CONTEXT), ("history only", "")):
+        print(f"[{label}]")
+        reached = _run(file_context, args.turns)
+        assert reached >= 0, f"{label}: {args.turns}턴 동안 공유 앞부분이 캐시 최소 길이에 이르지 못했습니다"
+        print(f"  cacheable from turn {reached}")
+    print(f"OK: prefix stable across {args.turns} turns")
+
+
+if __name__ == "__main__":
+    main()
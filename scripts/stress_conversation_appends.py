@@ -0,0 +1,112 @@
+"""대화방 동시 추가 스트레스 점검.
+
+여러 대화방에 채팅 턴(사용자 메시지 → 지연 → 응답 저장)을 동시에 몰아넣고,
+executor 스레드에서도 메시지/보고서를 함께 추가한 뒤 다음을 확인한다.
+
+- 메시지/보고서 개수가 요청 수와 일치 (유실 없음)
+- 채팅 턴은 user → assistant 순서로 번갈아 저장되고, 각 응답은 직전 질문과 짝이 맞음
+- flush() 후 저장소에서 다시 읽은 대화방이 메모리 상태와 동일
+
+임시 SQLite 파일을 쓰므로 실행 환경의 상태 저장소에는 영향이 없다.
+
+사용법:
+    python scripts/stress_conversation_appends.py --conversations 20 --turns 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP_DIR = tempfile.mkdtemp(prefix="esg_stress_")
+os.environ["ESG_KV_BACKEND"] = "sqlite"
+os.environ["ESG_SQLITE_PATH"] = os.path.join(_TMP_DIR, "stress.sqlite3")
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from backend.kv_store import kv_store  # noqa: E402
+from backend.manager import agent_manager  # noqa: E402
+
+
+async def _chat_turn(conversation_id: str, turn: int) -> None:
+    # /chat, /chat/stream과 같은 방식: 턴 잠금 안에서 질문 저장 → 응답 대기 → 응답 저장
+    async with agent_manager.conversation_turn(conversation_id):
+        agent_manager.append_conversation_message(conversation_id, "user", f"q{turn}")
+        await asyncio.sleep(random.uniform(0, 0.005))
+        agent_manager.append_conversation_message(conversation_id, "assistant", f"a{turn}")
+
+
+def _side_writes(conversation_id: str, count: int) -> None:
+    for idx in range(count):
+        agent_manager.add_conversation_report(
+            conversation_id,
+            {"id": f"r{idx}", "title": f"report {idx}", "content": "본문", "items": []},
+        )
+
+
+def _check(conversation_id: str, turns: int, reports: int) -> list:
+    errors = []
+    conversation = agent_manager.get_conversation(conversation_id)
+    messages = conversation.get("messages", [])
+    if len(messages) != turns * 2:
+        errors.append(f"{conversation_id}: messages {len(messages)} != {turns * 2}")
+    for user, assistant in zip(messages[::2], messages[1::2]):
+        if user["role"] != "user" or assistant["role"] != "assistant":
+            errors.append(f"{conversation_id}: role 순서 깨짐 ({user['role']}, {assistant['role']})")
+            break
+        if user["content"][1:] != assistant["content"][1:]:
+            errors.append(f"{conversation_id}: 질문/응답 짝 불일치 ({user['content']}, {assistant['content']})")
+            break
+    if len(conversation.get("reports", [])) != reports:
+        errors.append(f"{conversation_id}: reports {len(conversation.get('reports', []))} != {reports}")
+
+    stored = kv_store.load_conversation(conversation_id)
+    for field in ("messages", "reports"):
+        if (stored or {}).get(field) != conversation.get(field):
+            errors.append(f"{conversation_id}: 저장소의 {field}가 메모리와 다름")
+    return errors
+
+
+async def run(conversations: int, turns: int, reports: int) -> int:
+    # 기본 제목이 아니면 첫 메시지에서 제목 생성(LLM)을 건너뛴다
+    conv_ids = [agent_manager.create_conversation(f"stress {idx}")["id"] for idx in range(conversations)]
+
+    tasks = []
+    for conv_id in conv_ids:
+        tasks.extend(_chat_turn(conv_id, turn) for turn in range(turns))
+        tasks.append(asyncio.to_thread(_side_writes, conv_id, reports))
+    random.shuffle(tasks)
+    await asyncio.gather(*tasks)
+
+    if not agent_manager.flush():
+        print("flush 실패")
+        return 1
+
+    errors = []
+    for conv_id in conv_ids:
+        errors.extend(_check(conv_id, turns, reports))
+    for conv_id in conv_ids:
+        agent_manager.delete_conversation(conv_id)
+    agent_manager.shutdown()
+
+    if errors:
+        print("\n".join(errors[:20]))
+        print(f"FAIL: {len(errors)} 건")
+        return 1
+    print(f"OK: {conversations} 대화방 x {turns} 턴 + 보고서 {reports}건")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--reports", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.conversations, args.turns, args.reports)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""추출한 문서 텍스트의 디스크 캐시 (파일 SHA-256 + 추출기 버전 기준).
+
+업로드 때 한 번 추출한 텍스트를 페이지 오프셋과 함께 압축(zlib)해 두고, 보고서 생성이나
+파일 컨텍스트 구성처럼 같은 파일을 다시 읽는 경로는 PDF를 다시 파싱하지 않고 여기서 읽는다.
+
+- 키: 파일 내용의 SHA-256 + extractor_name(). PyMuPDF 버전이 바뀌면 자연히 다시 추출한다.
+- ESG_TEXT_CACHE_DIR: 저장 경로 (기본 state/extracted, /static으로 공개되는 data/ 밖)
+- ESG_TEXT_CACHE_MEMORY: 최근에 읽은 문서를 프로세스 메모리에 두는 개수
+
+파일 해시는 (경로, 크기, 수정 시각)이 같으면 다시 계산하지 않는다.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.extraction.text_extractor import (
+    ExtractedText,
+    PageSpan,
+    TextExtractor,
+    extractor_name,
+    is_pdf,
+    text_extractor,
+)
+
+LOGGER = logging.getLogger(__name__)
+TEXT_CACHE_DIR = os.getenv(
+    "ESG_TEXT_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent.parent / "state" / "extracted"),
+)
+MEMORY_ENTRIES = int(os.getenv("ESG_TEXT_CACHE_MEMORY", "16"))
+_HASH_BLOCK = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractedTextCache:
+    def __init__(
+        self,
+        extractor: TextExtractor = text_extractor,
+        *,
+        root: str = TEXT_CACHE_DIR,
+        memory_entries: int = MEMORY_ENTRIES,
+    ) -> None:
+        self._extractor = extractor
+        self._root = Path(root)
+        self._memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], ExtractedText]" = OrderedDict()
+        # (경로, 크기, mtime_ns) → SHA-256
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "stores": 0}
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def digest(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(key)
+        if cached is None:
+            cached = file_sha256(path)
+            with self._lock:
+                self._digests[key] = cached
+        return cached
+
+    def extract(self, path: str) -> ExtractedText:
+        """캐시에 있으면 그대로, 없으면 추출해서 저장한 뒤 반환"""
+        sha256 = self.digest(path)
+        cached = self.get(sha256, path=path)
+        if cached is not None:
+            return cached
+        extracted = self._extractor.extract(path)
+        self.put(sha256, extracted)
+        return extracted
+
+    def iter_page_batches(self, path: str, batch_pages: int) -> Iterator[Tuple[int, List[str]]]:
+        """extract와 같지만 페이지 묶음 단위로 반환 (업로드 파이프라인용).
+
+        캐시에 없으면 추출기 결과를 그대로 흘려보내면서 모아 두었다가 끝까지 읽으면 저장한다.
+        """
+        sha256 = self.digest(path)
+        cached = self.get(sha256, path=path)
+        if cached is not None:
+            texts = [cached.page_text(span.page) for span in cached.pages]
+            for start in range(0, len(texts), max(batch_pages, 1)):
+                yield start, texts[start:start + batch_pages]
+            return
+        texts = []
+        for start, batch in self._extractor.iter_page_batches(path, batch_pages):
+            texts.extend(batch)
+            yield start, batch
+        self.put(sha256, ExtractedText.from_pages(path, texts, self._extractor_name(path)))
+
+    def get(self, sha256: str, *, path: str = "") -> Optional[ExtractedText]:
+        key = (sha256, self._extractor_name(path))
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return cached
+        extracted = self._read(sha256, key[1], path)
+        with self._lock:
+            if extracted is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._remember(key, extracted)
+        return extracted
+
+    # ------------------------------------------------------------------
+    # 저장
+    # ------------------------------------------------------------------
+    def put(self, sha256: str, extracted: ExtractedText) -> None:
+        key = (sha256, extracted.extractor)
+        payload = {
+            "sha256": sha256,
+            "extractor": extracted.extractor,
+            "pages": [[span.start, span.end] for span in extracted.pages],
+            "text": extracted.text,
+        }
+        path = self._path(*key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            LOGGER.error("추출 텍스트 캐시 저장 실패(%s): %s", path, exc)
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, extracted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"memory_entries": len(self._memory), **self._stats}
+
+    # ------------------------------------------------------------------
+    # 내부
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _extractor_name(path: str) -> str:
+        # 일반 텍스트 파일은 추출기와 무관하게 같은 결과
+        return "plain" if path and not is_pdf(path) else extractor_name()
+
+    def _path(self, sha256: str, extractor: str) -> Path:
+        safe = "".join(char if char.isalnum() or char in ".-" else "_" for char in extractor)
+        return self._root / sha256[:2] / f"{sha256}.{safe}.json.z"
+
+    def _read(self, sha256: str, extractor: str, path: str) -> Optional[ExtractedText]:
+        try:
+            raw = self._path(sha256, extractor).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            LOGGER.error("추출 텍스트 캐시 읽기 실패(%s): %s", sha256, exc)
+            return None
+        try:
+            payload = json.loads(zlib.decompress(raw).decode("utf-8"))
+        except (zlib.error, ValueError) as exc:
+            LOGGER.warning("손상된 추출 텍스트 캐시를 무시합니다(%s): %s", sha256, exc)
+            return None
+        pages = [PageSpan(number, start, end) for number, (start, end) in enumerate(payload["pages"], start=1)]
+        return ExtractedText(path=path, text=payload["text"], pages=pages, extractor=payload["extractor"])
+
+    def _remember(self, key: Tuple[str, str], extracted: ExtractedText) -> None:
+        self._memory[key] = extracted
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+
+extracted_text_cache = ExtractedTextCache()
@@ -0,0 +1,273 @@
+"""업로드·보고서·크롤러가 함께 쓰는 문서 텍스트 추출 (PyMuPDF).
+
+큰 PDF는 ESG_PDF_PAGES_PER_TASK 페이지 범위로 나눠 프로세스 풀(ESG_PDF_WORKERS)에서
+동시에 추출하고, 결과는 페이지 순서대로 돌려준다. ESG_PDF_PARALLEL_MIN_PAGES보다 짧은
+문서는 프로세스 왕복 비용이 더 커서 현재 프로세스에서 바로 읽는다. CPU가 하나뿐이면
+(기본 워커 수 1) 병렬로 얻을 것이 없으므로 프로세스 풀을 만들지 않는다.
+
+추출 결과(ExtractedText)는 페이지를 "\\n"으로 이어 붙인 전체 텍스트와 페이지별
+(시작, 끝) 오프셋을 함께 담아, 청크 위치에서 원래 페이지를 찾을 수 있다.
+
+이 모듈은 무거운 패키지(langchain 등)를 import하지 않는다. spawn으로 뜬 추출
+프로세스가 이 모듈만 다시 불러오기 때문이다. PyMuPDF가 없으면 PyPDF2로 순차 추출한다.
+"""
+
+import bisect
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pymupdf as fitz  # PyMuPDF 1.24.3+ (fitz 이름은 deprecated)
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        fitz = None
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+LOGGER = logging.getLogger(__name__)
+PAGES_PER_TASK = int(os.getenv("ESG_PDF_PAGES_PER_TASK", "32"))
+# 1 CPU 호스트에서 잰 풀 왕복·재오픈 비용은 문서당 약 40ms, 순차 추출은 쪽당 약 0.8ms
+# (scripts/bench_pdf_extraction.py). 4코어에서 이 비용을 넘는 이득이 나는 것은 대략 250쪽부터라
+# 256으로 둔다. 멀티코어 배포 호스트에서 같은 스크립트로 다시 재서 조정한다.
+PARALLEL_MIN_PAGES = int(os.getenv("ESG_PDF_PARALLEL_MIN_PAGES", "256"))
+PDF_WORKERS = int(os.getenv("ESG_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# torch를 올린 부모를 fork하면 교착될 수 있어 executors의 cpu 풀과 같은 이유로 spawn
+PDF_START_METHOD = os.getenv("ESG_PDF_START_METHOD", "spawn")
+
+TEXT_SUFFIXES = {".txt", ".md", ".csv", ".json"}
+PAGE_SEPARATOR = "\n"
+
+
+def extractor_name() -> str:
+    """추출 결과를 구분하는 이름 (엔진이 바뀌면 결과도 달라질 수 있음)"""
+    if fitz is not None:
+        return f"pymupdf-{getattr(fitz, 'VersionBind', 'unknown')}"
+    if PdfReader is not None:
+        return "pypdf2"
+    return "none"
+
+
+@dataclass(frozen=True)
+class PageSpan:
+    page: int  # 1부터
+    start: int
+    end: int
+
+
+@dataclass
+class ExtractedText:
+    path: str
+    text: str
+    pages: List[PageSpan] = field(default_factory=list)
+    extractor: str = ""
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def page_text(self, page: int) -> str:
+        span = self.pages[page - 1]
+        return self.text[span.start:span.end]
+
+    def page_at(self, offset: int) -> Optional[int]:
+        """전체 텍스트의 offset이 속한 페이지 번호 (페이지 사이 구분자는 앞 페이지로)"""
+        if not self.pages:
+            return None
+        index = bisect.bisect_right([span.start for span in self.pages], offset) - 1
+        return self.pages[max(index, 0)].page
+
+    @classmethod
+    def from_pages(cls, path: str, texts: List[str], extractor: str) -> "ExtractedText":
+        spans: List[PageSpan] = []
+        offset = 0
+        for number, text in enumerate(texts, start=1):
+            spans.append(PageSpan(number, offset, offset + len(text)))
+            offset += len(text) + len(PAGE_SEPARATOR)
+        return cls(path=path, text=PAGE_SEPARATOR.join(texts), pages=spans, extractor=extractor)
+
+
+def is_pdf(path: str) -> bool:
+    return Path(path).suffix.lower() == ".pdf"
+
+
+def page_count(path: str) -> int:
+    if not is_pdf(path):
+        return 1
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            return doc.page_count
+    if PdfReader is not None:
+        return len(PdfReader(path).pages)
+    return 0
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """pages[start:stop] 텍스트 (프로세스 풀에서 실행되므로 모듈 수준 함수)"""
+    texts: List[str] = []
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            for index in range(start, min(stop, doc.page_count)):
+                try:
+                    texts.append(doc.load_page(index).get_text("text") or "")
+                except Exception:
+                    texts.append("")
+        return texts
+    if PdfReader is not None:
+        reader = PdfReader(path)
+        for page in reader.pages[start:stop]:
+            try:
+                texts.append(page.extract_text() or "")
+            except Exception:
+                texts.append("")
+    return texts
+
+
+def _read_plain(path: str) -> str:
+    if Path(path).suffix.lower() in TEXT_SUFFIXES:
+        with open(path, "r", encoding="utf-8", errors="ignore") as handle:
+            return handle.read()
+    # fallback binary decode
+    with open(path, "rb") as handle:
+        return handle.read().decode("utf-8", errors="ignore")
+
+
+class TextExtractor:
+    def __init__(
+        self,
+        *,
+        workers: int = PDF_WORKERS,
+        pages_per_task: int = PAGES_PER_TASK,
+        parallel_min_pages: int = PARALLEL_MIN_PAGES,
+    ) -> None:
+        self._workers = workers
+        self._pages_per_task = max(pages_per_task, 1)
+        self._parallel_min_pages = parallel_min_pages
+        # 프로세스 풀은 큰 PDF를 처음 만날 때 만든다
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"documents": 0, "pages": 0, "parallel_documents": 0, "pool_failures": 0}
+
+    def extract(self, path: str, *, max_pages: Optional[int] = None) -> ExtractedText:
+        """문서 전체(또는 앞 max_pages 페이지) 텍스트와 페이지 오프셋"""
+        texts: List[str] = []
+        for _, batch in self.iter_page_batches(path, max_pages=max_pages):
+            texts.extend(batch)
+        return ExtractedText.from_pages(path, texts, extractor_name() if is_pdf(path) else "plain")
+
+    def iter_page_batches(
+        self,
+        path: str,
+        batch_pages: Optional[int] = None,
+        *,
+        max_pages: Optional[int] = None,
+    ) -> Iterator[Tuple[int, List[str]]]:
+        """(첫 페이지 번호(0부터), 페이지 텍스트 리스트)를 페이지 순서대로 반환.
+
+        큰 PDF는 다음 범위들을 미리 프로세스 풀에 넣어 두므로, 호출자가 한 묶음을
+        처리하는 동안 뒤 페이지 추출이 계속 진행된다.
+        """
+        if not is_pdf(path):
+            self._record(1, parallel=False)
+            yield 0, [_read_plain(path)]
+            return
+        total = page_count(path)
+        if max_pages is not None:
+            total = min(total, max_pages)
+        size = max(batch_pages or self._pages_per_task, 1)
+        ranges = [(start, min(start + size, total)) for start in range(0, total, size)]
+        pool = self._get_pool() if total >= self._parallel_min_pages else None
+        self._record(total, parallel=pool is not None)
+        if pool is None:
+            for start, stop in ranges:
+                yield start, extract_page_range(path, start, stop)
+            return
+
+        # 앞에서부터 워커 수의 두 배만큼만 미리 제출 (긴 문서 전체를 메모리에 쌓지 않음)
+        remaining = iter(ranges)
+        pending: Deque[Tuple[int, int, Future]] = deque()
+
+        def _submit_next() -> None:
+            nonlocal pool
+            for start, stop in remaining:
+                future: Optional[Future] = None
+                if pool is not None:
+                    try:
+                        future = pool.submit(extract_page_range, path, start, stop)
+                    except (BrokenProcessPool, RuntimeError):
+                        pool = self._reset_pool()
+                pending.append((start, stop, future))
+                return
+
+        for _ in range(self._workers * 2):
+            _submit_next()
+        try:
+            while pending:
+                start, stop, future = pending.popleft()
+                _submit_next()
+                yield start, self._result(future, path, start, stop)
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self._workers, "pool_started": int(self._pool is not None), **self._stats}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _result(self, future: Optional[Future], path: str, start: int, stop: int) -> List[str]:
+        if future is None:
+            return extract_page_range(path, start, stop)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # 추출 프로세스가 죽으면(손상된 PDF 등) 이 범위는 현재 프로세스에서 다시 읽음
+            LOGGER.warning("PDF 추출 프로세스 풀이 중단되어 현재 프로세스에서 추출합니다: %s", path)
+            self._reset_pool()
+            return extract_page_range(path, start, stop)
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._workers <= 1 or fitz is None:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context(PDF_START_METHOD),
+                )
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._stats["pool_failures"] += 1
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, pages: int, *, parallel: bool) -> None:
+        with self._lock:
+            self._stats["documents"] += 1
+            self._stats["pages"] += pages
+            if parallel:
+                self._stats["parallel_documents"] += 1
+
+
+text_extractor = TextExtractor()
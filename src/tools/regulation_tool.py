@@ -4,7 +4,7 @@ import json
 import schedule
 import requests
 import numpy as np
-import fitz  # PyMuPDF
+from src.extraction.text_extractor import text_extractor
 from datetime import datetime
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
@@ -182,11 +182,7 @@ class RegulationMonitor:
         text_preview = ""
         try:
             if file_path.lower().endswith('.pdf'):
-                doc = fitz.open(file_path)
-                for i, page in enumerate(doc):
-                    if i >= max_pages: break
-                    text_preview += page.get_text()
-                doc.close()
+                text_preview = text_extractor.extract(file_path, max_pages=max_pages).text
             elif file_path.lower().endswith('.txt'):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     text_preview = f.read(3000) # 앞부분 3000자
@@ -258,10 +254,7 @@ class RegulationMonitor:
                 full_text = ""
                 # PDF 처리
                 if file_path.lower().endswith('.pdf'):
-                    full_doc = fitz.open(file_path)
-                    for page in full_doc:
-                        full_text += page.get_text()
-                    full_doc.close()
+                    full_text = text_extractor.extract(file_path).text
                 # TXT 처리 (law.go.kr 등)
                 elif file_path.lower().endswith('.txt'):
                     with open(file_path, 'r', encoding='utf-8') as f:
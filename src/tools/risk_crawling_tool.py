@@ -4,7 +4,7 @@ import json
 import requests
 import urllib.parse
 import numpy as np
-import fitz  # PyMuPDF
+from src.extraction.text_extractor import text_extractor
 from datetime import datetime
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
@@ -183,11 +183,7 @@ class RiskCrawlingTool:
     def _extract_text_preview(self, pdf_path: str, max_pages: int = 5) -> str:
         text = ""
         try:
-            doc = fitz.open(pdf_path)
-            for i, page in enumerate(doc):
-                if i >= max_pages: break
-                text += page.get_text()
-            doc.close()
+            text = text_extractor.extract(pdf_path, max_pages=max_pages).text
         except: pass
         return text
 
@@ -237,11 +233,7 @@ class RiskCrawlingTool:
             if result['is_practical'] and result['score'] >= 7:
                 print(f"      💾 [Vector DB] 저장합니다.")
                 
-                full_doc = fitz.open(file_path)
-                full_text = ""
-                for page in full_doc:
-                    full_text += page.get_text()
-                full_doc.close()
+                full_text = text_extractor.extract(file_path).text
 
                 text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
                 chunks = text_splitter.create_documents(
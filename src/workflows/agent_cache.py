@@ -0,0 +1,328 @@
+"""에이전트/파이프라인 노드 결과 캐시 (TTL + LRU + single-flight)
+
+- 메모리 LRU(프로세스 내)와 선택적 Redis(워커 간 공유) 2단 구성
+- 키는 query/focus_area/audience를 정규화(NFC, 공백 정리, 소문자)해 만든다
+- 같은 키의 동시 요청은 진행 중인 계산 하나를 기다린다 (스레드·asyncio 모두)
+- Redis를 쓰면 SET NX 잠금으로 다른 워커의 같은 계산도 기다린다
+
+환경 변수
+- ESG_AGENT_CACHE_BACKEND: auto(Redis 연결되면 사용) | memory | redis
+- ESG_AGENT_CACHE_TTL: 기본 TTL(초, 600), ESG_AGENT_CACHE_MAX: 네임스페이스별 메모리 항목 수(256)
+- ESG_AGENT_CACHE_LOCK_TTL: 다른 워커의 계산을 기다리는 최대 시간(초, 120)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import redis  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+LOGGER = logging.getLogger(__name__)
+CACHE_BACKEND = os.getenv("ESG_AGENT_CACHE_BACKEND", "auto").lower()
+DEFAULT_TTL = float(os.getenv("ESG_AGENT_CACHE_TTL", "600"))
+MAX_ENTRIES = int(os.getenv("ESG_AGENT_CACHE_MAX", "256"))
+LOCK_TTL = float(os.getenv("ESG_AGENT_CACHE_LOCK_TTL", "120"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = os.getenv("ESG_KV_PREFIX", "esg_ai_agent")
+
+# 네임스페이스별 TTL (없으면 DEFAULT_TTL). regulation은 수집 데이터 갱신 주기에 맞춰 짧게
+NAMESPACE_TTLS = {"regulation": 300.0}
+
+_POLL_INTERVAL = 0.2
+_WHITESPACE = re.compile(r"\s+")
+_MISS = object()
+# 잠금 값이 내 토큰일 때만 삭제 (만료 후 다른 워커가 잡은 잠금을 지우지 않도록)
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class _FlightAbandoned(Exception):
+    """계산을 맡은 요청이 취소되어 결과 없이 끝남: 기다리던 요청 중 하나가 다시 계산을 맡는다"""
+
+
+def normalize(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", str(value))).strip().lower()
+
+
+def _connect_redis() -> Optional["redis.Redis"]:
+    if CACHE_BACKEND == "memory" or redis is None:
+        return None
+    try:
+        client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        client.ping()
+        return client
+    except Exception as exc:  # pragma: no cover - 네트워크 예외
+        if CACHE_BACKEND == "redis":
+            LOGGER.warning("에이전트 캐시 Redis 연결 실패(%s): %s", REDIS_URL, exc)
+        return None
+
+
+class AgentResultCache:
+    """네임스페이스(모듈) 하나의 결과 캐시"""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = MAX_ENTRIES,
+        client: Optional["redis.Redis"] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self._max_entries = max_entries
+        self._client = client
+        self._lock = threading.Lock()
+        # key -> (만료 시각, 값)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._flights: Dict[str, Future] = {}
+        self.stats = {"hits": 0, "remote_hits": 0, "misses": 0, "coalesced": 0, "computed": 0}
+
+    def key(self, **parts: Optional[str]) -> str:
+        """정규화한 입력으로 만든 캐시 키 (인자 순서와 무관)"""
+        normalized = json.dumps({name: normalize(value) for name, value in sorted(parts.items())}, ensure_ascii=False)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 조회/저장
+    # ------------------------------------------------------------------
+    def get(self, key: str, ttl: Optional[float] = None) -> Any:
+        """캐시 값 또는 _MISS (Redis에서 가져온 값은 Redis 남은 수명과 ttl 중 짧은 쪽만 메모리에 둔다)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+        value, remaining = self._remote_get(key)
+        if value is not _MISS:
+            self.stats["remote_hits"] += 1
+            self._remember(key, value, self._local_ttl(remaining, ttl))
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._remember(key, value, ttl)
+        if self._client is not None:
+            try:
+                self._client.set(self._redis_key(key), json.dumps(value, ensure_ascii=False), ex=max(int(ttl), 1))
+            except Exception as exc:  # pragma: no cover - 네트워크 예외
+                LOGGER.warning("에이전트 캐시 Redis 저장 실패: %s", exc)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # single-flight
+    # ------------------------------------------------------------------
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """스레드용: 캐시에 없으면 한 번만 계산하고 동시 요청은 그 결과를 기다린다"""
+        while True:
+            value = self.get(key, ttl)
+            if value is not _MISS:
+                return value
+            future, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _FlightAbandoned:
+                continue
+        token = None
+        try:
+            value, token = self._wait_remote(key, ttl)
+            if value is _MISS:
+                value = compute()
+                self.stats["computed"] += 1
+                self.set(key, value, ttl)
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        finally:
+            if token is not None:
+                self._remote_release(key, token)
+        self._settle(key, future, value=value)
+        return value
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """asyncio용: get_or_compute와 같은 진행 중 계산을 공유한다.
+
+        기다리던 요청이 취소돼도 공유 Future는 취소하지 않고(shield), 계산을 맡은 요청이
+        취소되면 기다리던 요청 중 하나가 이어서 계산한다.
+        """
+        while True:
+            value = self.get(key, ttl)
+            if value is not _MISS:
+                return value
+            future, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _FlightAbandoned:
+                continue
+        token = None
+        try:
+            value = _MISS
+            if self._client is not None:
+                value, token = await asyncio.to_thread(self._wait_remote, key, ttl)
+            if value is _MISS:
+                value = await compute()
+                self.stats["computed"] += 1
+                self.set(key, value, ttl)
+        except asyncio.CancelledError:
+            self._settle(key, future, error=_FlightAbandoned())
+            raise
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        finally:
+            if token is not None:
+                self._remote_release(key, token)
+        self._settle(key, future, value=value)
+        return value
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                # 직전에 다른 요청이 계산을 마친 경우
+                self.stats["hits"] += 1
+                future = Future()
+                future.set_result(entry[1])
+                return future, False
+            self.stats["misses"] += 1
+            future = Future()
+            self._flights[key] = future
+            return future, True
+
+    def _settle(self, key: str, future: Future, *, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if future.done():
+            return
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+        except Exception:  # InvalidStateError: 그 사이 다른 쪽에서 완료/취소됨
+            pass
+
+    # ------------------------------------------------------------------
+    # 내부 구현
+    # ------------------------------------------------------------------
+    def _remember(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _local_ttl(self, remaining: Optional[float], ttl: Optional[float]) -> float:
+        ttl = self.ttl if ttl is None else ttl
+        return ttl if remaining is None else min(ttl, remaining)
+
+    def _redis_key(self, key: str, suffix: str = "") -> str:
+        return f"{KEY_PREFIX}:agent_cache:{self.namespace}:{key}{suffix}"
+
+    def _remote_get(self, key: str) -> Tuple[Any, Optional[float]]:
+        """(값 또는 _MISS, Redis에 남은 수명(초) 또는 None)"""
+        if self._client is None:
+            return _MISS, None
+        try:
+            pipe = self._client.pipeline()
+            pipe.get(self._redis_key(key))
+            pipe.pttl(self._redis_key(key))
+            raw, remaining_ms = pipe.execute()
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.warning("에이전트 캐시 Redis 조회 실패: %s", exc)
+            return _MISS, None
+        if raw is None:
+            return _MISS, None
+        # PTTL: -1은 만료 없음, -2는 그 사이 만료됨
+        remaining = remaining_ms / 1000 if remaining_ms is not None and remaining_ms >= 0 else None
+        if remaining_ms == -2:
+            remaining = 0.0
+        return json.loads(raw), remaining
+
+    def _wait_remote(self, key: str, ttl: Optional[float] = None) -> Tuple[Any, Optional[str]]:
+        """다른 워커가 같은 키를 계산 중이면 결과를 기다린다.
+
+        (값, None) 또는 직접 계산해야 할 때 (_MISS, 잠금 토큰 또는 None)을 반환.
+        """
+        if self._client is None:
+            return _MISS, None
+        deadline = time.time() + LOCK_TTL
+        token = uuid.uuid4().hex
+        try:
+            while not self._client.set(self._redis_key(key, ":lock"), token, nx=True, ex=max(int(LOCK_TTL), 1)):
+                value, remaining = self._remote_get(key)
+                if value is not _MISS:
+                    self.stats["remote_hits"] += 1
+                    self._remember(key, value, self._local_ttl(remaining, ttl))
+                    return value, None
+                if time.time() >= deadline:
+                    # 잠금을 가진 워커가 응답이 없으면 직접 계산
+                    return _MISS, None
+                time.sleep(_POLL_INTERVAL)
+        except Exception as exc:  # pragma: no cover - 네트워크 예외
+            LOGGER.warning("에이전트 캐시 Redis 잠금 실패: %s", exc)
+            return _MISS, None
+        return _MISS, token
+
+    def _remote_release(self, key: str, token: str) -> None:
+        if self._client is None:
+            return
+        try:
+            self._client.eval(_RELEASE_SCRIPT, 1, self._redis_key(key, ":lock"), token)
+        except Exception:  # pragma: no cover - 네트워크 예외
+            pass
+
+
+_client = _connect_redis()
+_caches: Dict[str, AgentResultCache] = {}
+
+
+def get_cache(namespace: str) -> AgentResultCache:
+    """네임스페이스별 캐시 (파이프라인 노드와 AgentManager가 같은 인스턴스를 공유)"""
+    cache = _caches.get(namespace)
+    if cache is None:
+        ttl = NAMESPACE_TTLS.get(namespace, DEFAULT_TTL)
+        cache = _caches.setdefault(namespace, AgentResultCache(namespace, ttl=ttl, client=_client))
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {namespace: dict(cache.stats) for namespace, cache in _caches.items()}
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
-"""LangGraph 기반 ESG 멀티 에이전트 파이프라인"""
+"""LangGraph 기반 ESG 멀티 에이전트 파이프라인
 
-from typing import Optional, TypedDict
+policy/regulation/risk/report 노드는 서로의 결과를 읽지 않으므로
+route에서 질문에 필요한 노드만 골라 동시에 분기(fan-out)하고 join에서 합친다(fan-in).
+고르지 않은 노드는 실행하지 않고 마지막으로 성공한 결과를 그대로 쓴다.
+"""
+
+import logging
+import operator
+import os
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Annotated, Any, Callable, Dict, List, Optional, Sequence, TypedDict
 
 from langgraph.graph import StateGraph, END
 
@@ -11,90 +21,240 @@ from src.tools.policy_tool import policy_guideline_tool
 from src.tools.regulation_tool import _monitor_instance as regulation_monitor
 from src.tools.risk import RiskToolOrchestrator
 from src.tools.report_tool import draft_report
+from src.workflows.agent_cache import get_cache
+
+LOGGER = logging.getLogger(__name__)
+# 노드별 제한 시간(초). ESG_NODE_TIMEOUT_<NODE>로 노드마다 덮어쓸 수 있음
+NODE_TIMEOUT = float(os.getenv("ESG_NODE_TIMEOUT", "60"))
+PIPELINE_WORKERS = int(os.getenv("ESG_PIPELINE_WORKERS", "8"))
+
+BRANCHES = ("policy", "regulation", "risk", "report")
+# 질문에 이 키워드가 있으면 해당 모듈 실행 (없으면 생략하고 빈 결과)
+ROUTE_KEYWORDS: Dict[str, Sequence[str]] = {
+    "policy": ["정책", "가이드", "지침", "공시", "기준", "k-esg", "gri", "issb", "policy", "guideline", "disclosure"],
+    "regulation": ["규제", "법", "법령", "compliance", "legal", "업데이트", "정책"],
+    "risk": ["리스크", "위험", "체크리스트", "점검", "협력사", "중대성", "iso", "risk", "supplier", "materiality"],
+    "report": ["보고서", "리포트", "초안", "report", "draft"],
+}
+
+
+def _merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    return {**(left or {}), **(right or {})}
 
 
 class PipelineState(TypedDict, total=False):
-    """LangGraph 상태: 질문과 각 모듈 결과"""
+    """LangGraph 상태: 질문과 각 모듈 결과
+
+    병렬 노드가 같은 superstep에 함께 쓰는 errors/timings는 reducer로 합친다.
+    """
 
     query: str
     focus_area: Optional[str]
     audience: Optional[str]
+    # 실행할 노드를 호출 측에서 지정 (없으면 route 노드가 질문으로 결정)
+    modules: Optional[List[str]]
+    route: List[str]
+    skipped: List[str]
     policy: str
     regulation: str
     risk: str
     report: str
+    errors: Annotated[List[Dict[str, str]], operator.add]
+    timings: Annotated[Dict[str, float], _merge_dicts]
 
 
 _risk_orchestrator = RiskToolOrchestrator()
 _graph_builder = StateGraph(PipelineState)
+# 노드 본문을 실행하는 풀: 제한 시간을 넘긴 작업은 기다리지 않고 다음 단계로 진행
+_node_pool = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline-node")
+
+# 시간 초과 통계. abandoned_running: 제한 시간을 넘겨 결과를 버렸지만 아직 풀 워커를 잡고 있는 노드 수
+_PIPELINE_STATS = {"timeouts": 0, "queue_timeouts": 0, "abandoned_running": 0, "abandoned_total": 0}
+_PIPELINE_STATS_LOCK = threading.Lock()
+
 
-_REGULATION_CACHE = {"timestamp": 0.0, "result": "", "ttl": 300.0}
-_REGULATION_KEYWORDS = ["규제", "법", "법령", "compliance", "legal", "업데이트", "정책"]
+def select_modules(query: str) -> List[str]:
+    """질문에 필요한 모듈만 선택 (키워드 기반, 순서는 BRANCHES 기준)"""
+    lowered = query.lower()
+    return [
+        name for name in BRANCHES
+        if any(keyword in lowered for keyword in ROUTE_KEYWORDS[name])
+    ]
 
 
 def _should_run_regulation(query: str) -> bool:
     lowered = query.lower()
-    return any(keyword in lowered for keyword in _REGULATION_KEYWORDS)
+    return any(keyword in lowered for keyword in ROUTE_KEYWORDS["regulation"])
+
 
+def _node_timeout(name: str) -> float:
+    return float(os.getenv(f"ESG_NODE_TIMEOUT_{name.upper()}", NODE_TIMEOUT))
 
-def _policy_node(state: PipelineState) -> PipelineState:
-    state["policy"] = policy_guideline_tool(state["query"])
-    return state
 
+def regulation_cache_key() -> str:
+    # generate_report는 저장된 수집 데이터로 리포트를 만들어 질문과 무관하므로 키 하나를 공유
+    return get_cache("regulation").key()
 
-def _regulation_node(state: PipelineState) -> PipelineState:
+
+def _run_policy(state: PipelineState) -> str:
+    cache = get_cache("policy")
     query = state["query"]
-    now = time.time()
+    return cache.get_or_compute(cache.key(query=query), lambda: policy_guideline_tool(query))
+
 
+def _run_regulation(state: PipelineState) -> str:
+    query = state["query"]
     if not _should_run_regulation(query):
-        cached = _REGULATION_CACHE.get("result")
-        state["regulation"] = cached or "규제 관련 요청이 없어 직전 정보를 유지합니다."
-        return state
+        # 규제 리포트는 질문과 무관한 공용 캐시 키 하나로만 저장되므로 남아 있으면 그대로 쓴다
+        last = get_cache("regulation").get(regulation_cache_key())
+        return last if isinstance(last, str) else "규제 관련 요청이 없어 직전 정보를 유지합니다."
+    return get_cache("regulation").get_or_compute(
+        regulation_cache_key(), lambda: regulation_monitor.generate_report(query)
+    )
+
+
+def _run_risk(state: PipelineState) -> str:
+    cache = get_cache("risk")
+    query, focus_area = state["query"], state.get("focus_area")
+    return cache.get_or_compute(
+        cache.key(query=query, focus_area=focus_area),
+        lambda: _risk_orchestrator.run(query, focus_area),
+    )
+
 
-    if (
-        _REGULATION_CACHE.get("result")
-        and now - _REGULATION_CACHE.get("timestamp", 0) < _REGULATION_CACHE.get("ttl", 300)
-    ):
-        state["regulation"] = _REGULATION_CACHE["result"]
-        return state
+def _run_report(state: PipelineState) -> str:
+    cache = get_cache("report")
+    query, audience = state["query"], state.get("audience")
+    return cache.get_or_compute(
+        cache.key(query=query, audience=audience),
+        lambda: draft_report(query, audience),
+    )
 
-    result = regulation_monitor.generate_report(query)
-    _REGULATION_CACHE["result"] = result
-    _REGULATION_CACHE["timestamp"] = now
-    state["regulation"] = result
-    return state
 
+def _count(key: str, delta: int = 1) -> None:
+    with _PIPELINE_STATS_LOCK:
+        _PIPELINE_STATS[key] += delta
 
-def _risk_node(state: PipelineState) -> PipelineState:
-    state["risk"] = _risk_orchestrator.run(state["query"], state.get("focus_area"))
-    return state
 
+def _abandon(future: Future) -> None:
+    """실행 중에 시간을 넘긴 노드: 결과는 버리고, 끝날 때까지 워커를 잡고 있는 수만 집계"""
+    if future.cancel():
+        return
+    _count("timeouts")
+    _count("abandoned_running")
+    _count("abandoned_total")
+    future.add_done_callback(lambda _: _count("abandoned_running", -1))
 
-def _report_node(state: PipelineState) -> PipelineState:
-    state["report"] = draft_report(state["query"], state.get("audience"))
-    return state
 
+def pipeline_stats() -> Dict[str, int]:
+    with _PIPELINE_STATS_LOCK:
+        return {"workers": PIPELINE_WORKERS, **_PIPELINE_STATS}
 
-_graph_builder.add_node("policy", _policy_node)
-_graph_builder.add_node("regulation", _regulation_node)
-_graph_builder.add_node("risk", _risk_node)
-_graph_builder.add_node("report", _report_node)
 
-_graph_builder.set_entry_point("policy")
-_graph_builder.add_edge("policy", "regulation")
-_graph_builder.add_edge("regulation", "risk")
-_graph_builder.add_edge("risk", "report")
-_graph_builder.add_edge("report", END)
+def _branch(name: str, func: Callable[[PipelineState], str]) -> Callable[[PipelineState], Dict[str, Any]]:
+    """노드 본문을 제한 시간 안에서 실행하고 자기 결과 키만 담은 부분 상태를 반환.
+
+    실패/시간 초과 시 결과 대신 안내 문구를 넣고 errors에 기록해 나머지 노드 결과는 살린다.
+    제한 시간은 풀에서 실제로 시작한 시점부터 잰다. 제한 시간 동안 시작하지 못한 노드는 취소하고,
+    실행 중에 시간을 넘긴 노드는 멈출 수 없으므로 결과만 버리고 abandoned_running으로 집계한다.
+    """
+
+    def node(state: PipelineState) -> Dict[str, Any]:
+        started = time.perf_counter()
+        timeout = _node_timeout(name)
+        update: Dict[str, Any] = {}
+        began = threading.Event()
+        began_at: List[float] = []
+
+        def task() -> str:
+            began_at.append(time.perf_counter())
+            began.set()
+            return func(state)
+
+        future = _node_pool.submit(task)
+        try:
+            if not began.wait(timeout) and future.cancel():
+                # 풀이 막혀 제한 시간 동안 시작하지 못함: 대기 중인 작업은 취소
+                _count("queue_timeouts")
+                raise FutureTimeout()
+            began.wait()
+            remaining = max(0.0, timeout - (time.perf_counter() - began_at[0]))
+            try:
+                update[name] = future.result(timeout=remaining)
+            except FutureTimeout:
+                _abandon(future)
+                raise
+        except FutureTimeout:
+            LOGGER.warning("파이프라인 노드 시간 초과: %s (%.0fs)", name, timeout)
+            update[name] = f"{name} 모듈이 제한 시간({timeout:.0f}초) 안에 응답하지 않았습니다."
+            update["errors"] = [{"node": name, "error": "timeout"}]
+        except Exception as exc:
+            LOGGER.error("파이프라인 노드 실패: %s: %s", name, exc)
+            update[name] = f"{name} 모듈 실행 오류: {exc}"
+            update["errors"] = [{"node": name, "error": str(exc)}]
+        update["timings"] = {name: round((time.perf_counter() - started) * 1000, 1)}
+        return update
+
+    node.__name__ = f"_{name}_node"
+    return node
+
+
+def _route_node(state: PipelineState) -> Dict[str, Any]:
+    modules = state.get("modules")
+    if modules is None:
+        route = select_modules(state["query"])
+    else:
+        route = [name for name in BRANCHES if name in modules]
+    return {"route": route, "errors": [], "timings": {}}
+
+
+def _select_branches(state: PipelineState) -> List[str]:
+    # 고른 노드들을 같은 superstep에서 병렬 실행, 하나도 없으면 바로 join
+    return state["route"] or ["join"]
+
+
+def _join_node(state: PipelineState) -> Dict[str, Any]:
+    # 실행된 분기가 모두 끝난 뒤 한 번 실행: 건너뛴 노드는 빈 결과
+    # (다른 사용자의 직전 결과가 섞이지 않도록 프로세스 전역 값으로 채우지 않는다. 호출 측이 직전 값을 유지)
+    skipped = [name for name in BRANCHES if name not in state["route"]]
+    update: Dict[str, Any] = {name: "" for name in skipped}
+    update["skipped"] = skipped
+    if state.get("errors"):
+        LOGGER.info("파이프라인 부분 결과: %s", [error["node"] for error in state["errors"]])
+    return update
+
+
+_graph_builder.add_node("route", _route_node)
+for _name, _func in zip(BRANCHES, (_run_policy, _run_regulation, _run_risk, _run_report)):
+    _graph_builder.add_node(_name, _branch(_name, _func))
+    # 실행된 분기만 join을 깨우므로 일부만 골라도 join은 한 번 실행된다
+    _graph_builder.add_edge(_name, "join")
+_graph_builder.add_node("join", _join_node)
+
+_graph_builder.set_entry_point("route")
+_graph_builder.add_conditional_edges("route", _select_branches, [*BRANCHES, "join"])
+_graph_builder.add_edge("join", END)
 
 _pipeline = _graph_builder.compile()
 
 
-def run_langgraph_pipeline(query: str, focus_area: Optional[str] = None, audience: Optional[str] = None) -> PipelineState:
-    """LangGraph 파이프라인 실행"""
+def run_langgraph_pipeline(
+    query: str,
+    focus_area: Optional[str] = None,
+    audience: Optional[str] = None,
+    modules: Optional[Sequence[str]] = None,
+) -> PipelineState:
+    """LangGraph 파이프라인 실행
+
+    modules를 주면 해당 노드만, 없으면 질문에 맞춰 고른 노드만 실행한다.
+    결과의 route/skipped에 실행·생략한 노드, errors에 실패/시간 초과한 노드가 담긴다.
+    """
 
     state: PipelineState = {"query": query}
     if focus_area:
         state["focus_area"] = focus_area
     if audience:
         state["audience"] = audience
+    if modules is not None:
+        state["modules"] = list(modules)
     return _pipeline.invoke(state)
@@ -1,5 +1,6 @@
 from pathlib import Path
 import shutil
+import sys
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
@@ -26,16 +27,29 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langdetect import detect
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from src.extraction.text_extractor import text_extractor  # noqa: E402
+
 
 # 0. 기본 설정
 DATA_DIR = Path("data")
 VECTOR_DIR = "vector_db/esg_all"
 
-# HuggingFace 임베딩 (4060 GPU 활용 가능)
-embedding_model = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-m3",      # 다국어 지원, 성능/속도 괜찮음
-    # encode_kwargs={"normalize_embeddings": True},  # 선택 옵션
-)
+_EMBEDDING_MODEL = None
+
+
+def get_embedding_model() -> HuggingFaceEmbeddings:
+    """HuggingFace 임베딩(4060 GPU 활용 가능)을 1회만 생성.
+
+    PDF 추출 프로세스(spawn)가 이 스크립트를 다시 import할 때 모델까지 올리지 않도록 지연 생성한다.
+    """
+    global _EMBEDDING_MODEL
+    if _EMBEDDING_MODEL is None:
+        _EMBEDDING_MODEL = HuggingFaceEmbeddings(
+            model_name="BAAI/bge-m3",      # 다국어 지원, 성능/속도 괜찮음
+            # encode_kwargs={"normalize_embeddings": True},  # 선택 옵션
+        )
+    return _EMBEDDING_MODEL
 
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1200,
@@ -91,17 +105,17 @@ def infer_pdf_metadata(pdf_path: Path, source_type: str) -> dict:
 # 1. 텍스트/OCR 추출 도우미
 # -------------------------------------------------------
 def _load_pdf_pages_pymupdf(pdf_path, source_type):
-    doc = fitz.open(pdf_path)
+    # 큰 보고서는 text_extractor가 페이지 범위별로 나눠 병렬 추출
+    extracted = text_extractor.extract(pdf_path)
     pages = []
-    for idx, page in enumerate(doc):
-        text = page.get_text("text") or ""
+    for span in extracted.pages:
         pages.append(
             Document(
-                page_content=text,
+                page_content=extracted.page_text(span.page),
                 metadata={
                     "source_file": Path(pdf_path).name,
                     "source_type": source_type,
-                    "page": idx + 1,
+                    "page": span.page,
                 },
             )
     )
@@ -541,7 +555,7 @@ def load_existing_chunk_ids(persist_dir: Path):
     vectordb = Chroma(
         persist_directory=str(persist_dir),
         collection_name="esg_all",
-        embedding_function=embedding_model,
+        embedding_function=get_embedding_model(),
     )
     existing = vectordb.get(include=["metadatas"])
     chunk_ids = set()
@@ -599,7 +613,7 @@ def build_vector_db(clear_existing: bool = False):
     if vectordb is None:
         vectordb = Chroma.from_documents(
             documents=new_chunks,
-            embedding=embedding_model,
+            embedding=get_embedding_model(),
             persist_directory=VECTOR_DIR,
             collection_name="esg_all",
         )